@@ -1,29 +1,187 @@
-from flask import Flask, request, jsonify
-from utils.response import bad_request_response, format_item, format_items, format_response, make_response, not_found_response, success_response
-from utils.validators import positive_integer, positive_value, validate_payload, validate_required_fields, validate_unique_field
+from flask import Flask, Response, request, jsonify
+from utils.backends import DuplicateRecordError, DurabilityError, create_backend
+from utils.bulk import bulk_response, parse_bulk_payload, run_bulk
+from utils.cache import ResponseCache, cached
+from utils.changes import changes_response
+from utils.compression import Compression
+from utils.idempotency import IdempotencyCache, idempotent
+from utils.indexes import UniqueIndex
+from utils.locks import hold, locked
+from utils.metrics import Metrics, instrument_store, phase
+from utils.pagination import DEFAULT_PAGE_SIZE, parse_page_args, stream_records, wants_stream
+from utils.profiling import Profiler
+from utils.serializers import FastJSONProvider
+from utils.text_index import parse_text_query
+from utils.transfer import TRANSFER_FORMATS, export_records, import_response, import_rows, number, parse_import_id, parse_transfer_format, read_rows
+from utils.records import Item
+from utils.response import bad_request_response, format_item, format_items, format_response, make_response, not_found_response, paginated_response, success_response, validation_error_response
+from utils.schema import Positive, Required, Schema, describe_errors
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
+# Latency histograms (per route and phase), request counters and store sizes on /metrics
+metrics = Metrics().install(app)
+
+# gzip/deflate by Accept-Encoding above COMPRESS_MIN_SIZE bytes, at COMPRESS_LEVEL (see utils/compression.py)
+compression = Compression().install(app)
+
+# Sampled stack profiles per route on /admin/profile; off unless PROFILE_ADMIN_TOKEN is set
+profiler = Profiler().install(app)
+
+
+# Storage backend (STORAGE_BACKEND=memory|sqlite, see utils/backends.py)
+backend = create_backend(name='stock')
+
+# Items collection: id-keyed, monotonic ids, case-insensitive unique names
+items = instrument_store(backend.collection('items'))
+items.seed([
+        Item(id=1, name="Rice", quantity=10, unit_price=65000, total_price=650000, description="50kg bag of rice"),
+        Item(id=2, name="Salt", quantity=5, unit_price=400, total_price=2000, description="2kg dangote salt")
+])
+
+# Numeric columns (quantity, unit_price, total_price) for whole-inventory queries
+item_columns = backend.item_analytics()
+
+# Substring/prefix index over item names (folded like the unique-name check)
+item_names = backend.text_index('items', 'name')
+
+# Sequence-numbered log of recent saves and removes behind /api/v1/changes (CHANGE_FEED_SIZE entries)
+change_feed = backend.change_feed()
+CHANGE_SOURCES = {'items': (items, 'item')}
+
+# Serialized GET responses, keyed by the items version they were built from
+response_cache = ResponseCache()
+
+# Responses to POSTs sent with an Idempotency-Key, so client retries replay instead of re-running
+idempotency = IdempotencyCache(sync=backend.sync)
+
+metrics.gauge('store_records', 'Records held per collection', ('collection',), lambda: [(('items',), len(items))])
+metrics.gauge('response_cache_hits_total', 'GET responses served from the cache', (), lambda: [((), response_cache.hits)], kind='counter')
+metrics.gauge('response_cache_misses_total', 'GET responses rendered and cached', (), lambda: [((), response_cache.misses)], kind='counter')
+metrics.gauge('idempotent_replays_total', 'Retried POSTs answered from the Idempotency-Key cache', (), lambda: [((), idempotency.replays)], kind='counter')
+metrics.gauge('compressed_body_hits_total', 'Compressed bodies reused for an unchanged ETag', (), lambda: [((), compression.bodies.hits)], kind='counter')
+metrics.gauge('profiled_requests_total', 'Requests sampled by the profiler', ('route',), lambda: [((route,), count) for route, count in list(profiler.profiled.items())], kind='counter')
+
+# Largest quantity or unit_price: keeps quantity * unit_price inside the int64 columns (array 'q', SQLite INTEGER)
+MAX_AMOUNT = 10**9
+
+TYPE_ERROR = f'Invalid data type: quantity must be a positive integer, unit_price must be a positive number, neither more than {MAX_AMOUNT}'
+
+# Payload rules for add and update, compiled into one validator each at import (see utils/schema.py)
+ITEM_SCHEMA = Schema('item', {
+    'name': [Required()],
+    'unit_price': [Required(), Positive(1, max=MAX_AMOUNT, floats=True, message=TYPE_ERROR)],
+    'quantity': [Required(), Positive(1, max=MAX_AMOUNT, message=TYPE_ERROR)],
+})
+ITEM_UPDATE_SCHEMA = Schema('item update', {
+    'unit_price': [Positive(1, max=MAX_AMOUNT, floats=True, message=TYPE_ERROR)],
+    'quantity': [Positive(1, max=MAX_AMOUNT, message=TYPE_ERROR)],
+}, partial=True)
+
+
+# Shared by the single-item and bulk endpoints
+
+# Validate a new item payload; returns {field: message} for every problem found.
+# item_id lets an imported item keep its own name
+@phase('validation')
+def check_item_payload(data, item_id=None):
+    errors = ITEM_SCHEMA.validate(data)
+
+    # Check for duplicate item names (case-insensitive)
+    if 'payload' not in errors and 'name' not in errors and not items.is_unique('name', data['name'], item_id):
+        errors['name'] = f"Item with name '{data['name']}' already exists"
+    return errors
+
+# Build an Item from a validated payload (a new id unless one is given)
+def build_item(data, item_id=None):
+    return Item(
+        id=item_id if item_id is not None else items.allocate_id(),
+        name=data['name'],
+        quantity=data.get('quantity', 1),
+        unit_price=data['unit_price'],
+        description=data.get('description', ''),
+        total_price=data['quantity'] * data['unit_price']
+    )
+
+# Validate changes to an existing item and return (errors, updated copy)
+@phase('validation')
+def apply_item_changes(item, data):
+    errors = ITEM_UPDATE_SCHEMA.validate(data)
+
+    # Check for duplicate item names, allowing the item to keep its own
+    if 'payload' not in errors and "name" in data and not items.is_unique('name', data["name"], item.id):
+        errors['name'] = f"Item with name '{data['name']}' already exists"
+    if errors:
+        return errors, None
+
+    item = item.copy()
+    item.name = data.get("name", item.name)
+    item.description = data.get("description", item.description)
+    item.quantity = data.get("quantity", item.quantity)
+    item.unit_price = data.get("unit_price", item.unit_price)
+    item.total_price = item.quantity * item.unit_price
+    return errors, item
+
+# Insert or replace an item (the collection keeps its indexes in step)
+def save_item(item):
+    return items.save(item)
+
+# Remove an item; returns the item or None
+def remove_item(item_id):
+    return items.remove(item_id)
+
+
+# Unique constraints enforced by the storage backend (e.g. across worker processes)
+@app.errorhandler(DuplicateRecordError)
+def handle_duplicate_record(error):
+    return bad_request_response(str(error))
+
+# Writes that could not be made durable: the client must not take them as saved
+@app.errorhandler(DurabilityError)
+def handle_durability_error(error):
+    return make_response("error", str(error), None, 500)
+
+# Hold the response until this request's writes are durable (group commit)
+@app.after_request
+def wait_for_durable_writes(response):
+    try:
+        backend.sync()
+    except DurabilityError as error:
+        return app.make_response(handle_durability_error(error))
+    return response
 
-#in memory data store
-items = [
-        {"id": 1, "name": "Rice", "quantity": 10, "unit_price": 65000, "total_price": 650000, "description": "50kg bag of rice"},
-        {"id": 2, "name": "Salt", "quantity": 5, "unit_price": 400, "total_price": 2000, "description": "2kg dangote salt"}
-]
-item_id_counter = 1
 
 #fetch all items
 @app.route('/api/v1/item/all', methods=['GET'])
+@cached(response_cache, lambda: items.version)
 def get_items():
-    if not items:
-        return success_response("No items found", format_response(items,'items'))
-    return success_response("Items retrieved successfully", format_response(items,'items'))
+    # Opt-in streamed dump with bounded memory
+    if wants_stream(request.args):
+        return Response(stream_records(items, "Items retrieved successfully", 'item'), mimetype='application/json')
+
+    # Keyset pagination over id order when limit/cursor is given
+    limit, cursor, error = parse_page_args(request.args)
+    if error:
+        return bad_request_response(error)
+    if limit is not None:
+        with hold(read=[items]):
+            page, next_cursor = items.page(cursor, limit)
+        return paginated_response("Items retrieved successfully", format_response(page,'items'), next_cursor, limit)
+
+    # The full list is serialized from a snapshot, so writers are not held up meanwhile
+    with items.snapshot() as snapshot:
+        if not snapshot:
+            return success_response("No items found", format_response(snapshot.values(),'items'))
+        return success_response("Items retrieved successfully", format_response(snapshot.values(),'items'))
 
 
 #fetch single item by id
 @app.route('/api/v1/item/<int:item_id>', methods=['GET'])
+@cached(response_cache, lambda: items.version)
+@locked(read=[items])
 def get_item(item_id):
-    single_item = next((item for item in items if item['id'] == item_id), None)
+    single_item = items.get(item_id)
     if single_item:
         return success_response("Item retrieved successfully", format_response(single_item,'item'))
     return not_found_response(f"Item with id {item_id} not found")
@@ -32,70 +190,224 @@ def get_item(item_id):
 
 #add new item
 @app.route('/api/v1/item/add', methods=['POST'])
+@idempotent(idempotency)
+@locked(write=[items])
 def add_item():
-    global item_id_counter
     data = request.get_json()
     
-    # Validate payload
-    payload = validate_payload(data)
-    if payload:
-        return bad_request_response(payload)
-
-    # Validate required fields
-    error = validate_required_fields(data,'name') or validate_required_fields(data,'unit_price') or validate_required_fields(data,'quantity')
-    if error:
-        return bad_request_response(error)
-    
-    # Validate data types
-    if not positive_value(data['unit_price']) or not positive_integer(data['quantity']):
-        return bad_request_response('Invalid data type: quantity must be a positive integer, unit_price must be a positive number')
+    # Validate payload, fields, types and uniqueness
+    errors = check_item_payload(data)
+    if errors:
+        return validation_error_response(errors)
 
-    # Check for duplicate item names (case-insensitive)
-    if not validate_unique_field(items,'name', data['name']):
-        return bad_request_response(f"Item with name '{data['name']}' already exists")
-       
-    new_item = {
-        "id": len(items) + 1,
-        'name': data['name'],
-        'quantity': data.get('quantity', 1),
-        'unit_price': data['unit_price'],
-        'description': data.get('description', ''),
-        'total_price': data['quantity'] * data['unit_price']
-    }
-    items.append(new_item)
-    item_id_counter += 1
+    new_item = save_item(build_item(data))
 
     return success_response("New item added successfully",format_response(new_item,'item'), 200)
 
 
 # Update a item
 @app.route("/api/v1/item/<int:item_id>/update", methods=["PUT"])
+@locked(write=[items])
 def update_item(item_id):
     data = request.get_json()
-    item = next((t for t in items if t["id"] == item_id), None)
+    item = items.get(item_id)
 
     if not item:
         return not_found_response(f"Item with id {item_id} not found")
 
-    item["name"] = data.get("name", item["name"])
-    item["description"] = data.get("description", item["description"])
-    item["quantity"] = data.get("quantity", item["quantity"])
-    item["unit_price"] = data.get("unit_price", item["unit_price"])
-    item["total_price"] = item["quantity"] * item["unit_price"]
+    # Validate the changes and apply them to a copy
+    errors, item = apply_item_changes(item, data)
+    if errors:
+        return validation_error_response(errors)
+
+    save_item(item) # Save updated item
 
     return success_response("Item updated successfully",format_response(item,'item'), 200)
 
 #delete item
 @app.route('/api/v1/item/<int:item_id>/delete', methods=['DELETE'])
+@locked(write=[items])
 def delete_item(item_id):
-    global items
-
-    # Find the item
-    item_to_delete = next((item for item in items if item['id'] == item_id), None)
+    # Remove the item by id
+    item_to_delete = remove_item(item_id)
     
     if item_to_delete is None:
         return not_found_response(f"Item with id {item_id} not found")
     
-    # Remove item from list
-    items.remove(item_to_delete)
-    return success_response("Item deleted successfully")
\ No newline at end of file
+    return success_response("Item deleted successfully")
+
+
+# Bulk add items: {"items": [...], "atomic": true}
+@app.route('/api/v1/item/bulk', methods=['POST'])
+@idempotent(idempotency)
+@locked(write=[items])
+def bulk_add_items():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'items')
+    if error:
+        return bad_request_response(error)
+
+    results = run_bulk(
+        rows,
+        prepare=lambda row: (describe_errors(check_item_payload(row)), row),
+        commit=lambda row: format_response(save_item(build_item(row)),'item'),
+        unique_keys=lambda row: [('name', UniqueIndex.fold(row['name']))],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+# Bulk update items: {"items": [{"id": 1, "quantity": 4}], "atomic": true}
+@app.route('/api/v1/item/bulk', methods=['PUT'])
+@locked(write=[items])
+def bulk_update_items():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'items')
+    if error:
+        return bad_request_response(error)
+
+    def prepare(row):
+        if not isinstance(row, dict) or not isinstance(row.get('id'), int) or row['id'] not in items:
+            return f"Item with id {row.get('id') if isinstance(row, dict) else row} not found", None
+        errors, item = apply_item_changes(items.get(row['id']), row)
+        return describe_errors(errors), item
+
+    def unique_keys(row):
+        keys = [('id', row['id'])]
+        if 'name' in row:
+            keys.append(('name', UniqueIndex.fold(row['name'])))
+        return keys
+
+    results = run_bulk(
+        rows,
+        prepare=prepare,
+        commit=lambda item: format_response(save_item(item),'item'),
+        unique_keys=unique_keys,
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+# Bulk delete items: {"ids": [1, 2], "atomic": true}
+@app.route('/api/v1/item/bulk', methods=['DELETE'])
+@locked(write=[items])
+def bulk_delete_items():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'ids')
+    if error:
+        return bad_request_response(error)
+
+    def prepare(item_id):
+        if not isinstance(item_id, int) or isinstance(item_id, bool) or item_id not in items:
+            return f"Item with id {item_id} not found", None
+        return None, item_id
+
+    results = run_bulk(
+        rows,
+        prepare=prepare,
+        commit=lambda item_id: {'id': remove_item(item_id).id},
+        unique_keys=lambda item_id: [('id', item_id)],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+# Inventory valuation: count, quantity and sum/min/max/mean of total_price
+@app.route('/api/v1/item/stats', methods=['GET'])
+@cached(response_cache, lambda: items.version)
+@locked(read=[items])
+def get_item_stats():
+    return success_response("Inventory statistics retrieved successfully", item_columns.summary())
+
+
+# Items whose quantity is below a threshold
+@app.route('/api/v1/item/low-stock', methods=['GET'])
+@cached(response_cache, lambda: items.version)
+@locked(read=[items])
+def get_low_stock_items():
+    threshold = request.args.get('threshold', type=int)
+    if threshold is None:
+        return bad_request_response("threshold query parameter is required and must be an integer")
+
+    matches = [items.get(item_id) for item_id in item_columns.below_quantity(threshold)]
+    return success_response(f"Items with quantity below {threshold} retrieved successfully", format_response(matches,'items'))
+
+
+# Items whose unit price lies within [min, max]
+@app.route('/api/v1/item/price-range', methods=['GET'])
+@cached(response_cache, lambda: items.version)
+@locked(read=[items])
+def get_items_in_price_range():
+    low = request.args.get('min', 0, type=float)
+    high = request.args.get('max', float('inf'), type=float)
+    if low > high:
+        return bad_request_response("min cannot be greater than max")
+
+    matches = [items.get(item_id) for item_id in item_columns.price_between(low, high)]
+    return success_response("Items in price range retrieved successfully", format_response(matches,'items'))
+
+
+# Items whose name contains q (or starts with it, with mode=prefix), in id order
+@app.route('/api/v1/item/search', methods=['GET'])
+@cached(response_cache, lambda: items.version)
+@locked(read=[items])
+def search_items():
+    q, prefix, error = parse_text_query(request.args)
+    if error:
+        return bad_request_response(error)
+
+    # Keyset pagination: pass next_cursor back as cursor
+    limit, cursor, error = parse_page_args(request.args)
+    if error:
+        return bad_request_response(error)
+    limit = limit or DEFAULT_PAGE_SIZE
+
+    item_ids, next_cursor = item_names.search(q, prefix, cursor, limit)
+    matches = [item for item in map(items.get, item_ids) if item is not None]
+    return paginated_response("Items retrieved successfully", format_response(matches, 'items'), next_cursor, limit)
+
+
+# Export every item as NDJSON (default) or CSV: ?format=ndjson|csv
+@app.route('/api/v1/item/export', methods=['GET'])
+def export_items():
+    fmt, error = parse_transfer_format(request.args)
+    if error:
+        return bad_request_response(error)
+    return Response(export_records(items, 'item', fmt), mimetype=TRANSFER_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=items.{fmt}'})
+
+
+# Import items from an NDJSON or CSV upload (format from ?format= or Content-Type).
+# Rows with an id restore that item; rows without one are added with a new id.
+@app.route('/api/v1/item/import', methods=['POST'])
+def import_items():
+    fmt, error = parse_transfer_format(request.args, request.content_type)
+    if error:
+        return bad_request_response(error)
+
+    def prepare(row):
+        item_id, error = parse_import_id(row)
+        return error or describe_errors(check_item_payload(row, item_id)), (item_id, row)
+
+    def commit(prepared):
+        item_id, row = prepared
+        item = build_item(row, item_id)
+        return {'id': (save_item(item) if item_id is None else items.restore(item)).id}
+
+    def unique_keys(row):
+        keys = [('name', UniqueIndex.fold(row['name']))]
+        if row.get('id') is not None:
+            keys.append(('id', row['id']))
+        return keys
+
+    # The write lock is taken per chunk, so reads and writes interleave with a long upload
+    def apply_chunk(rows):
+        with hold(write=[items]):
+            return run_bulk(rows, prepare=prepare, commit=commit, unique_keys=unique_keys, atomic=False)
+
+    columns = {'id': int, 'quantity': number, 'unit_price': number, 'total_price': number}
+    return import_response(import_rows(read_rows(request.stream, fmt, columns), apply_chunk))
+
+
+# Changes to items after seq N, for delta sync: ?since=N&limit=&wait=seconds,
+# or Server-Sent Events with Accept: text/event-stream (see utils/changes.py)
+@app.route('/api/v1/changes', methods=['GET'])
+def get_changes():
+    return changes_response(change_feed, CHANGE_SOURCES, request)
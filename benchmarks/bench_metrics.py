@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: per-request cost of the /metrics instrumentation. One
+simulated request = start timer, a validation call that does a point
+lookup (unwrapped, as instrument_store leaves it), a store write, a
+serialize call, finish timer; compared with the same calls unwrapped.
+
+    python benchmarks/bench_metrics.py [--requests 200000] [--threads 1] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import Metrics, phase  # noqa: E402
+
+
+def lookup():
+    return None
+
+
+def write():
+    return None
+
+
+def validate(lookup):
+    return lookup()
+
+
+def serialize():
+    return None
+
+
+timed_write = phase('store')(write)
+timed_validate = phase('validation')(validate)
+timed_serialize = phase('serialize')(serialize)
+
+
+def bare_requests(count):
+    for _ in range(count):
+        validate(lookup)
+        write()
+        serialize()
+
+
+def instrumented_requests(metrics, count):
+    for number in range(count):
+        metrics.start_request()
+        timed_validate(lookup)
+        timed_write()
+        timed_serialize()
+        metrics.finish_request('/api/v1/task/add', 'POST', 201 if number % 10 else 400)
+
+
+def timed(threads, target):
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5, help='best of this many runs each')
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    per_thread = args.requests // args.threads
+    bare = min(timed(args.threads, lambda: bare_requests(per_thread)) for _ in range(args.repeat))
+    instrumented = min(timed(args.threads, lambda: instrumented_requests(metrics, per_thread)) for _ in range(args.repeat))
+    total = per_thread * args.threads
+
+    width = metrics.stats.width
+    count = sum(sum(series[:width - 1]) for series in metrics.stats.collect().values())
+    assert count == total * args.repeat, 'lost observations'
+    start = time.perf_counter()
+    metrics.render()
+    print(json.dumps({
+        'requests': total,
+        'threads': args.threads,
+        'overhead_us_per_request': round((instrumented - bare) / total * 1e6, 3),
+        'render_ms': round((time.perf_counter() - start) * 1e3, 3),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Micro-benchmark: per-request validation cost of the chained validator
+calls the handlers used before versus the compiled schemas, for valid
+and invalid user and task payloads (uniqueness checks excluded).
+
+The legacy checks stop at the first error while the schemas check every
+field, so on invalid payloads `legacy_us` is less work than `compiled_us`;
+`legacy_all_us` runs the same legacy checks over every field, which is
+the like-for-like cost of reporting all errors the old way.
+
+    python benchmarks/bench_validation.py [--requests 100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskManagerApp import DURATION_ERROR, PHONE_ERROR, TASK_SCHEMA, USER_SCHEMA  # noqa: E402
+from utils.validators import positive_integer, validate_field_length, validate_payload, validate_required_fields  # noqa: E402
+
+
+# The email and phone checks as they were: re.match on the raw pattern, startswith over a list
+def legacy_validate_email(email):
+    return bool(re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email))
+
+
+def legacy_validate_phone(phone):
+    return (phone.isdigit() and len(phone) >= 11) and any(
+        phone.startswith(prefix) for prefix in ['070', '080', '090', '081', '091'])
+
+
+# check_user_payload before the schema layer (stops at the first error)
+def legacy_check_user(data):
+    error = validate_payload(data)
+    if error:
+        return error
+    error = validate_required_fields(data, 'firstName') or validate_required_fields(data, 'lastName') or validate_required_fields(data, 'email') or validate_required_fields(data, 'phone') or validate_field_length(data, 'firstName') or validate_field_length(data, 'lastName')
+    if error:
+        return error
+    if not legacy_validate_email(data['email']):
+        return "Invalid email format"
+    if not legacy_validate_phone(data['phone']):
+        return PHONE_ERROR
+    return None
+
+
+# check_task_payload before the schema layer
+def legacy_check_task(data):
+    error = validate_payload(data)
+    if error:
+        return error
+    error = validate_required_fields(data, 'title') or validate_required_fields(data, 'description') or validate_required_fields(data, 'duration') or validate_field_length(data, 'title')
+    if error:
+        return error
+    user_id = data.get('user_id')
+    if user_id is not None and (not isinstance(user_id, int) or isinstance(user_id, bool)):
+        return "user_id must be an integer"
+    if not positive_integer(data['duration']):
+        return DURATION_ERROR
+    return None
+
+
+# The legacy checks applied to every field, collecting one error per field like the schemas do
+def legacy_all_user(data):
+    error = validate_payload(data)
+    if error:
+        return {'payload': error}
+    errors = {}
+    for field in ('firstName', 'lastName'):
+        error = validate_required_fields(data, field) or validate_field_length(data, field)
+        if error:
+            errors[field] = error
+    error = validate_required_fields(data, 'email') or (not legacy_validate_email(data['email']) and "Invalid email format")
+    if error:
+        errors['email'] = error
+    error = validate_required_fields(data, 'phone') or (not legacy_validate_phone(data['phone']) and PHONE_ERROR)
+    if error:
+        errors['phone'] = error
+    return errors
+
+
+def legacy_all_task(data):
+    error = validate_payload(data)
+    if error:
+        return {'payload': error}
+    errors = {}
+    error = validate_required_fields(data, 'title') or validate_field_length(data, 'title')
+    if error:
+        errors['title'] = error
+    error = validate_required_fields(data, 'description')
+    if error:
+        errors['description'] = error
+    error = validate_required_fields(data, 'duration') or (not positive_integer(data['duration']) and DURATION_ERROR)
+    if error:
+        errors['duration'] = error
+    user_id = data.get('user_id')
+    if user_id is not None and (not isinstance(user_id, int) or isinstance(user_id, bool)):
+        errors['user_id'] = "user_id must be an integer"
+    return errors
+
+
+CASES = {
+    'user_valid': ({'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'ada@example.com', 'phone': '08012345678'},
+                   legacy_check_user, legacy_all_user, USER_SCHEMA.validate),
+    'user_invalid': ({'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'ada@example', 'phone': '06012345678'},
+                     legacy_check_user, legacy_all_user, USER_SCHEMA.validate),
+    'task_valid': ({'title': 'Report', 'description': 'Write the weekly report', 'duration': 30, 'user_id': 4},
+                   legacy_check_task, legacy_all_task, TASK_SCHEMA.validate),
+    'task_invalid': ({'title': 'Re', 'description': '', 'duration': 0},
+                     legacy_check_task, legacy_all_task, TASK_SCHEMA.validate),
+}
+
+
+def per_call(fn, payload, requests, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    report = {'requests': args.requests}
+    for name, (payload, legacy, legacy_all, compiled) in CASES.items():
+        # All three agree on whether the payload is valid, and the full checks on which fields are not
+        assert (legacy(payload) is None) == (not compiled(payload)), name
+        assert legacy_all(payload).keys() == compiled(payload).keys(), name
+        old = per_call(legacy, payload, args.requests, args.repeat)
+        old_all = per_call(legacy_all, payload, args.requests, args.repeat)
+        new = per_call(compiled, payload, args.requests, args.repeat)
+        report[name] = {
+            'legacy_us': round(old * 1e6, 3),
+            'legacy_all_us': round(old_all * 1e6, 3),
+            'compiled_us': round(new * 1e6, 3),
+            'speedup': round(old / new, 2),
+            'speedup_all': round(old_all / new, 2),
+            'errors_reported': len(compiled(payload)),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
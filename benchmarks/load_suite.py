@@ -0,0 +1,413 @@
+"""
+Load benchmark for both apps: pre-populate users, tasks and items, drive
+a seeded mixed read/write workload across every route, and report ops/s,
+p50/p99 latency per route and peak RSS as JSON.
+
+    python benchmarks/load_suite.py run [--scale 1k|100k|1m] [--ops 20000] [--threads 4]
+                                        [--workload mixed|read|write] [--server] [--seed 1]
+                                        [--output result.json] [--baseline baseline.json]
+    python benchmarks/load_suite.py compare baseline.json result.json [--tolerance 0.2]
+
+By default requests go through the Flask test client; --server runs each
+app on a local threaded WSGI server and sends real HTTP requests.
+`compare` (or `run --baseline`) exits non-zero when any route's p50, p99 or
+throughput is worse than the baseline by more than the tolerance.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from itertools import count
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep benchmark data out of the real SQLite file / write-ahead log directory
+SCRATCH = tempfile.mkdtemp(prefix='load-suite-')
+if os.environ.get('STORAGE_BACKEND') == 'sqlite':
+    os.environ['SQLITE_PATH'] = os.path.join(SCRATCH, 'bench.db')
+if os.environ.get('WAL_DIR'):
+    os.environ['WAL_DIR'] = SCRATCH
+
+import app as stock_app  # noqa: E402
+import taskManagerApp as task_app  # noqa: E402
+from utils.records import Item, Task, TaskStatus, User, now_timestamp  # noqa: E402
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+BULK_ROWS = 50
+
+
+# Alphabetic token for a number (titles and names must be letters only)
+def letters(number):
+    return ''.join(chr(97 + int(digit)) for digit in str(number))
+
+
+def seed_user(i):
+    return User(id=i, firstName='Load', lastName='User' + letters(i), email=f'user{i}@example.com', phone='080%08d' % i)
+
+
+# Fill the collections directly: bulk load() on the memory backend, one seeding transaction on SQLite
+def populate(size, rng):
+    now = now_timestamp()
+    users = [seed_user(i) for i in range(1, size + 1)]
+    tasks = [Task(id=i, user_id=rng.randint(1, size), title='Task' + letters(i), description='Seeded task', status=TaskStatus.PENDING,
+                  duration=30, created_at=now, updated_at=None, completed_at=None) for i in range(1, size + 1)]
+    items = []
+    for i in range(1, size + 1):
+        quantity, unit_price = rng.randint(1, 1000), float(rng.randint(1, 500))
+        items.append(Item(id=i, name=f'Stock{i}', quantity=quantity, unit_price=unit_price,
+                          total_price=quantity * unit_price, description='Seeded item'))
+    for collection, records in ((task_app.users, users), (task_app.tasks, tasks), (stock_app.items, items)):
+        if hasattr(collection, 'load'):
+            collection.load(records, size + 1)
+        else:
+            # Drop the apps' demo rows so seed() sees an empty table
+            for record in list(collection.values()):
+                collection.remove(record.id)
+            collection.seed(records)
+    # load() bypasses listeners, so refresh what the memory backend derives from saves
+    if hasattr(stock_app.items, 'load'):
+        for item in items:
+            stock_app.item_columns.set(item)
+        stock_app.item_names.rebuild()
+        task_app.task_index.titles.rebuild()
+        task_app.task_index.rebuild()
+        task_app.task_stats.rebuild()
+
+
+# Shared between worker threads: fresh unique names and the ids created by the run
+class WorkloadState:
+    def __init__(self, size):
+        self.size = size
+        self.serial = count(size + 1)
+        self.lock = threading.Lock()
+        self.created = {'item': [], 'user': [], 'task': []}
+
+    def new_id(self):
+        return next(self.serial)
+
+    def remember(self, kind, record_id):
+        with self.lock:
+            self.created[kind].append(record_id)
+
+    def take(self, kind, limit=1):
+        with self.lock:
+            pool = self.created[kind]
+            taken = pool[-limit:]
+            del pool[-limit:]
+        return taken
+
+
+# Each operation returns (app, method, path, body, kind created or None); ids are seeded (1..size) unless noted
+def new_item(state):
+    n = state.new_id()
+    return {'name': f'LoadItem{n}', 'quantity': 1 + n % 50, 'unit_price': 10.5}
+
+
+def new_user(state):
+    n = state.new_id()
+    return {'firstName': 'Load', 'lastName': 'Runner', 'email': f'load{n}@example.com', 'phone': '090%08d' % n}
+
+
+def new_task(state):
+    return {'title': 'Load' + letters(state.new_id()), 'description': 'Benchmark task', 'duration': 30}
+
+
+# Delete a record this run created, or create one first when none are left
+def delete_or_create(module, kind, state, path, create):
+    taken = state.take(kind)
+    if taken:
+        return module, 'DELETE', path.format(taken[0]), None, None
+    return module, 'POST', path.rsplit('/', 2)[0] + '/add', create(state), kind
+
+
+# Bulk variant: delete up to BULK_ROWS created ids, or bulk-create rows when none are left
+def bulk_delete_or_create(module, kind, state, create):
+    path = f'/api/v1/{kind}/bulk'
+    taken = state.take(kind, BULK_ROWS)
+    if taken:
+        return module, 'DELETE', path, {'ids': taken}, None
+    return module, 'POST', path, {kind + 's': [create(state) for _ in range(BULK_ROWS)]}, None
+
+
+OPERATIONS = {
+    # Stock Manager
+    'GET /api/v1/item/all': ('read', 5, lambda s, r: (stock_app, 'GET', f'/api/v1/item/all?limit=100&cursor={r.randint(0, s.size)}', None, None)),
+    'GET /api/v1/item/<id>': ('read', 10, lambda s, r: (stock_app, 'GET', f'/api/v1/item/{r.randint(1, s.size)}', None, None)),
+    'GET /api/v1/item/stats': ('read', 2, lambda s, r: (stock_app, 'GET', '/api/v1/item/stats', None, None)),
+    'GET /api/v1/item/low-stock': ('read', 2, lambda s, r: (stock_app, 'GET', '/api/v1/item/low-stock?threshold=3', None, None)),
+    'GET /api/v1/item/price-range': ('read', 2, lambda s, r: (stock_app, 'GET', f'/api/v1/item/price-range?min={(low := r.randint(1, 499))}&max={low + 1}', None, None)),
+    'GET /api/v1/item/search': ('read', 3, lambda s, r: (stock_app, 'GET', f'/api/v1/item/search?q=stock{r.randint(1, 999)}&limit=20', None, None)),
+    'POST /api/v1/item/add': ('write', 3, lambda s, r: (stock_app, 'POST', '/api/v1/item/add', new_item(s), 'item')),
+    'PUT /api/v1/item/<id>/update': ('write', 3, lambda s, r: (stock_app, 'PUT', f'/api/v1/item/{r.randint(1, s.size)}/update', {'quantity': r.randint(1, 1000)}, None)),
+    'DELETE /api/v1/item/<id>/delete': ('write', 2, lambda s, r: delete_or_create(stock_app, 'item', s, '/api/v1/item/{}/delete', new_item)),
+    'POST /api/v1/item/bulk': ('write', 1, lambda s, r: (stock_app, 'POST', '/api/v1/item/bulk', {'items': [new_item(s) for _ in range(BULK_ROWS)]}, None)),
+    'PUT /api/v1/item/bulk': ('write', 1, lambda s, r: (stock_app, 'PUT', '/api/v1/item/bulk',
+                                                        {'items': [{'id': i, 'quantity': r.randint(1, 1000)} for i in r.sample(range(1, s.size + 1), min(BULK_ROWS, s.size))]}, None)),
+    'DELETE /api/v1/item/bulk': ('write', 1, lambda s, r: bulk_delete_or_create(stock_app, 'item', s, new_item)),
+
+    # Task Manager: users
+    'GET /api/v1/user/all': ('read', 5, lambda s, r: (task_app, 'GET', f'/api/v1/user/all?limit=100&cursor={r.randint(0, s.size)}', None, None)),
+    'GET /api/v1/user/<id>/fetch': ('read', 10, lambda s, r: (task_app, 'GET', f'/api/v1/user/{r.randint(1, s.size)}/fetch', None, None)),
+    'GET /api/v1/user/<id>/tasks': ('read', 5, lambda s, r: (task_app, 'GET', f'/api/v1/user/{r.randint(1, s.size)}/tasks', None, None)),
+    'POST /api/v1/user/add': ('write', 3, lambda s, r: (task_app, 'POST', '/api/v1/user/add', new_user(s), 'user')),
+    'PUT /api/v1/user/<id>/update': ('write', 2, lambda s, r: (task_app, 'PUT', f'/api/v1/user/{(i := r.randint(1, s.size))}/update',
+                                                               {'firstName': 'Load', 'lastName': 'Updated', 'email': seed_user(i).email, 'phone': seed_user(i).phone}, None)),
+    'DELETE /api/v1/user/<id>/delete': ('write', 2, lambda s, r: delete_or_create(task_app, 'user', s, '/api/v1/user/{}/delete', new_user)),
+    'POST /api/v1/user/bulk': ('write', 1, lambda s, r: (task_app, 'POST', '/api/v1/user/bulk', {'users': [new_user(s) for _ in range(BULK_ROWS)]}, None)),
+    'PUT /api/v1/user/bulk': ('write', 1, lambda s, r: (task_app, 'PUT', '/api/v1/user/bulk', {'users': [
+        {'id': i, 'firstName': 'Bulk', 'lastName': 'Updated', 'email': seed_user(i).email, 'phone': seed_user(i).phone}
+        for i in r.sample(range(1, s.size + 1), min(BULK_ROWS, s.size))]}, None)),
+    'DELETE /api/v1/user/bulk': ('write', 1, lambda s, r: bulk_delete_or_create(task_app, 'user', s, new_user)),
+
+    # Task Manager: tasks
+    'GET /api/v1/task/all': ('read', 5, lambda s, r: (task_app, 'GET', f'/api/v1/task/all?limit=100&cursor={r.randint(0, s.size)}', None, None)),
+    'GET /api/v1/task/<id>/fetch': ('read', 10, lambda s, r: (task_app, 'GET', f'/api/v1/task/{r.randint(1, s.size)}/fetch', None, None)),
+    'GET /api/v1/task/search': ('read', 5, lambda s, r: (task_app, 'GET', r.choice(SEARCHES).format(user_id=r.randint(1, s.size), title=letters(r.randint(1, 99))), None, None)),
+    'GET /api/v1/task/stats': ('read', 3, lambda s, r: (task_app, 'GET', r.choice(('/api/v1/task/stats', f'/api/v1/task/stats?user_id={r.randint(1, s.size)}')), None, None)),
+    'GET /api/v1/changes': ('read', 3, lambda s, r: (task_app, 'GET', f'/api/v1/changes?since={task_app.change_feed.latest()}', None, None)),
+    'POST /api/v1/task/add': ('write', 3, lambda s, r: (task_app, 'POST', '/api/v1/task/add', new_task(s), 'task')),
+    'PUT /api/v1/task/<id>/update': ('write', 3, lambda s, r: (task_app, 'PUT', f'/api/v1/task/{r.randint(1, s.size)}/update', {'duration': r.randint(5, 120)}, None)),
+    'PUT /api/v1/task/<id>/assign/<user_id>': ('write', 2, lambda s, r: (task_app, 'PUT', f'/api/v1/task/{r.randint(1, s.size)}/assign/{r.randint(1, s.size)}', None, None)),
+    'PUT /api/v1/task/<id>/status/update': ('write', 2, lambda s, r: (task_app, 'PUT', f'/api/v1/task/{(s.take("task") or [r.randint(1, s.size)])[0]}/status/update',
+                                                                      {'status': 'in-progress'}, None)),
+    'DELETE /api/v1/task/<id>/delete': ('write', 2, lambda s, r: delete_or_create(task_app, 'task', s, '/api/v1/task/{}/delete', new_task)),
+    'POST /api/v1/task/bulk': ('write', 1, lambda s, r: (task_app, 'POST', '/api/v1/task/bulk', {'tasks': [new_task(s) for _ in range(BULK_ROWS)]}, None)),
+    'PUT /api/v1/task/bulk': ('write', 1, lambda s, r: (task_app, 'PUT', '/api/v1/task/bulk', {'tasks': [
+        {'id': i, 'duration': r.randint(5, 120)} for i in r.sample(range(1, s.size + 1), min(BULK_ROWS, s.size))]}, None)),
+    'DELETE /api/v1/task/bulk': ('write', 1, lambda s, r: bulk_delete_or_create(task_app, 'task', s, new_task)),
+}
+
+# Task searches drawn at random: indexed filter, user filter, date range and a full sort
+SEARCHES = (
+    '/api/v1/task/search?status=in-progress&sort=-created_at&limit=20',
+    '/api/v1/task/search?user_id={user_id}&status=pending',
+    '/api/v1/task/search?created_from=2000-01-01&min_duration=20&limit=50',
+    '/api/v1/task/search?status=pending&sort=duration&limit=20',
+    '/api/v1/task/search?q=task{title}&mode=prefix&limit=20',
+)
+
+# Weight multipliers per workload: (reads, writes)
+WORKLOADS = {'mixed': (1, 1), 'read': (1, 0), 'write': (0, 1)}
+
+
+# Sends requests through the Flask test client
+class TestClientTransport:
+    def __init__(self):
+        self.clients = {module: module.app.test_client() for module in (stock_app, task_app)}
+
+    def send(self, module, method, path, body):
+        response = self.clients[module].open(path, method=method, json=body)
+        payload = response.get_json(silent=True)
+        return response.status_code, payload
+
+
+# Sends real HTTP requests to each app on a local threaded WSGI server (one keep-alive connection per thread)
+class ServerTransport:
+    servers = {}
+
+    @classmethod
+    def start(cls):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_request(self, *args):
+                pass
+
+        for module in (stock_app, task_app):
+            server = make_server('127.0.0.1', 0, module.app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            cls.servers[module] = server
+
+    @classmethod
+    def stop(cls):
+        for server in cls.servers.values():
+            server.shutdown()
+
+    def __init__(self):
+        self.connections = {module: http.client.HTTPConnection('127.0.0.1', server.server_port)
+                            for module, server in self.servers.items()}
+
+    def send(self, module, method, path, body):
+        connection = self.connections[module]
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = None
+        return response.status, payload
+
+
+# Run `ops` operations spread over `threads` workers; returns per-route latencies and status counts
+def drive(state, plan, transport_class, threads, ops, seed):
+    results = {name: {'latencies': [], 'statuses': {}} for name in plan}
+    lock = threading.Lock()
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        transport = transport_class()
+        names, weights = zip(*plan.items())
+        local = {name: ([], {}) for name in plan}
+        for name in rng.choices(names, weights, k=ops // threads):
+            module, method, path, body, creates = OPERATIONS[name][2](state, rng)
+            started = time.perf_counter()
+            status, payload = transport.send(module, method, path, body)
+            elapsed = time.perf_counter() - started
+            # A delete that fell back to creating is reported under the add route
+            latencies, statuses = local[name if name.startswith(method) else f'{method} {path}']
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            if creates and status in (200, 201):
+                state.remember(creates, payload['data']['id'])
+        with lock:
+            for name, (latencies, statuses) in local.items():
+                results[name]['latencies'].extend(latencies)
+                for status, seen in statuses.items():
+                    results[name]['statuses'][status] = results[name]['statuses'].get(status, 0) + seen
+
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(latencies, elapsed):
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    cuts = quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else [ordered[0]] * 99
+    return {
+        'requests': len(ordered),
+        'ops_per_sec': round(len(ordered) / elapsed, 1),
+        'p50_ms': round(cuts[49] * 1e3, 3),
+        'p99_ms': round(cuts[98] * 1e3, 3),
+        'max_ms': round(ordered[-1] * 1e3, 3),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run(args):
+    size = SCALES[args.scale]
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    populate(size, rng)
+    populate_seconds = time.perf_counter() - started
+
+    reads, writes = WORKLOADS[args.workload]
+    plan = {name: weight * (reads if kind == 'read' else writes) for name, (kind, weight, _) in OPERATIONS.items()}
+    plan = {name: weight for name, weight in plan.items() if weight}
+
+    transport = TestClientTransport
+    if args.server:
+        ServerTransport.start()
+        transport = ServerTransport
+    try:
+        results, elapsed = drive(WorkloadState(size), plan, transport, args.threads, args.ops, args.seed)
+    finally:
+        if args.server:
+            ServerTransport.stop()
+
+    routes = {}
+    for name, result in results.items():
+        summary = summarize(result['latencies'], elapsed)
+        if summary:
+            summary['statuses'] = {str(status): seen for status, seen in sorted(result['statuses'].items())}
+            routes[name] = summary
+    everything = [latency for result in results.values() for latency in result['latencies']]
+    return {
+        'config': {'scale': args.scale, 'records_per_collection': size, 'ops': args.ops, 'threads': args.threads,
+                   'workload': args.workload, 'transport': 'server' if args.server else 'test-client', 'seed': args.seed,
+                   'python': platform.python_version(), 'storage': os.environ.get('STORAGE_BACKEND', 'memory')},
+        'populate_seconds': round(populate_seconds, 2),
+        'elapsed_seconds': round(elapsed, 2),
+        'total': summarize(everything, elapsed),
+        'peak_rss_mb': peak_rss_mb(),
+        'routes': routes,
+    }
+
+
+# Routes (and the total) whose p50/p99 rose or throughput fell by more than `tolerance`
+def compare(baseline, current, tolerance):
+    regressions = []
+    pairs = [('total', baseline.get('total'), current.get('total'))]
+    pairs += [(name, baseline['routes'].get(name), current['routes'].get(name)) for name in sorted(current['routes'])]
+    for name, before, after in pairs:
+        if not before or not after:
+            continue
+        if after['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {before['p50_ms']}ms -> {after['p50_ms']}ms")
+        if after['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']}ms -> {after['p99_ms']}ms")
+        if after['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: ops/s {before['ops_per_sec']} -> {after['ops_per_sec']}")
+    if current['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']}MB -> {current['peak_rss_mb']}MB")
+    if baseline.get('config') != current.get('config'):
+        print('warning: baseline was recorded with a different config', file=sys.stderr)
+    return regressions
+
+
+def report_regressions(regressions):
+    for regression in regressions:
+        print('REGRESSION:', regression, file=sys.stderr)
+    print('no regressions' if not regressions else f'{len(regressions)} regressions', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='populate, drive the workload and print the JSON report')
+    run_parser.add_argument('--scale', choices=SCALES, default='1k')
+    run_parser.add_argument('--ops', type=int, default=20_000)
+    run_parser.add_argument('--threads', type=int, default=4)
+    run_parser.add_argument('--workload', choices=WORKLOADS, default='mixed')
+    run_parser.add_argument('--server', action='store_true', help='use a local WSGI server instead of the test client')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--output', help='also write the report to this file')
+    run_parser.add_argument('--baseline', help='compare against a stored report')
+    run_parser.add_argument('--tolerance', type=float, default=0.2)
+
+    compare_parser = commands.add_parser('compare', help='compare two stored reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as baseline, open(args.current) as current:
+            sys.exit(report_regressions(compare(json.load(baseline), json.load(current), args.tolerance)))
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            sys.exit(report_regressions(compare(json.load(baseline), report, args.tolerance)))
+
+
+if __name__ == '__main__':
+    main()
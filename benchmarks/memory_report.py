@@ -0,0 +1,76 @@
+"""
+Memory report: bytes per task stored as a plain dict (ISO strings, str
+status) versus the slotted Task record (epoch ints, TaskStatus).
+
+    python benchmarks/memory_report.py [--records 1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.records import Task, TaskStatus, format_timestamp, now_timestamp  # noqa: E402
+
+
+def dict_task(i, now):
+    return {
+        'id': i,
+        'user_id': i % 1000 or None,
+        'title': f'Task{i}',
+        'description': f'Description for task {i}',
+        'status': 'completed' if i % 3 == 0 else 'pending',
+        'duration': 30 + i % 60,
+        'created_at': format_timestamp(now + i),
+        'updated_at': format_timestamp(now + i + 1),
+        'completed_at': format_timestamp(now + i + 2) if i % 3 == 0 else None,
+    }
+
+
+def record_task(i, now):
+    return Task(
+        id=i,
+        user_id=i % 1000 or None,
+        title=f'Task{i}',
+        description=f'Description for task {i}',
+        status=TaskStatus.COMPLETED if i % 3 == 0 else TaskStatus.PENDING,
+        duration=30 + i % 60,
+        created_at=now + i,
+        updated_at=now + i + 1,
+        completed_at=now + i + 2 if i % 3 == 0 else None,
+    )
+
+
+# Bytes allocated to hold `count` tasks in an id -> task dict
+def measure(build, count):
+    now = now_timestamp()
+    gc.collect()
+    tracemalloc.start()
+    store = {i: build(i, now) for i in range(1, count + 1)}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    gc.collect()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    before = measure(dict_task, args.records)
+    after = measure(record_task, args.records)
+    print(json.dumps({
+        'records': args.records,
+        'dict_bytes_per_record': round(before / args.records, 1),
+        'slotted_bytes_per_record': round(after / args.records, 1),
+        'saved_percent': round(100 * (before - after) / before, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Multi-threaded stress run against both apps through the Flask test client.
+Threads race to create overlapping names/emails, update, delete and read;
+afterwards the stores are checked for duplicate ids, lost writes and
+index drift. Exits non-zero on any violation.
+
+    python benchmarks/stress_store.py [--threads 16] [--ops 300]
+"""
+import argparse
+import os
+import sys
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as stock_app  # noqa: E402
+import taskManagerApp as task_app  # noqa: E402
+
+
+def run_threads(count, target):
+    errors = []
+
+    def guarded(worker):
+        try:
+            target(worker)
+        except Exception as exc:  # surface failures from worker threads
+            errors.append(repr(exc))
+
+    threads = [threading.Thread(target=guarded, args=(worker,)) for worker in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def stress_items(threads, ops):
+    client_for = threading.local()
+    created = Counter()
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        client = client_for.__dict__.setdefault('client', stock_app.app.test_client())
+        for op in range(ops):
+            # Every name is attempted by every thread; exactly one may win
+            name = f'Stock{op}'
+            response = client.post('/api/v1/item/add', json={'name': name, 'quantity': 1, 'unit_price': 10})
+            if response.status_code == 200:
+                with lock:
+                    created[name] += 1
+                item_id = response.get_json()['data']['id']
+                client.put(f'/api/v1/item/{item_id}/update', json={'quantity': worker_id + 1})
+            client.get('/api/v1/item/all?limit=50')
+            client.get(f'/api/v1/item/search?q=stock{op % 10}&limit=20')
+
+    errors = run_threads(threads, worker)
+    items = stock_app.items
+    ids = [item.id for item in items.values()]
+    errors += [f'name {name} created {n} times' for name, n in created.items() if n != 1]
+    if len(ids) != len(set(ids)):
+        errors.append('duplicate item ids')
+    if stock_app.item_columns.summary()['count'] != len(items):
+        errors.append('item columns out of step with the store')
+    errors += items.check() + stock_app.item_names.check()
+    return errors
+
+
+def stress_tasks(threads, ops):
+    client_for = threading.local()
+
+    def worker(worker_id):
+        client = client_for.__dict__.setdefault('client', task_app.app.test_client())
+        for op in range(ops):
+            phone = '080%08d' % op
+            response = client.post('/api/v1/user/add', json={
+                'firstName': 'Load', 'lastName': 'Test', 'email': f'user{op}@example.com', 'phone': phone})
+            user_id = response.get_json()['data']['id'] if response.status_code == 201 else None
+            title = 'Task' + ''.join(chr(97 + int(d)) for d in str(worker_id * ops + op))
+            response = client.post('/api/v1/task/add', json={'title': title, 'description': 'load', 'duration': 10})
+            if response.status_code == 201 and user_id:
+                client.put(f"/api/v1/task/{response.get_json()['data']['id']}/assign/{user_id}")
+            if user_id and op % 3 == 0:
+                client.delete(f'/api/v1/user/{user_id}/delete')
+            if response.status_code == 201 and op % 4 == 0:
+                client.put(f"/api/v1/task/{response.get_json()['data']['id']}/status/update", json={'status': 'completed'})
+            client.get('/api/v1/task/all?limit=50')
+            client.get('/api/v1/task/search?status=completed&sort=-completed_at&limit=20')
+            client.get('/api/v1/task/search?q=task&mode=prefix&limit=20')
+            client.get('/api/v1/task/stats')
+
+    errors = run_threads(threads, worker)
+    users, tasks = task_app.users, task_app.tasks
+    emails = Counter(user.email for user in users.values())
+    errors += [f'email {email} stored {n} times' for email, n in emails.items() if n > 1]
+    if len(tasks) != threads * ops:
+        errors.append(f'expected {threads * ops} tasks, found {len(tasks)} (lost writes)')
+    errors += users.check() + tasks.check() + task_app.task_index.check() + task_app.task_index.titles.check() + task_app.task_stats.check()
+    errors += [f'task {task.id} points at deleted user {task.user_id}' for task in tasks.values()
+               if task.user_id is not None and task.user_id not in users]
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=300)
+    args = parser.parse_args()
+
+    # Switch to a short interval so threads interleave aggressively
+    sys.setswitchinterval(1e-6)
+    errors = stress_items(args.threads, args.ops) + stress_tasks(args.threads, args.ops)
+    for error in errors[:50]:
+        print('FAIL:', error)
+    print('ok' if not errors else f'{len(errors)} violations')
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Write-ahead log benchmark: write throughput with group commit, then
+restart time from a snapshot of `--records` tasks plus a log tail of
+`--tail` changes.
+
+    python benchmarks/wal_startup.py [--records 1000000] [--tail 10000] [--threads 8]
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.backends import COLLECTIONS  # noqa: E402
+from utils.records import Task, TaskStatus, now_timestamp  # noqa: E402
+from utils.store import MemoryBackend  # noqa: E402
+
+
+def make_task(i, now):
+    return Task(id=i, user_id=i % 1000 or None, title=f'Task{i}', description=f'Description for task {i}',
+                status=TaskStatus.COMPLETED if i % 3 == 0 else TaskStatus.PENDING, duration=30 + i % 60,
+                created_at=now + i, updated_at=now + i, completed_at=now + i if i % 3 == 0 else None)
+
+
+# Each thread saves `count` tasks and waits for durability after each one, like a request would
+def timed_writes(backend, threads, count, first_id):
+    tasks = backend.collection('tasks')
+    now = now_timestamp()
+
+    def worker(worker_id):
+        for i in range(count):
+            task = make_task(first_id + worker_id * count + i, now)
+            with tasks.lock.write():
+                tasks.save(task)
+            backend.sync()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--tail', type=int, default=10_000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='wal-bench-')
+    try:
+        # Bulk load, then snapshot so the log starts empty
+        backend = MemoryBackend(COLLECTIONS, log_dir=directory, snapshot_every=10 ** 12)
+        now = now_timestamp()
+        tasks = backend.collection('tasks')
+        tasks.load((make_task(i, now) for i in range(1, args.records + 1)), args.records + 1)
+        started = time.perf_counter()
+        backend.log.snapshot()
+        snapshot_seconds = time.perf_counter() - started
+
+        per_thread = max(1, args.tail // args.threads)
+        write_seconds = timed_writes(backend, args.threads, per_thread, args.records + 1)
+        backend.close()
+
+        # Restart as a fresh process would: nothing of the old store left in memory
+        del backend, tasks
+        gc.collect()
+        started = time.perf_counter()
+        restored = MemoryBackend(COLLECTIONS, log_dir=directory, snapshot_every=10 ** 12)
+        startup_seconds = time.perf_counter() - started
+        expected = args.records + args.threads * per_thread
+        assert len(restored.collection('tasks')) == expected, 'recovered record count mismatch'
+        restored.close()
+
+        print(json.dumps({
+            'records': args.records,
+            'tail_writes': args.threads * per_thread,
+            'threads': args.threads,
+            'snapshot_bytes': os.path.getsize(os.path.join(directory, 'snapshot.dat')),
+            'snapshot_seconds': round(snapshot_seconds, 3),
+            'durable_writes_per_second': round(args.threads * per_thread / write_seconds),
+            'startup_seconds': round(startup_seconds, 3),
+        }, indent=2))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,78 +1,299 @@
-from flask import Flask, request, jsonify
-from datetime import datetime,timezone
-from utils.response import format_response, success_response, not_found_response, bad_request_response
-from utils.validators import positive_integer, validate_email, validate_field_length, validate_payload, validate_phone, validate_required_fields, validate_unique_field
+from flask import Flask, Response, request, jsonify
+from utils.backends import DuplicateRecordError, DurabilityError, create_backend
+from utils.bulk import bulk_response, parse_bulk_payload, run_bulk
+from utils.cache import ResponseCache, cached
+from utils.changes import changes_response
+from utils.compression import Compression
+from utils.idempotency import IdempotencyCache, idempotent
+from utils.indexes import UniqueIndex
+from utils.locks import hold, locked
+from utils.metrics import Metrics, instrument_store, phase
+from utils.pagination import DEFAULT_PAGE_SIZE, parse_page_args, stream_records, wants_stream
+from utils.profiling import Profiler
+from utils.records import Task, TaskStatus, User, now_timestamp, parse_timestamp
+from utils.response import format_response, make_response, paginated_response, success_response, not_found_response, bad_request_response, validation_error_response
+from utils.schema import Alpha, DigitsWithPrefix, Integer, OneOf, Pattern, Positive, Required, Schema, describe_errors
+from utils.serializers import FastJSONProvider
+from utils.task_index import parse_task_query
+from utils.transfer import TRANSFER_FORMATS, export_records, import_response, import_rows, parse_import_id, parse_transfer_format, read_rows
+from utils.validators import EMAIL_PATTERN, PHONE_MIN_LENGTH, PHONE_PREFIXES, validate_payload
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+# Latency histograms (per route and phase), request counters and store sizes on /metrics
+metrics = Metrics().install(app)
+
+# gzip/deflate by Accept-Encoding above COMPRESS_MIN_SIZE bytes, at COMPRESS_LEVEL (see utils/compression.py)
+compression = Compression().install(app)
+
+# Sampled stack profiles per route on /admin/profile; off unless PROFILE_ADMIN_TOKEN is set
+profiler = Profiler().install(app)
+
+# Storage backend (STORAGE_BACKEND=memory|sqlite, see utils/backends.py)
+backend = create_backend(name='tasks')
+
+# Collections keep their own unique indexes (email, phone, title) and the
+# tasks.user_id owner index in step with every save and remove
+users = instrument_store(backend.collection('users'))
+tasks = instrument_store(backend.collection('tasks'))
+
+# Status and created_at/completed_at indexes behind /api/v1/task/search; every
+# save and remove (create, update, status change, delete) keeps them current
+task_index = backend.task_index()
+
+# Per-status counts and duration sums, overall and per user, behind /api/v1/task/stats;
+# updated in O(1) by every task save and remove (including tasks detached by delete_user)
+task_stats = backend.task_stats()
+
+# Sequence-numbered log of recent saves and removes behind /api/v1/changes (CHANGE_FEED_SIZE entries)
+change_feed = backend.change_feed()
+CHANGE_SOURCES = {'users': (users, 'user'), 'tasks': (tasks, 'task')}
+
+# Serialized GET responses, keyed by the store versions they were built from
+response_cache = ResponseCache()
+
+# Responses to POSTs sent with an Idempotency-Key, so client retries replay instead of re-running
+idempotency = IdempotencyCache(sync=backend.sync)
+
+metrics.gauge('store_records', 'Records held per collection', ('collection',), lambda: [(('users',), len(users)), (('tasks',), len(tasks))])
+metrics.gauge('response_cache_hits_total', 'GET responses served from the cache', (), lambda: [((), response_cache.hits)], kind='counter')
+metrics.gauge('response_cache_misses_total', 'GET responses rendered and cached', (), lambda: [((), response_cache.misses)], kind='counter')
+metrics.gauge('idempotent_replays_total', 'Retried POSTs answered from the Idempotency-Key cache', (), lambda: [((), idempotency.replays)], kind='counter')
+metrics.gauge('compressed_body_hits_total', 'Compressed bodies reused for an unchanged ETag', (), lambda: [((), compression.bodies.hits)], kind='counter')
+metrics.gauge('profiled_requests_total', 'Requests sampled by the profiler', ('route',), lambda: [((route,), count) for route, count in list(profiler.profiled.items())], kind='counter')
+
+# Upper bounds keep stored values (and the per-user duration sums) inside SQLite's 64-bit INTEGER
+MAX_DURATION = 10**9
+MAX_ID = 2**63 - 1
+
+DURATION_ERROR = f"Duration must be a positive integer representing minutes, and must not be less than 5 minutes or more than {MAX_DURATION}"
+STATUS_ERROR = "Invalid task status. Allowed values are: pending, in-progress, completed"
+PHONE_ERROR = "Phone number must be numeric and at least 11 digits long starting with a valid prefix (070, 080, 090, 081, 091)"
+
+# Payload rules per endpoint, compiled into one validator each at import (see utils/schema.py)
+USER_SCHEMA = Schema('user', {
+    'firstName': [Required(), Alpha(3)],
+    'lastName': [Required(), Alpha(3)],
+    'email': [Required(), Pattern(EMAIL_PATTERN, "Invalid email format")],
+    'phone': [Required(), DigitsWithPrefix(PHONE_PREFIXES, PHONE_MIN_LENGTH, PHONE_ERROR)],
+})
+TASK_SCHEMA = Schema('task', {
+    'title': [Required(), Alpha(3)],
+    'description': [Required()],
+    'duration': [Required(), Positive(1, max=MAX_DURATION, message=DURATION_ERROR)],
+    'user_id': [Integer(nullable=True, max=MAX_ID)],
+})
+TASK_UPDATE_SCHEMA = Schema('task update', {
+    'title': [Alpha(3)],
+    'description': [Required()],
+    'duration': [Positive(5, max=MAX_DURATION, message=DURATION_ERROR)],
+}, partial=True)
+TASK_STATUS_SCHEMA = Schema('task status', {
+    'status': [OneOf([status.value for status in TaskStatus], STATUS_ERROR)],
+})
+
+
+# ============ SHARED HELPERS ============
+# Used by the single-record endpoints and the bulk endpoints alike
+
+# Validate a full user payload; returns {field: message} for every problem found.
+# user_id lets an existing user keep their own email/phone
+@phase('validation')
+def check_user_payload(data, user_id=None):
+    errors = USER_SCHEMA.validate(data)
+    if 'payload' in errors:
+        return errors
 
-users = {}
-tasks = {}
-
-next_user_id = 1
-next_task_id = 1
+    # Check for duplicate emails
+    if 'email' not in errors and not users.is_unique('email', data['email'], user_id):
+        errors['email'] = f"User with email '{data['email']}' already exists"
 
+    # Check for duplicate phone numbers
+    if 'phone' not in errors and not users.is_unique('phone', data['phone'], user_id):
+        errors['phone'] = f"User with phone number '{data['phone']}' already exists"
+    return errors
+
+# Build a User from a validated payload
+def build_user(data, user_id):
+    return User(
+        id=user_id,
+        firstName=data['firstName'],
+        lastName=data['lastName'],
+        email=data['email'],
+        phone=data['phone']
+    )
+
+# Insert or replace a user
+def save_user(user):
+    return users.save(user)
+
+# Remove a user and detach their tasks; returns the user or None
+def remove_user(user_id):
+    user = users.remove(user_id) # Remove user by id
+    if user is None:
+        return None
 
+    # Set associated tasks' user_id to None
+    tasks.detach('user_id', user_id)
+    return user
+
+# Validate a new task payload; returns {field: message} for every problem found.
+# task_id lets an imported task keep its own title
+@phase('validation')
+def check_task_payload(data, task_id=None):
+    errors = TASK_SCHEMA.validate(data)
+    if 'payload' in errors:
+        return errors
+
+    # user_id is optional, but must point at an existing user when given
+    user_id = data.get('user_id')
+    if user_id is not None and 'user_id' not in errors and user_id not in users:
+        errors['user_id'] = f"User with id {user_id} not found"
 
+    # Check for duplicate title
+    if 'title' not in errors and not tasks.is_unique('title', data['title'], task_id):
+        errors['title'] = f"Task with title '{data['title']}' already exists"
+    return errors
+
+# Build a pending Task from a validated payload (a new id unless one is given)
+def build_task(data, task_id=None):
+    return Task(
+        id=task_id if task_id is not None else tasks.allocate_id(),
+        user_id=data.get('user_id'),
+        title=data['title'],
+        description=data['description'],
+        status=TaskStatus.PENDING,
+        duration=data['duration'],
+        created_at=now_timestamp(),
+        updated_at=None,
+        completed_at=None
+    )
+
+# Validate and apply title/description/duration changes to a task; returns an error or None
+@phase('validation')
+def apply_task_changes(task, data):
+    # Validate whichever of title, description and duration are present
+    errors = TASK_UPDATE_SCHEMA.validate(data)
+    if 'payload' in errors:
+        return errors
+    if 'title' in data and 'title' not in errors and not tasks.is_unique('title', data['title'], task.id):
+        errors['title'] = f"Task with title '{data['title']}' already exists"
+    if errors:
+        return errors
+
+    # Apply the changes
+    for field in ('title', 'description', 'duration'):
+        if field in data:
+            setattr(task, field, data[field])
+    task.updated_at = now_timestamp() # Update the updated_at timestamp
+    return errors
+
+# Status and timestamps an imported task row carries over; returns (error, {field: value})
+def parse_task_history(row):
+    history = {}
+    status = row.get('status')
+    if status is not None:
+        errors = TASK_STATUS_SCHEMA.validate(row)
+        if errors:
+            return describe_errors(errors), None
+        history['status'] = TaskStatus(status)
+    for field in ('created_at', 'updated_at', 'completed_at'):
+        if row.get(field) is not None:
+            try:
+                history[field] = parse_timestamp(row[field])
+            except (TypeError, ValueError):
+                return f"{field} must be an ISO-8601 timestamp with a UTC offset", None
+    return None, history
+
+# Insert or replace a task
+def save_task(task):
+    return tasks.save(task)
+
+# Remove a task; returns the task or None
+def remove_task(task_id):
+    return tasks.remove(task_id) # Remove task by id
+
+# Bulk rows must be objects; updates and deletes also need an existing id
+def _bulk_row(row, store, label, needs_id):
+    if not isinstance(row, dict):
+        return "Each row must be a JSON object"
+    if needs_id and (not isinstance(row.get('id'), int) or row['id'] not in store):
+        return f"{label} with id {row.get('id')} not found"
+    return None
+
+# Bulk delete rows are bare ids
+def _bulk_delete_row(row, store, label):
+    if not isinstance(row, int) or isinstance(row, bool) or row not in store:
+        return f"{label} with id {row} not found", None
+    return None, row
+
+
+# Unique constraints enforced by the storage backend (e.g. across worker processes)
+@app.errorhandler(DuplicateRecordError)
+def handle_duplicate_record(error):
+    return bad_request_response(str(error))
+
+# Writes that could not be made durable: the client must not take them as saved
+@app.errorhandler(DurabilityError)
+def handle_durability_error(error):
+    return make_response("error", str(error), None, 500)
+
+# Hold the response until this request's writes are durable (group commit)
+@app.after_request
+def wait_for_durable_writes(response):
+    try:
+        backend.sync()
+    except DurabilityError as error:
+        return app.make_response(handle_durability_error(error))
+    return response
 
 
 # ============ USERS MANAGER ENDPOINTS ============
 
 #create a user
 @app.route('/api/v1/user/add', methods=['POST'])
+@idempotent(idempotency)
+@locked(write=[users])
 def create_user():
-    global next_user_id
     data = request.get_json()
 
-    # Validate payload
-    payload = validate_payload(data)
-    if payload:
-        return bad_request_response(payload)
-
-    # Validate required fields
-    error = validate_required_fields(data, 'firstName') or validate_required_fields(data,'lastName') or validate_required_fields(data,'email') or validate_required_fields(data,'phone') or     validate_field_length(data,'firstName') or validate_field_length(data,'lastName')
-    if error:
-        return bad_request_response(error)
+    # Validate payload, fields, formats and uniqueness
+    errors = check_user_payload(data)
+    if errors:
+        return validation_error_response(errors)
 
-    
-    # Validate email format (basic validation)
-    if not validate_email(data['email']):
-        return bad_request_response("Invalid email format")
-    
-    # Validate phone number (basic validation)
-    if not validate_phone(data['phone']):
-                return bad_request_response("Phone number must be numeric and at least 11 digits long starting with a valid prefix (070, 080, 090, 081, 091)")
-        
-    # Check for duplicate emails
-    if not validate_unique_field(users, 'email', data['email']):
-        return bad_request_response(f"User with email '{data['email']}' already exists")
- 
-    # Check for duplicate phone numbers
-    if not validate_unique_field(users, 'phone', data['phone']):
-        return bad_request_response(f"User with phone number '{data['phone']}' already exists")
-    
-    user = {
-        'id': len(users) + 1,
-        'firstName': data['firstName'],
-        'lastName': data['lastName'],
-        'email': data['email'],
-        'phone': data['phone']
-    }
-    users[next_user_id] = user
-    next_user_id += 1
+    user = save_user(build_user(data, users.allocate_id()))
     return success_response("User created successfully", format_response(user, 'user'), 201)
 
 # Fetch all users
 @app.route('/api/v1/user/all', methods=['GET'])
+@cached(response_cache, lambda: users.version)
 def get_users():
+    # Opt-in streamed dump with bounded memory
+    if wants_stream(request.args):
+        return Response(stream_records(users, "Users retrieved successfully", 'user'), mimetype='application/json')
 
-    if not users:
-        return success_response("No users at the moment")
-    
-    return success_response("Users retrieved successfully",format_response(users.values(), 'users'))
+    # Keyset pagination over id order when limit/cursor is given
+    limit, cursor, error = parse_page_args(request.args)
+    if error:
+        return bad_request_response(error)
+    if limit is not None:
+        with hold(read=[users]):
+            page, next_cursor = users.page(cursor, limit)
+        return paginated_response("Users retrieved successfully", format_response(page, 'users'), next_cursor, limit)
+
+    # The full list is serialized from a snapshot, so writers are not held up meanwhile
+    with users.snapshot() as snapshot:
+        if not snapshot:
+            return success_response("No users at the moment")
+        return success_response("Users retrieved successfully",format_response(snapshot.values(), 'users'))
 
 
 # Fetch single user by id
 @app.route('/api/v1/user/<int:user_id>/fetch', methods=['GET'])
+@cached(response_cache, lambda: users.version)
+@locked(read=[users])
 def get_user(user_id):
     user = users.get(user_id)
     if not user:
@@ -81,6 +302,7 @@ def get_user(user_id):
 
 # Update user by id and avoid duplicate email and phone number
 @app.route('/api/v1/user/<int:user_id>/update', methods=['PUT'])
+@locked(write=[users])
 def update_user(user_id):
     data = request.get_json() # Get data from request body
     user = users.get(user_id) # Fetch user by id
@@ -90,53 +312,29 @@ def update_user(user_id):
     if payload:
         return bad_request_response(payload)
 
-
-    # Validate required fields
-    error = validate_required_fields(data, 'firstName') or validate_required_fields(data,'lastName') or validate_required_fields(data,'email') or validate_required_fields(data,'phone') or validate_field_length(data,'firstName') or validate_field_length(data,'lastName')
-    if error:
-        return bad_request_response(error)
-
     # Check if user exists
     if not user:
         return not_found_response(f"User with id {user_id} not found")
-    
 
-    # Validate email format (basic validation)
-    if not validate_email(data['email']):
-        return bad_request_response("Invalid email format")
-    
-    # Validate phone number (basic validation)
-    if not validate_phone(data['phone']):
-                return bad_request_response("Phone number must be numeric and at least 11 digits long starting with a valid prefix (070, 080, 090, 081, 091)")
-        
-    # Check for duplicate emails
-    if not validate_unique_field(users, 'email', data['email']):
-        return bad_request_response(f"User with email '{data['email']}' already exists")
- 
-    # Check for duplicate phone numbers
-    if not validate_unique_field(users, 'phone', data['phone']):
-        return bad_request_response(f"User with phone number '{data['phone']}' already exists")
-      
-    user = {
-        'id': user_id,
-        'firstName': data['firstName'],
-        'lastName': data['lastName'],
-        'email': data['email'],
-        'phone': data['phone']
-    }
-
-    users[user_id] = user # Save updated user
+    # Validate fields, formats and uniqueness (the user may keep their own email/phone)
+    errors = check_user_payload(data, user_id)
+    if errors:
+        return validation_error_response(errors)
+
+    user = save_user(build_user(data, user_id)) # Save updated user
     return success_response("User updated successfully", format_response(user,'user'))
 
 
 # Fetch tasks by user_id
 @app.route('/api/v1/user/<int:user_id>/tasks', methods=['GET'])
+@cached(response_cache, lambda: (users.version, tasks.version))
+@locked(read=[users, tasks])
 def get_tasks_by_user(user_id):
     if user_id not in users:
         return not_found_response(f"User with id {user_id} not found")
     
-    # Filter tasks by user_id
-    user_tasks = [task for task in tasks.values() if task['user_id'] == user_id]
+    # Look up the user's tasks through the owner index
+    user_tasks = tasks.find_by('user_id', user_id)
     
     # Check if user has tasks
     if not user_tasks:
@@ -147,14 +345,10 @@ def get_tasks_by_user(user_id):
     
 # Delete user by id
 @app.route('/api/v1/user/<int:user_id>/delete', methods=['DELETE'])
+@locked(write=[users, tasks])
 def delete_user(user_id):
-    user = users.pop(user_id, None) # Remove user by id
+    user = remove_user(user_id) # Remove user and detach their tasks
 
-    # Set associated tasks' user_id to None
-    for task in tasks.values():
-        if task['user_id'] == user_id:
-            task['user_id'] = None
-    
      # Check if user exists
     if not user:
         return not_found_response(f"User with id {user_id} not found")
@@ -162,74 +356,200 @@ def delete_user(user_id):
     return success_response("User deleted successfully")
 
 
+# Bulk create users: {"users": [...], "atomic": true}
+@app.route('/api/v1/user/bulk', methods=['POST'])
+@idempotent(idempotency)
+@locked(write=[users])
+def bulk_create_users():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'users')
+    if error:
+        return bad_request_response(error)
+
+    results = run_bulk(
+        rows,
+        prepare=lambda row: (describe_errors(check_user_payload(row)), row),
+        commit=lambda row: format_response(save_user(build_user(row, users.allocate_id())), 'user'),
+        unique_keys=lambda row: [('email', UniqueIndex.fold(row['email'])), ('phone', UniqueIndex.fold(row['phone']))],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic, 201)
+
+
+# Bulk update users: {"users": [{"id": 1, ...full user payload}], "atomic": true}
+@app.route('/api/v1/user/bulk', methods=['PUT'])
+@locked(write=[users])
+def bulk_update_users():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'users')
+    if error:
+        return bad_request_response(error)
+
+    def prepare(row):
+        error = _bulk_row(row, users, 'User', needs_id=True) or describe_errors(check_user_payload(row, row['id']))
+        return error, row
+
+    results = run_bulk(
+        rows,
+        prepare=prepare,
+        commit=lambda row: format_response(save_user(build_user(row, row['id'])), 'user'),
+        unique_keys=lambda row: [('id', row['id']), ('email', UniqueIndex.fold(row['email'])), ('phone', UniqueIndex.fold(row['phone']))],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+# Bulk delete users: {"ids": [1, 2], "atomic": true}
+@app.route('/api/v1/user/bulk', methods=['DELETE'])
+@locked(write=[users, tasks])
+def bulk_delete_users():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'ids')
+    if error:
+        return bad_request_response(error)
+
+    results = run_bulk(
+        rows,
+        prepare=lambda row: _bulk_delete_row(row, users, 'User'),
+        commit=lambda user_id: {'id': remove_user(user_id).id},
+        unique_keys=lambda row: [('id', row)],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+
+# Export every user as NDJSON (default) or CSV: ?format=ndjson|csv
+@app.route('/api/v1/user/export', methods=['GET'])
+def export_users():
+    fmt, error = parse_transfer_format(request.args)
+    if error:
+        return bad_request_response(error)
+    return Response(export_records(users, 'user', fmt), mimetype=TRANSFER_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=users.{fmt}'})
+
+
+# Import users from an NDJSON or CSV upload (format from ?format= or Content-Type).
+# Rows with an id restore that user, so exported tasks still point at them
+@app.route('/api/v1/user/import', methods=['POST'])
+def import_users():
+    fmt, error = parse_transfer_format(request.args, request.content_type)
+    if error:
+        return bad_request_response(error)
+
+    def prepare(row):
+        user_id, error = parse_import_id(row)
+        return error or describe_errors(check_user_payload(row, user_id)), (user_id, row)
+
+    def commit(prepared):
+        user_id, row = prepared
+        if user_id is None:
+            return {'id': save_user(build_user(row, users.allocate_id())).id}
+        return {'id': users.restore(build_user(row, user_id)).id}
+
+    def unique_keys(row):
+        keys = [('email', UniqueIndex.fold(row['email'])), ('phone', UniqueIndex.fold(row['phone']))]
+        if row.get('id') is not None:
+            keys.append(('id', row['id']))
+        return keys
+
+    # The write lock is taken per chunk, so reads and writes interleave with a long upload
+    def apply_chunk(rows):
+        with hold(write=[users]):
+            return run_bulk(rows, prepare=prepare, commit=commit, unique_keys=unique_keys, atomic=False)
+
+    return import_response(import_rows(read_rows(request.stream, fmt, {'id': int}), apply_chunk))
+
 
 # ============ TASK MANAGER ENDPOINTS ============
 
 # Create a task
 @app.route('/api/v1/task/add', methods=['POST'])
+@idempotent(idempotency)
+@locked(read=[users], write=[tasks])
 def create_task():
-    global next_task_id # Access the global task ID counter
     data = request.get_json() # Get data from request body
 
-    payload = validate_payload(data)
-    if payload:
-        return bad_request_response(payload)
-  
-    # Validate required fields
-    error = validate_required_fields(data, 'title') or validate_required_fields(data,'description') or validate_required_fields(data,'duration') or  validate_field_length(data,'title')
-    if error:
-        return bad_request_response(error)
-    
-    # user_id field is in the payload then extract it and perform validation else set default to null
-    if 'user_id' in data and isinstance(data['user_id'], int) and data['user_id'] <= 0:
-        user_id = data['user_id'] # Extract user_id from request data
+    # An unknown user_id is a missing resource rather than a bad field
+    if isinstance(data, dict) and isinstance(data.get('user_id'), int) and not isinstance(data['user_id'], bool) and data['user_id'] not in users:
+        return not_found_response(f"User with id {data['user_id']} not found")
 
-        #validate user_id is an integer
-        if not isinstance(user_id, int):
-            return bad_request_response("user_id must be an integer")
-        
-        # Check if user exists
-        if user_id not in users:
-            return not_found_response(f"User with id {user_id} not found")
-    else:
-        user_id = None # Set user_id to None if not provided or invalid
+    # Validate payload, fields, owner and uniqueness
+    errors = check_task_payload(data)
+    if errors:
+        return validation_error_response(errors)
 
-    # Check for duplicate title
-    if not validate_unique_field(tasks, 'title', data['title']):
-        return bad_request_response(f"Task with title '{data['title']}' already exists")
-     
-    # Validate duration is a positive integer
-    if not positive_integer(data['duration']):
-        return bad_request_response(f"Duration must be a positive integer representing minutes, and must not be less than 5 minutes")
-     
-    task_status = 'pending'
-    task = {
-        'id': len(tasks) + 1,
-        'user_id': user_id,
-        'title': data['title'],
-        'description': data['description'],
-        'status': task_status,
-        'duration': data['duration'],
-        'created_at': datetime.now(timezone.utc).isoformat(),
-        'updated_at': None,
-        'completed_at': None
-    }
-    tasks[next_task_id] = task
-    next_task_id += 1
+    task = save_task(build_task(data))
     return success_response("Task created successfully", format_response(task,'task'), 201)
 
 # Fetch all tasks
 @app.route('/api/v1/task/all', methods=['GET'])
+@cached(response_cache, lambda: tasks.version)
 def get_tasks():
+    # Opt-in streamed dump with bounded memory
+    if wants_stream(request.args):
+        return Response(stream_records(tasks, "Tasks retrieved successfully", 'task'), mimetype='application/json')
 
-    if not tasks:
-        return success_response("No tasks at the moment")
-    
-    return success_response("Tasks retrieved successfully",format_response(tasks.values(), 'tasks'))
+    # Keyset pagination over id order when limit/cursor is given
+    limit, cursor, error = parse_page_args(request.args)
+    if error:
+        return bad_request_response(error)
+    if limit is not None:
+        with hold(read=[tasks]):
+            page, next_cursor = tasks.page(cursor, limit)
+        return paginated_response("Tasks retrieved successfully", format_response(page, 'tasks'), next_cursor, limit)
+
+    # The full list is serialized from a snapshot, so writers are not held up meanwhile
+    with tasks.snapshot() as snapshot:
+        if not snapshot:
+            return success_response("No tasks at the moment")
+        return success_response("Tasks retrieved successfully",format_response(snapshot.values(), 'tasks'))
+
+
+# Search tasks by status, user_id, created/completed date range and duration, sorted and paginated
+@app.route('/api/v1/task/search', methods=['GET'])
+@cached(response_cache, lambda: tasks.version)
+@locked(read=[tasks])
+def search_tasks():
+    query, error = parse_task_query(request.args)
+    if error:
+        return bad_request_response(error)
+
+    # cursor is an offset into the sorted results
+    limit, cursor, error = parse_page_args(request.args)
+    if error:
+        return bad_request_response(error)
+    limit = limit or DEFAULT_PAGE_SIZE
+
+    task_ids, next_cursor = task_index.search(query, cursor, limit)
+    matches = [task for task in map(tasks.get, task_ids) if task is not None]
+    return paginated_response("Tasks retrieved successfully", format_response(matches, 'tasks'), next_cursor, limit)
+
+
+# Task counts per status, total/average duration and completion rate: overall, ?user_id=N, or ?by=user
+@app.route('/api/v1/task/stats', methods=['GET'])
+@cached(response_cache, lambda: (users.version, tasks.version))
+@locked(read=[users, tasks])
+def get_task_stats():
+    by = request.args.get('by')
+    if by not in (None, 'user'):
+        return bad_request_response("by must be user")
+
+    if 'user_id' in request.args:
+        user_id = request.args.get('user_id', type=int)
+        if user_id is None:
+            return bad_request_response("user_id must be an integer")
+        if user_id not in users:
+            return not_found_response(f"User with id {user_id} not found")
+        return success_response(f"Task statistics for user with id {user_id} retrieved successfully", dict(task_stats.summary(user_id), user_id=user_id))
+
+    data = {'overall': task_stats.summary(), 'unassigned': task_stats.summary(None)}
+    if by == 'user':
+        data['users'] = [dict(stats, user_id=user_id) for user_id, stats in task_stats.by_user()]
+    return success_response("Task statistics retrieved successfully", data)
 
 
 # Fetch single task by id
 @app.route('/api/v1/task/<int:task_id>/fetch', methods=['GET'])
+@cached(response_cache, lambda: tasks.version)
+@locked(read=[tasks])
 def get_task(task_id):
     task = tasks.get(task_id)
     if not task:
@@ -239,6 +559,7 @@ def get_task(task_id):
 
 # Update task by id
 @app.route('/api/v1/task/<int:task_id>/update', methods=['PUT'])
+@locked(write=[tasks])
 def update_task(task_id):
     data = request.get_json() # Get data from request body
     task = tasks.get(task_id) # Fetch task by id
@@ -251,40 +572,22 @@ def update_task(task_id):
     # Check if task exists
     if not task:
         return not_found_response(f"Task with id {task_id} not found")
+    task = task.copy() # Work on a copy so a failed validation leaves the stored task untouched
 
+    # Validate and apply title, description and duration changes
+    errors = apply_task_changes(task, data)
+    if errors:
+        return validation_error_response(errors)
 
-    # Validate and update title
-    if 'title' in data:
-        title_error = validate_field_length(data, 'title', 3)
-        if title_error:
-            return bad_request_response(title_error)
-        task['title'] = data['title'] # Update title
-
-    
-    # Validate and update description
-    if 'description' in data:
-        description_error = validate_required_fields(data,'description')
-        if description_error:
-            return bad_request_response(description_error)
-        task['description'] = data['description'] # Update duration
-    
-    # Validate and update duration
-    if 'duration' in data:
-        if not positive_integer(data['duration'],5):
-            return bad_request_response("Duration must be a positive integer representing minutes, and must not be less than 5 minutes")
-        
-        task['duration'] = data['duration'] # Update duration
-    
-    
-    task['updated_at'] = datetime.now(timezone.utc).isoformat() # Update the updated_at timestamp
-    tasks[task_id] = task # Save updated task
+    save_task(task) # Save updated task
     return success_response("Task updated successfully", format_response(task,'task'))
 
 
 # Delete task by id
 @app.route('/api/v1/task/<int:task_id>/delete', methods=['DELETE'])
+@locked(write=[tasks])
 def delete_task(task_id):
-    task = tasks.pop(task_id, None) # Remove task by id
+    task = remove_task(task_id) # Remove task by id
     if not task:
         return not_found_response(f"Task with id {task_id} not found")
     
@@ -293,6 +596,7 @@ def delete_task(task_id):
 
 # Assign a task to a user
 @app.route('/api/v1/task/<int:task_id>/assign/<int:user_id>', methods=['PUT'])
+@locked(read=[users], write=[tasks])
 def assign_task_to_user(task_id, user_id):
     task = tasks.get(task_id)
     if not task:
@@ -301,16 +605,86 @@ def assign_task_to_user(task_id, user_id):
     if user_id not in users:
         return not_found_response(f"User with id {user_id} not found")
     
-    task['user_id'] = user_id
-    task['updated_at'] = datetime.now(timezone.utc).isoformat() # Update the updated_at timestamp
-    tasks[task_id] = task # Save updated task
+    task = task.copy() # Stored tasks are never changed in place (see RecordStore.snapshot)
+    task.user_id = user_id
+    task.updated_at = now_timestamp() # Update the updated_at timestamp
+    save_task(task) # Save updated task
     return success_response(f"Task with id {task_id} assigned to user with id {user_id} successfully", format_response(task,'task'))
 
+
+# Bulk create tasks: {"tasks": [...], "atomic": true}
+@app.route('/api/v1/task/bulk', methods=['POST'])
+@idempotent(idempotency)
+@locked(read=[users], write=[tasks])
+def bulk_create_tasks():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'tasks')
+    if error:
+        return bad_request_response(error)
+
+    results = run_bulk(
+        rows,
+        prepare=lambda row: (describe_errors(check_task_payload(row)), row),
+        commit=lambda row: format_response(save_task(build_task(row)), 'task'),
+        unique_keys=lambda row: [('title', UniqueIndex.fold(row['title']))],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic, 201)
+
+
+# Bulk update tasks: {"tasks": [{"id": 1, "title": ...}], "atomic": true}
+@app.route('/api/v1/task/bulk', methods=['PUT'])
+@locked(write=[tasks])
+def bulk_update_tasks():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'tasks')
+    if error:
+        return bad_request_response(error)
+
+    # Changes are applied to copies during validation and saved on commit
+    def prepare(row):
+        error = _bulk_row(row, tasks, 'Task', needs_id=True)
+        if error:
+            return error, None
+        task = tasks.get(row['id']).copy()
+        return describe_errors(apply_task_changes(task, row)), task
+
+    def unique_keys(row):
+        keys = [('id', row['id'])]
+        if 'title' in row:
+            keys.append(('title', UniqueIndex.fold(row['title'])))
+        return keys
+
+    results = run_bulk(
+        rows,
+        prepare=prepare,
+        commit=lambda task: format_response(save_task(task), 'task'),
+        unique_keys=unique_keys,
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
+
+# Bulk delete tasks: {"ids": [1, 2], "atomic": true}
+@app.route('/api/v1/task/bulk', methods=['DELETE'])
+@locked(write=[tasks])
+def bulk_delete_tasks():
+    rows, atomic, error = parse_bulk_payload(request.get_json(), 'ids')
+    if error:
+        return bad_request_response(error)
+
+    results = run_bulk(
+        rows,
+        prepare=lambda row: _bulk_delete_row(row, tasks, 'Task'),
+        commit=lambda task_id: {'id': remove_task(task_id).id},
+        unique_keys=lambda row: [('id', row)],
+        atomic=atomic,
+    )
+    return bulk_response(results, atomic)
+
 # update task status to completed
 @app.route('/api/v1/task/<int:task_id>/status/update', methods=['PUT'])
+@locked(write=[tasks])
 def mark_task_as_completed(task_id):
     data = request.get_json() # Get data from request body
-    allowed_statuses = ['pending', 'in-progress', 'completed'] # Define allowed statuses
     task = tasks.get(task_id) # Fetch task by id
 
     # Check if task exists
@@ -318,24 +692,85 @@ def mark_task_as_completed(task_id):
         return bad_request_response("status field is required")
     
     # Validate task status value
-    if data['status'] not in allowed_statuses:
-            return bad_request_response("Invalid task status. Allowed values are: pending, in-progress, completed")
+    errors = TASK_STATUS_SCHEMA.validate(data)
+    if errors:
+        return validation_error_response(errors)
     
     # Check if task exists
     if not task:
         return not_found_response(f"Task with id {task_id} not found")
 
     # Check if task is already completed
-    if task['status'] == 'completed':
+    if task.status is TaskStatus.COMPLETED:
         return bad_request_response(f"Task with id {task_id} is already marked as completed")
     
-    # update task status based on input
-    task['status'] = data['status']
+    # update task status based on input, on a copy (stored tasks are never changed in place)
+    task = task.copy()
+    task.status = TaskStatus(data['status'])
 
     # If status is completed, set the completed_at timestamp
     if data['status'] == 'completed':
-        task['completed_at'] = datetime.now(timezone.utc).isoformat() # Set the completed_at timestamp
-    task['updated_at'] = datetime.now(timezone.utc).isoformat() # Update the updated_at timestamp
-    tasks[task_id] = task # Save updated task
+        task.completed_at = now_timestamp() # Set the completed_at timestamp
+    task.updated_at = now_timestamp() # Update the updated_at timestamp
+    save_task(task) # Save updated task
+
+    return success_response(f"Task with id {task_id} marked as {data['status']} successfully", format_response(task,'task'))
+
+
+# Export every task as NDJSON (default) or CSV: ?format=ndjson|csv
+@app.route('/api/v1/task/export', methods=['GET'])
+def export_tasks():
+    fmt, error = parse_transfer_format(request.args)
+    if error:
+        return bad_request_response(error)
+    return Response(export_records(tasks, 'task', fmt), mimetype=TRANSFER_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=tasks.{fmt}'})
+
+
+# Import tasks from an NDJSON or CSV upload (format from ?format= or Content-Type).
+# Rows with an id restore that task, including its status and timestamps when given;
+# import users first so user_id references resolve
+@app.route('/api/v1/task/import', methods=['POST'])
+def import_tasks():
+    fmt, error = parse_transfer_format(request.args, request.content_type)
+    if error:
+        return bad_request_response(error)
 
-    return success_response(f"Task with id {task_id} marked as {data['status']} successfully", format_response(task,'task'))
\ No newline at end of file
+    def prepare(row):
+        task_id, error = parse_import_id(row)
+        if error:
+            return error, None
+        error = describe_errors(check_task_payload(row, task_id))
+        if error:
+            return error, None
+        error, history = parse_task_history(row)
+        return error, (task_id, row, history)
+
+    def commit(prepared):
+        task_id, row, history = prepared
+        task = build_task(row, task_id)
+        for field, value in history.items():
+            setattr(task, field, value)
+        return {'id': (save_task(task) if task_id is None else tasks.restore(task)).id}
+
+    def unique_keys(row):
+        keys = [('title', UniqueIndex.fold(row['title']))]
+        if row.get('id') is not None:
+            keys.append(('id', row['id']))
+        return keys
+
+    # Locks are taken per chunk, so reads and writes interleave with a long upload
+    def apply_chunk(rows):
+        with hold(read=[users], write=[tasks]):
+            return run_bulk(rows, prepare=prepare, commit=commit, unique_keys=unique_keys, atomic=False)
+
+    columns = {'id': int, 'user_id': int, 'duration': int, 'status': str,
+               'created_at': str, 'updated_at': str, 'completed_at': str}
+    return import_response(import_rows(read_rows(request.stream, fmt, columns), apply_chunk))
+
+
+# Changes to users and tasks after seq N, for delta sync: ?since=N&limit=&wait=seconds,
+# or Server-Sent Events with Accept: text/event-stream (see utils/changes.py)
+@app.route('/api/v1/changes', methods=['GET'])
+def get_changes():
+    return changes_response(change_feed, CHANGE_SOURCES, request)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The apps and utils are imported as top-level modules, as they are when run from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
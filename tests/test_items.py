@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app as stock
+from utils.backends import COLLECTIONS
+from utils.columns import ItemColumns
+from utils.records import Item
+from utils.sqlite_store import SQLiteBackend
+
+TOO_BIG = 2**70
+
+
+@pytest.fixture
+def client():
+    return stock.app.test_client()
+
+
+@pytest.mark.parametrize('payload', [
+    {'name': 'Huge', 'quantity': TOO_BIG, 'unit_price': 1},
+    {'name': 'Huge', 'quantity': 1, 'unit_price': TOO_BIG},
+    {'name': 'Huge', 'quantity': 1, 'unit_price': 1e300},
+    {'name': 'Huge', 'quantity': stock.MAX_AMOUNT + 1, 'unit_price': 1},
+])
+def test_add_rejects_amounts_outside_int64(client, payload):
+    before = len(stock.items)
+    response = client.post('/api/v1/item/add', json=payload)
+    assert response.status_code == 400
+    assert len(stock.items) == before
+    assert len(stock.item_columns) == before
+
+
+def test_update_rejects_amounts_outside_int64(client):
+    response = client.put('/api/v1/item/2/update', json={'quantity': TOO_BIG})
+    assert response.status_code == 400
+    assert stock.items.get(2).quantity != TOO_BIG
+
+
+def test_largest_amounts_fit_the_columns(client):
+    response = client.post('/api/v1/item/add', json={'name': 'Bulk', 'quantity': stock.MAX_AMOUNT, 'unit_price': stock.MAX_AMOUNT})
+    assert response.status_code == 200
+    assert response.json['data']['total_price'] == stock.MAX_AMOUNT**2
+    client.delete(f"/api/v1/item/{response.json['data']['id']}/delete")
+
+
+def test_item_columns_set_is_all_or_nothing():
+    columns = ItemColumns([SimpleNamespace(id=1, quantity=2, unit_price=3.0, total_price=6.0)])
+    with pytest.raises(OverflowError):
+        columns.set(SimpleNamespace(id=2, quantity=TOO_BIG, unit_price=1.0, total_price=1.0))
+    with pytest.raises(OverflowError):
+        columns.set(SimpleNamespace(id=1, quantity=TOO_BIG, unit_price=9.0, total_price=9.0))
+    assert [len(column) for column in (columns.ids, columns.quantity, columns.unit_price, columns.total_price)] == [1, 1, 1, 1]
+    assert columns.summary()['total_value'] == 6.0
+
+
+def test_sqlite_ids_beyond_integer_range_are_absent(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'items.db'), COLLECTIONS)
+    items = backend.collection('items')
+    items.save(Item(id=1, name='Rice', quantity=1, unit_price=1.0, total_price=1.0, description=''))
+    assert items.get(TOO_BIG) is None
+    assert TOO_BIG not in items
+    assert items.page(TOO_BIG, 10) == ([], None)
+    backend.close()
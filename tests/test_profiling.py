@@ -0,0 +1,36 @@
+import pytest
+from flask import Flask
+
+from utils.profiling import Profiler
+
+TOKEN = 'secret'
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    Profiler(token=TOKEN).install(app)
+    return app.test_client()
+
+
+# hmac.compare_digest raises TypeError on non-ASCII str, which used to turn these into 500s
+@pytest.mark.parametrize('header', ['ßé', 'sécret', '\xff'])
+def test_non_ascii_profile_header_is_ignored(client, header):
+    assert client.get('/ping', headers={'X-Profile': header}).status_code == 200
+
+
+@pytest.mark.parametrize('header', ['ßé', 'sécret', '\xff'])
+def test_non_ascii_admin_token_is_refused(client, header):
+    assert client.get('/admin/profile', headers={'X-Admin-Token': header}).status_code == 404
+
+
+def test_matching_tokens_still_work(client):
+    assert client.get('/ping', headers={'X-Profile': TOKEN}).status_code == 200
+    response = client.get('/admin/profile', headers={'X-Admin-Token': TOKEN})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
@@ -0,0 +1,115 @@
+import os
+from collections import namedtuple
+
+from utils.records import Item, Task, TaskStatus, User
+
+# How a collection is stored: its record type, case-folded unique fields,
+# foreign-key style owner fields, extra indexed columns and value codecs
+# (stored form <-> record form) for backends that persist records.
+CollectionSpec = namedtuple('CollectionSpec', 'record unique owners indexed codecs')
+
+COLLECTIONS = {
+    'users': CollectionSpec(User, unique=('email', 'phone'), owners=(), indexed=(), codecs={}),
+    'tasks': CollectionSpec(Task, unique=('title',), owners=('user_id',), indexed=('status', 'created_at', 'completed_at'),
+                            codecs={'status': (lambda status: status.value, {status.value: status for status in TaskStatus}.__getitem__)}),
+    'items': CollectionSpec(Item, unique=('name',), owners=(), indexed=('quantity', 'unit_price'), codecs={}),
+}
+
+
+# Raised when a write would break a unique constraint the handler did not catch
+# (e.g. two processes racing on the same email against a shared database)
+class DuplicateRecordError(Exception):
+    pass
+
+
+# Raised when writes made by a request could not be made durable (e.g. the write-ahead log's disk failed)
+class DurabilityError(Exception):
+    pass
+
+
+# The interface every storage backend's collections implement
+class Collection:
+    """
+    Handlers only talk to collections through these methods, so the same
+    code runs against the in-memory store or SQLite.
+
+    `lock` offers read()/write() context managers for utils.locks.locked,
+    and `version` changes whenever the collection is written.
+    """
+    lock = None
+    version = 0
+
+    def allocate_id(self):
+        raise NotImplementedError
+
+    def get(self, record_id, default=None):
+        raise NotImplementedError
+
+    def values(self):
+        """All records in id order."""
+        raise NotImplementedError
+
+    def page(self, cursor=0, limit=100):
+        """Up to `limit` records with id > cursor, plus the next cursor or None."""
+        raise NotImplementedError
+
+    def snapshot(self):
+        """A consistent read-only view (get/values/page/len) for `with`, unaffected by later writes."""
+        raise NotImplementedError
+
+    def save(self, record):
+        """Insert or replace a record, keeping every index in step."""
+        raise NotImplementedError
+
+    def restore(self, record):
+        """Save a record under its own id (imports), moving the id counter past it."""
+        raise NotImplementedError
+
+    def remove(self, record_id):
+        """Delete a record; returns it, or None if it did not exist."""
+        raise NotImplementedError
+
+    def is_unique(self, field, value, record_id=None):
+        """True if no other record holds `value` (case-insensitive) in a unique field."""
+        raise NotImplementedError
+
+    def find_by(self, field, value):
+        """Records whose owner field equals `value`, in id order."""
+        raise NotImplementedError
+
+    def detach(self, field, value):
+        """Null out an owner field on every record holding `value`; returns their ids."""
+        raise NotImplementedError
+
+    def subscribe(self, callback):
+        """Call callback(event, record) after each 'save' or 'remove' made by this process."""
+        raise NotImplementedError
+
+    def seed(self, records):
+        """Insert records with fixed ids if the collection is empty."""
+        raise NotImplementedError
+
+    def check(self):
+        """List any drift between the records and their indexes."""
+        raise NotImplementedError
+
+    def __contains__(self, record_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+# Pick a backend from STORAGE_BACKEND (memory | sqlite) and SQLITE_PATH.
+# With WAL_DIR set, the memory backend logs to WAL_DIR/<name> and recovers from it.
+def create_backend(kind=None, path=None, name='app'):
+    kind = kind or os.environ.get('STORAGE_BACKEND', 'memory')
+    if kind == 'memory':
+        from utils.store import MemoryBackend
+        log_dir = os.environ.get('WAL_DIR')
+        return MemoryBackend(COLLECTIONS, log_dir=log_dir and os.path.join(log_dir, name),
+                             snapshot_every=int(os.environ.get('WAL_SNAPSHOT_EVERY', 100_000)))
+    if kind == 'sqlite':
+        from utils.sqlite_store import SQLiteBackend
+        return SQLiteBackend(path or os.environ.get('SQLITE_PATH', 'data.db'), COLLECTIONS)
+    raise ValueError(f"Unknown storage backend '{kind}'")
@@ -0,0 +1,61 @@
+from utils.response import make_response, success_response
+
+MAX_BULK_ROWS = 50_000
+
+
+# Read {"<key>": [...], "atomic": bool} from a bulk payload; returns (rows, atomic, error)
+def parse_bulk_payload(data, key):
+    if not isinstance(data, dict):
+        return None, None, "Payload must be a valid JSON object"
+    rows = data.get(key)
+    if not isinstance(rows, list) or not rows:
+        return None, None, f"{key} must be a non-empty list"
+    if len(rows) > MAX_BULK_ROWS:
+        return None, None, f"{key} cannot contain more than {MAX_BULK_ROWS} rows"
+    atomic = data.get('atomic', True)
+    if not isinstance(atomic, bool):
+        return None, None, "atomic must be true or false"
+    return rows, atomic, None
+
+
+# Validate every row in one pass, then apply all of them (atomic) or only the valid ones
+def run_bulk(rows, prepare, commit, unique_keys=None, atomic=True):
+    """
+    prepare(row) -> (error, prepared) checks a row against the store;
+    unique_keys(row) -> [(field, folded value), ...] catches duplicates
+    inside the batch; commit(prepared) applies a row and returns its data.
+    Returns one result dict per row, in request order.
+    """
+    results, prepared_rows, seen = [], [], set()
+    for index, row in enumerate(rows):
+        error, prepared = prepare(row)
+        if error is None and unique_keys is not None:
+            keys = unique_keys(row)
+            duplicate = next((key for key in keys if key in seen), None)
+            if duplicate:
+                error = f"Duplicate {duplicate[0]} '{duplicate[1]}' within the batch"
+            else:
+                seen.update(keys)
+        results.append({'index': index, 'status': 'error' if error else 'valid', 'error': error})
+        prepared_rows.append(prepared)
+
+    failed = any(result['error'] for result in results)
+    for result, prepared in zip(results, prepared_rows):
+        if result['error'] is not None:
+            continue
+        if atomic and failed:
+            result['status'] = 'skipped'
+            continue
+        result['status'] = 'applied'
+        result['data'] = commit(prepared)
+    return results
+
+
+# Standard envelope for a bulk outcome
+def bulk_response(results, atomic, success_code=200):
+    applied = sum(1 for result in results if result['status'] == 'applied')
+    failed = sum(1 for result in results if result['status'] == 'error')
+    summary = {'atomic': atomic, 'applied': applied, 'failed': failed, 'results': results}
+    if atomic and failed:
+        return make_response("error", f"Bulk request rejected: {failed} of {len(results)} rows failed validation", summary, 400)
+    return success_response(f"{applied} of {len(results)} rows applied", summary, success_code if applied else 200)
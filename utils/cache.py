@@ -0,0 +1,96 @@
+import hashlib
+import os
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+from flask import Response, current_app, request
+
+from utils.pagination import wants_stream
+
+
+# LRU cache of serialized response bodies, one entry per key, bounded by count and bytes
+class ResponseCache:
+    """
+    Each key holds a single (version, value) pair: a lookup for any other
+    version is a miss, and storing the new version replaces the old entry,
+    so a collection that keeps changing does not pile up stale bodies.
+    Least recently used entries go first once there are more than
+    `max_entries` or their sizes pass `max_bytes` (RESPONSE_CACHE_MAX_BYTES,
+    default 64 MiB).
+    """
+
+    def __init__(self, max_entries=512, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 << 20) if max_bytes is None else max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # The value stored under `key` for this version, or None
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, size, version=None):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache a GET view's JSON body under the current data version and answer If-None-Match
+def cached(cache, version):
+    """
+    `version` is a zero-argument callable returning the version(s) of the
+    stores the view reads; entries are keyed by path and query string, so
+    the first render after a write replaces the body cached before it.
+
+    Timestamp rule: the cached body keeps the `timestamp` it was rendered
+    with, i.e. the time this version of the data was first served. That
+    keeps the body byte-identical for as long as its strong ETag is valid.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Streamed dumps are never buffered
+            if wants_stream(request.args):
+                return view(*args, **kwargs)
+
+            key = (request.path, request.query_string)
+            current = version()
+            entry = cache.get(key, current)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = (body, hashlib.blake2b(body, digest_size=12).hexdigest())
+                cache.put(key, entry, len(body), current)
+
+            body, etag = entry
+            response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
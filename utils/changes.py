@@ -0,0 +1,150 @@
+import os
+import threading
+
+from flask import Response
+
+from utils.locks import hold
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.records import now_timestamp
+from utils.response import bad_request_response, format_response, make_response, success_response
+from utils.serializers import encode_json
+
+MAX_WAIT_SECONDS = 60
+KEEPALIVE_SECONDS = 15
+
+
+# Bounded, process-local log of (seq, collection, op, record id), one entry per save or remove
+class ChangeFeed:
+    """
+    Entries live in a fixed-size ring (CHANGE_FEED_SIZE, default 10000);
+    sequence number s sits in slot s % capacity, so reading the changes
+    after any seq is a slice, and the oldest entry is overwritten once the
+    ring is full. Sequence numbers start from the clock (microseconds), so
+    they keep increasing across restarts and a cursor from before one is
+    answered with a resync instead of a wrong delta.
+
+    Entries hold ids only; readers look the records up when they answer,
+    so a client always gets the current state of whatever changed.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = int(os.environ.get('CHANGE_FEED_SIZE', 10_000) if capacity is None else capacity)
+        self._ring = [None] * self.capacity
+        self._seq = self._start = now_timestamp()
+        self._changed = threading.Condition()
+
+    # Record every save and remove on a collection under `name`
+    def watch(self, name, collection):
+        collection.subscribe(lambda event, record: self.append(name, event, record.id))
+
+    def append(self, name, op, record_id):
+        with self._changed:
+            self._seq += 1
+            self._ring[self._seq % self.capacity] = (self._seq, name, op, record_id)
+            self._changed.notify_all()
+
+    # Sequence number of the newest change
+    def latest(self):
+        return self._seq
+
+    # Up to `limit` entries after `since`, oldest first; None when some have already left the ring
+    def read(self, since, limit):
+        with self._changed:
+            latest = self._seq
+            if not max(self._start, latest - self.capacity) <= since <= latest:
+                return None
+            ring, capacity = self._ring, self.capacity
+            return [ring[seq % capacity] for seq in range(since + 1, min(latest, since + limit) + 1)]
+
+    # Block until there is a change after `since`; False on timeout
+    def wait(self, since, timeout):
+        with self._changed:
+            return self._changed.wait_for(lambda: self._seq > since, timeout)
+
+
+# Read since/limit/wait query parameters; returns (since or None, limit, wait seconds, error)
+def parse_changes_args(args, last_event_id=None):
+    since = args.get('since', last_event_id)
+    try:
+        since = None if since is None else int(since)
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        wait = float(args.get('wait', 0))
+    except (TypeError, ValueError):
+        return None, None, None, "since, limit and wait must be numbers"
+    if since is not None and since < 0:
+        return None, None, None, "since cannot be negative"
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, None, None, f"limit must be between 1 and {MAX_PAGE_SIZE}"
+    if not 0 <= wait <= MAX_WAIT_SECONDS:
+        return None, None, None, f"wait must be between 0 and {MAX_WAIT_SECONDS} seconds"
+    return since, limit, wait, None
+
+
+# Feed entries with each record's current state (None once it is gone)
+def describe_changes(entries, sources):
+    """
+    `sources` maps a collection name to (collection, serializer name);
+    entries for collections the app does not serve are skipped. Records
+    are read under the collections' read locks, taken once per batch.
+    """
+    changes = []
+    with hold(read=[collection for collection, _ in sources.values()]):
+        for seq, name, op, record_id in entries:
+            source = sources.get(name)
+            if source is None:
+                continue
+            record = source[0].get(record_id)
+            changes.append({'seq': seq, 'collection': name, 'op': op, 'id': record_id,
+                            'record': format_response(record, source[1]) if record is not None else None})
+    return changes
+
+
+# Server-Sent Events: one `change` event per entry, `resync` if the client falls behind the ring
+def stream_changes(feed, sources, since):
+    yield 'retry: 3000\n\n'
+    while True:
+        entries = feed.read(since, DEFAULT_PAGE_SIZE)
+        if entries is None:
+            yield 'event: resync\ndata: %s\n\n' % encode_json({'last_seq': feed.latest()})
+            return
+        if entries:
+            for change in describe_changes(entries, sources):
+                yield 'id: %d\nevent: change\ndata: %s\n\n' % (change['seq'], encode_json(change))
+            since = entries[-1][0]
+        elif not feed.wait(since, KEEPALIVE_SECONDS):
+            # Comment line: keeps proxies from closing an idle stream
+            yield ': keep-alive\n\n'
+
+
+# Answer a /changes request: JSON deltas (optionally long-polled), SSE, or 410 with a resync signal
+def changes_response(feed, sources, request):
+    """
+    Without `since`, returns the current position to start from. A JSON
+    answer's `last_seq` is the `since` for the next call; with wait=S an
+    empty answer is held for up to S seconds until a change arrives.
+    Clients that fell behind the ring get 410 and `resync: true`: reload
+    the collections, then continue from the returned `last_seq`.
+    """
+    since, limit, wait, error = parse_changes_args(request.args, request.headers.get('Last-Event-ID'))
+    if error:
+        return bad_request_response(error)
+
+    if request.accept_mimetypes.best == 'text/event-stream':
+        start = feed.latest() if since is None else since
+        return Response(stream_changes(feed, sources, start), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+    if since is None:
+        return success_response("Current change feed position", {'changes': [], 'last_seq': feed.latest(), 'more': False})
+
+    entries = feed.read(since, limit)
+    if entries == [] and wait:
+        feed.wait(since, wait)
+        entries = feed.read(since, limit)
+    if entries is None:
+        return make_response("error", f"Changes since {since} are no longer available; reload and continue from last_seq",
+                             {'resync': True, 'last_seq': feed.latest()}, 410)
+    return success_response("Changes retrieved successfully", {
+        'changes': describe_changes(entries, sources),
+        'last_seq': entries[-1][0] if entries else since,
+        'more': len(entries) == limit,
+    })
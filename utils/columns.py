@@ -0,0 +1,81 @@
+from array import array
+from itertools import compress
+from operator import and_
+
+
+# Contiguous numeric columns for the Stock Manager items
+class ItemColumns:
+    """
+    quantity, unit_price and total_price are mirrored into typed arrays,
+    one row per item, so valuation and filters run as single C-level
+    passes over a column (sum/min/max, map + compress) instead of touching
+    every Item object. Deletes swap the last row into the hole, so rows
+    stay dense; `_rows` maps item id -> row.
+    """
+
+    def __init__(self, items=()):
+        self.ids = array('q')
+        self.quantity = array('q')
+        self.unit_price = array('d')
+        self.total_price = array('d')
+        self._rows = {}
+        for item in items:
+            self.set(item)
+
+    # Insert or overwrite the row for an item; all or nothing, since the row is
+    # packed first and a value a typed column cannot hold raises before any column changes
+    def set(self, item):
+        item_id, quantity = array('q', (item.id, item.quantity))
+        unit_price, total_price = array('d', (item.unit_price, item.total_price))
+        row = self._rows.get(item_id)
+        if row is None:
+            self._rows[item_id] = len(self.ids)
+            self.ids.append(item_id)
+            self.quantity.append(quantity)
+            self.unit_price.append(unit_price)
+            self.total_price.append(total_price)
+        else:
+            self.quantity[row] = quantity
+            self.unit_price[row] = unit_price
+            self.total_price[row] = total_price
+
+    def discard(self, item_id):
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            for column in (self.ids, self.quantity, self.unit_price, self.total_price):
+                column[row] = column[last]
+            self._rows[moved] = row
+        for column in (self.ids, self.quantity, self.unit_price, self.total_price):
+            column.pop()
+
+    # Inventory valuation over the total_price column (counts as ints, values as floats)
+    def summary(self):
+        count = len(self.ids)
+        if not count:
+            return {'count': 0, 'total_quantity': 0, 'total_value': 0.0, 'min_value': None, 'max_value': None, 'mean_value': None}
+        total_value = sum(self.total_price)
+        return {
+            'count': count,
+            'total_quantity': sum(self.quantity),
+            'total_value': total_value,
+            'min_value': min(self.total_price),
+            'max_value': max(self.total_price),
+            'mean_value': total_value / count,
+        }
+
+    # Ids of items with quantity strictly below the threshold, in id order
+    def below_quantity(self, threshold):
+        return sorted(compress(self.ids, map(int(threshold).__gt__, self.quantity)))
+
+    # Ids of items whose unit price lies in [low, high], in id order
+    def price_between(self, low, high):
+        prices = self.unit_price
+        matches = map(and_, map(float(low).__le__, prices), map(float(high).__ge__, prices))
+        return sorted(compress(self.ids, matches))
+
+    def __len__(self):
+        return len(self.ids)
@@ -0,0 +1,96 @@
+import os
+import zlib
+
+from flask import request
+
+from utils.cache import ResponseCache
+
+# Content-Encoding -> zlib wbits (deflate in HTTP means the zlib format)
+ENCODINGS = {'gzip': 31, 'deflate': 15}
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+
+# Pick gzip or deflate from Accept-Encoding (q-values respected, gzip on ties); None for identity
+def negotiate_encoding(accept_encodings):
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# gzip/deflate for responses whose client asks for it
+class Compression:
+    """
+    Buffered bodies are compressed once they reach `min_size` bytes
+    (COMPRESS_MIN_SIZE, default 1024); smaller ones cost more to inflate
+    than they save. `level` (COMPRESS_LEVEL, 1-9, default 6) trades CPU
+    for size. Streamed bodies are compressed chunk by chunk, whatever
+    their size.
+
+    A response with a strong ETag is a fixed body (see utils.cache.cached),
+    so its compressed form is cached per path, query and encoding for that
+    ETag (a new ETag replaces the old body), and polling an
+    unchanged collection costs a dict lookup instead of a deflate. The
+    compressed response carries the weak form of that ETag, which still
+    matches If-None-Match, and every eligible response gets
+    Vary: Accept-Encoding so shared caches keep the variants apart.
+    """
+
+    def __init__(self, min_size=None, level=None, max_entries=256):
+        self.min_size = int(os.environ.get('COMPRESS_MIN_SIZE', 1024) if min_size is None else min_size)
+        self.level = int(os.environ.get('COMPRESS_LEVEL', 6) if level is None else level)
+        if not 1 <= self.level <= 9:
+            raise ValueError("COMPRESS_LEVEL must be between 1 and 9")
+        self.bodies = ResponseCache(max_entries)
+
+    def install(self, app):
+        app.after_request(self.compress)
+        return self
+
+    def compress(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        if response.is_streamed:
+            response.vary.add('Accept-Encoding')
+            encoding = negotiate_encoding(request.accept_encodings)
+            if encoding is not None:
+                response.response = self._stream(response.iter_encoded(), encoding)
+                response.headers['Content-Encoding'] = encoding
+                response.headers.pop('Content-Length', None)
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            key = (request.path, request.query_string, encoding, self.level)
+            compressed = self.bodies.get(key, etag)
+            if compressed is None:
+                compressed = zlib.compress(body, self.level, ENCODINGS[encoding])
+                self.bodies.put(key, compressed, len(compressed), etag)
+            response.set_etag(etag, weak=True)
+        else:
+            compressed = zlib.compress(body, self.level, ENCODINGS[encoding])
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _stream(self, chunks, encoding):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[encoding])
+        for chunk in chunks:
+            # Sync-flush each chunk so clients see records as they are produced
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
@@ -0,0 +1,33 @@
+import gc
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_depth = 0
+_resume = False
+
+
+# Hold off the cyclic GC while a block allocates millions of objects (loading records, building
+# indexes), which would otherwise trigger repeated full passes over everything already allocated
+@contextmanager
+def paused_gc():
+    """
+    The GC switch is process-wide, so pauses are depth-counted under a
+    lock: nested or overlapping blocks share one pause, and the GC comes
+    back (if it was on when the first began) only when the last one ends.
+    Meant for startup and bulk loads; a pause on a background thread
+    would stop collection for every request thread too.
+    """
+    global _depth, _resume
+    with _lock:
+        if not _depth:
+            _resume = gc.isenabled()
+            gc.disable()
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if not _depth and _resume:
+                gc.enable()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from utils.response import bad_request_response, make_response
+
+MAX_KEY_LENGTH = 255
+
+
+# A stored outcome of one keyed request
+class IdempotentResponse:
+    __slots__ = ('fingerprint', 'status', 'mimetype', 'body', 'expires')
+
+    def __init__(self, fingerprint, status, mimetype, body, expires):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.mimetype = mimetype
+        self.body = body
+        self.expires = expires
+
+
+# Responses to requests sent with an Idempotency-Key, bounded by count, bytes and age
+class IdempotencyCache:
+    """
+    Entries live for `ttl` seconds (IDEMPOTENCY_TTL, default 86400) and
+    are evicted least-recently-used first once there are more than
+    `max_entries` of them or their bodies pass `max_bytes`
+    (IDEMPOTENCY_MAX_BYTES, default 16 MiB).
+
+    While the first request with a key is running, the key is in flight:
+    duplicates wait for it to finish and then replay its response rather
+    than running the view a second time. `sync` (the backend's) is called
+    before a response is published, so a replay never reports a write
+    that is not yet durable.
+
+    The cache is per process; with several workers a retry that lands on
+    another worker is only caught by the usual uniqueness checks.
+    """
+
+    def __init__(self, ttl=None, max_entries=10_000, max_bytes=None, sync=None, wait_timeout=30):
+        self.ttl = float(os.environ.get('IDEMPOTENCY_TTL', 86400) if ttl is None else ttl)
+        self.max_entries = max_entries
+        self.max_bytes = int(os.environ.get('IDEMPOTENCY_MAX_BYTES', 16 << 20) if max_bytes is None else max_bytes)
+        self.sync = sync
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    # Claim a key; returns (stored response or None, claimed?). Waits while another request holds it
+    def begin(self, key, fingerprint):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires <= time.monotonic():
+                    self._evict(key)
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    if entry.fingerprint == fingerprint:
+                        self.replays += 1
+                    return entry, False
+                done = self._in_flight.get(key)
+                if done is None:
+                    self._in_flight[key] = threading.Event()
+                    return None, True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not done.wait(remaining):
+                return None, False
+
+    # Store the claimed request's response (skipped for server errors, so those can be retried)
+    def finish(self, key, fingerprint, response):
+        if response.status_code < 500 and not response.is_streamed:
+            if self.sync is not None:
+                self.sync()
+            body = response.get_data()
+            entry = IdempotentResponse(fingerprint, response.status_code, response.mimetype, body,
+                                       time.monotonic() + self.ttl)
+            with self._lock:
+                if key in self._entries:
+                    self._evict(key)
+                self._entries[key] = entry
+                self._bytes += len(body)
+                self._trim()
+
+    # Let waiting duplicates go, whether or not a response was stored
+    def release(self, key):
+        with self._lock:
+            done = self._in_flight.pop(key, None)
+        if done is not None:
+            done.set()
+
+    def _evict(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    # Drop expired entries from the cold end, then least recently used ones until within bounds
+    def _trim(self):
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires > now and len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            self._evict(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Answer a retried POST from the cache when it carries an Idempotency-Key already seen
+def idempotent(cache):
+    """
+    Keys are scoped to the route, and the request body is fingerprinted:
+    reusing a key with a different payload is rejected with 422 instead
+    of replaying a response that belongs to another request. Replays carry
+    Idempotent-Replayed: true. Requests without the header run as usual.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return bad_request_response(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+            key = (request.path, key)
+            fingerprint = hashlib.blake2b(request.get_data(), digest_size=16).digest()
+            entry, claimed = cache.begin(key, fingerprint)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    return make_response("error", "Idempotency-Key was already used with a different request", None, 422)
+                response = Response(entry.body, entry.status, mimetype=entry.mimetype)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if not claimed:
+                return make_response("error", "A request with this Idempotency-Key is still in progress", None, 409)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+                cache.finish(key, fingerprint, response)
+                return response
+            finally:
+                cache.release(key)
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+# Case-folded unique index for a single field (e.g. users.email)
+class UniqueIndex:
+    """
+    Keep a folded value -> record id map so uniqueness checks are O(1).
+    A reverse record id -> folded value map lets updates and deletes
+    drop the old entry without the caller knowing the previous value.
+    """
+
+    def __init__(self, field, tables=None):
+        self.field = field
+        self._ids = {}
+        self._values = {}
+        if tables is not None:
+            self.rebuild(tables)
+
+    # Compare values case-insensitively, as text
+    @staticmethod
+    def fold(value):
+        return str(value).lower()
+
+    # Rebuild the index from a dict (id -> record) or a list of records with an 'id'
+    def rebuild(self, tables):
+        self._ids.clear()
+        self._values.clear()
+        pairs = tables.items() if hasattr(tables, 'items') else ((record.id, record) for record in tables)
+        ids, values, field = self._ids, self._values, self.field
+        for record_id, record in pairs:
+            value = getattr(record, field, None)
+            if value is not None:
+                folded = self.fold(value)
+                ids[folded] = record_id
+                values[record_id] = folded
+
+    # True if no other record holds this value; a record may keep its own value
+    def is_unique(self, value, record_id=None):
+        owner = self._ids.get(self.fold(value))
+        return owner is None or owner == record_id
+
+    def add(self, record_id, value):
+        self.discard(record_id)
+        folded = self.fold(value)
+        self._ids[folded] = record_id
+        self._values[record_id] = folded
+
+    # Re-point a record at a new value, dropping whatever it held before
+    def update(self, record_id, value):
+        self.add(record_id, value)
+
+    def discard(self, record_id):
+        folded = self._values.pop(record_id, None)
+        if folded is not None and self._ids.get(folded) == record_id:
+            del self._ids[folded]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# Secondary index on a foreign key (e.g. tasks.user_id -> user)
+class OwnerIndex:
+    """
+    Keep owner -> record ids so per-owner reads and cascades touch only
+    that owner's records. Records without an owner (None) are not indexed.
+    """
+
+    def __init__(self, field, tables=None):
+        self.field = field
+        self._by_owner = {}
+        self._owners = {}
+        if tables is not None:
+            self.rebuild(tables)
+
+    def rebuild(self, tables):
+        self._by_owner.clear()
+        self._owners.clear()
+        by_owner, owners, field = self._by_owner, self._owners, self.field
+        for record_id, record in tables.items():
+            owner = getattr(record, field, None)
+            if owner is not None:
+                by_owner.setdefault(owner, {})[record_id] = None
+                owners[record_id] = owner
+
+    # Point a record at a new owner (or None), dropping the previous one
+    def set_owner(self, record_id, owner):
+        self.discard(record_id)
+        if owner is not None:
+            self._by_owner.setdefault(owner, {})[record_id] = None
+            self._owners[record_id] = owner
+
+    def discard(self, record_id):
+        owner = self._owners.pop(record_id, None)
+        if owner is not None:
+            ids = self._by_owner[owner]
+            del ids[record_id]
+            if not ids:
+                del self._by_owner[owner]
+
+    # Record ids held by an owner, in id order
+    def ids_for(self, owner):
+        return sorted(self._by_owner.get(owner, ()))
+
+    # Detach every record from an owner and return their ids
+    def pop_owner(self, owner):
+        ids = self._by_owner.pop(owner, {})
+        for record_id in ids:
+            del self._owners[record_id]
+        return list(ids)
+
+    def owner_of(self, record_id):
+        return self._owners.get(record_id)
+
+
+# Compare an owner index against the primary store and list every mismatch
+def check_owner_index(index, tables):
+    problems = []
+    for record_id, record in tables.items():
+        expected = getattr(record, index.field, None)
+        actual = index.owner_of(record_id)
+        if expected != actual:
+            problems.append(f"record {record_id}: {index.field} is {expected!r} but index has {actual!r}")
+    for owner, ids in index._by_owner.items():
+        for record_id in ids:
+            if record_id not in tables:
+                problems.append(f"record {record_id}: indexed under {index.field} {owner!r} but missing from store")
+    return problems
@@ -0,0 +1,109 @@
+import threading
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from itertools import count
+
+_ranks = count()
+
+
+# Next position in the global lock acquisition order
+def next_rank():
+    return next(_ranks)
+
+
+# Reader/writer lock: many concurrent readers, one writer at a time
+class RWLock:
+    """
+    Writers are preferred: once a writer is waiting, new readers queue
+    behind it so a steady stream of GETs cannot starve writes. A thread
+    already holding the lock (read or write) may take a read again.
+    `rank` gives every lock a fixed place in the acquisition order.
+    """
+
+    def __init__(self):
+        self.rank = next_rank()
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+
+# Rank-ordered (lock, mode) pairs for the given stores
+def _plan(read, write):
+    modes = {store.lock.rank: (store.lock, 'read') for store in read}
+    modes.update({store.lock.rank: (store.lock, 'write') for store in write})
+    return [modes[rank] for rank in sorted(modes)]
+
+
+# Enter every lock in a plan; released when the stack closes
+def _acquire(stack, plan):
+    for lock, mode in plan:
+        stack.enter_context(lock.write() if mode == 'write' else lock.read())
+
+
+# Hold read/write locks on the given stores for the duration of a view
+def locked(read=(), write=()):
+    """
+    Locks are always taken in rank order, so views touching several
+    stores (e.g. users then tasks) cannot deadlock against each other.
+    A store listed under both read and write is write-locked.
+    """
+    plan = _plan(read, write)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with ExitStack() as stack:
+                _acquire(stack, plan)
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Same as locked, for a block of code (e.g. one chunk of a long import)
+@contextmanager
+def hold(read=(), write=()):
+    with ExitStack() as stack:
+        _acquire(stack, _plan(read, write))
+        yield
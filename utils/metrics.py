@@ -0,0 +1,248 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, request
+
+# Upper bounds (seconds) of the fixed latency buckets; +Inf is implied
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PHASES = ('validation', 'store', 'serialize')
+SHARD_LIMIT = 256
+
+_clock = time.perf_counter
+_request = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# {name="value",...} for the Prometheus text format
+def _labels(names, values):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}' if names else ''
+
+
+# Per-thread shards: writers only touch their own thread's dict, so no lock on the hot path
+class _Sharded:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                if len(self._shards) >= SHARD_LIMIT:
+                    self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    # Fold shards of finished threads (e.g. the dev server's thread per request) into one
+    def _retire_dead(self):
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for labels, series in shard.items():
+                    self._merge(self._retired, labels, series)
+        self._shards = alive
+
+    # Sum of every shard, keyed by label values
+    def collect(self):
+        with self._lock:
+            self._retire_dead()
+            totals = {}
+            for labels, series in self._retired.items():
+                self._merge(totals, labels, series)
+            for _, shard in self._shards:
+                for labels, series in list(shard.items()):
+                    self._merge(totals, labels, series)
+        return totals
+
+
+# Request timings per (route, method, status) in one flat series per thread shard
+class RequestStats(_Sharded):
+    """
+    A series is one histogram block for total latency followed by one
+    block per phase in PHASES; each block is a count per bucket (+Inf
+    last) and then the sum. Keeping everything for a request in one list
+    means finishing a request costs one shard lookup and one dict lookup.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        super().__init__()
+        self.buckets = buckets
+        self.width = len(buckets) + 2
+
+    def record(self, key, elapsed, phases):
+        # The common case (a known key on a thread that has recorded before) is one attribute and one dict lookup
+        try:
+            series = self._local.shard[key]
+        except (AttributeError, KeyError):
+            series = self._shard()[key] = [0] * (self.width * (len(phases) + 1))
+        buckets, width = self.buckets, self.width
+        series[bisect_left(buckets, elapsed)] += 1
+        series[width - 1] += elapsed
+        offset = width
+        for seconds in phases:
+            if seconds:
+                series[offset + bisect_left(buckets, seconds)] += 1
+                series[offset + width - 1] += seconds
+            offset += width
+
+    def _merge(self, totals, key, series):
+        total = totals.get(key)
+        if total is None:
+            totals[key] = list(series)
+        else:
+            for index, value in enumerate(series):
+                total[index] += value
+
+    # One histogram family from {label values: block}
+    def _histogram(self, name, label_names, blocks):
+        lines = []
+        names = label_names + ('le',)
+        for labels, block in sorted(blocks.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), block):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {block[-1]}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {cumulative}')
+        return lines
+
+    def render(self):
+        width = self.width
+        stats = self.collect()
+        latency, phases = {}, {}
+        requests = []
+        for (route, method, status), series in sorted(stats.items()):
+            requests.append(f'http_requests_total{_labels(("route", "method", "status"), (route, method, status))} {sum(series[:width - 1])}')
+            self._merge(latency, (route, method), series[:width])
+            for number, name in enumerate(PHASES, 1):
+                block = series[number * width:(number + 1) * width]
+                if any(block[:-1]):
+                    self._merge(phases, (route, name), block)
+        return [
+            '# HELP http_requests_total Requests handled, by route, method and status',
+            '# TYPE http_requests_total counter',
+            *requests,
+            '# HELP http_request_duration_seconds Request latency from before_request to the last after_request hook',
+            '# TYPE http_request_duration_seconds histogram',
+            *self._histogram('http_request_duration_seconds', ('route', 'method'), latency),
+            '# HELP http_request_phase_seconds Time spent per request phase',
+            '# TYPE http_request_phase_seconds histogram',
+            *self._histogram('http_request_phase_seconds', ('route', 'phase'), phases),
+        ]
+
+
+# Value read at scrape time from a callback returning [(label values, value), ...]
+class Gauge:
+    def __init__(self, name, help, label_names, read, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.read = read
+        self.kind = kind
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}',
+                *(f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in self.read())]
+
+
+# Attribute the wrapped call's time to a request phase (validation, store or serialize)
+def phase(name):
+    """
+    Phases nest: while an inner phase runs, the outer one is paused, so
+    e.g. a save inside validation counts as store time.
+    Outside a request the wrapper just calls through.
+    """
+    index = PHASES.index(name)
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            # state = [phase totals, running phase index or -1, time it (re)started, request start]
+            state = getattr(_request, 'state', None)
+            if state is None:
+                return function(*args, **kwargs)
+            totals, outer, mark, _ = state
+            now = _clock()
+            if outer >= 0:
+                totals[outer] += now - mark
+            state[1], state[2] = index, now
+            try:
+                return function(*args, **kwargs)
+            finally:
+                now = _clock()
+                totals[index] += now - state[2]
+                state[1], state[2] = outer, now
+        return wrapper
+    return decorator
+
+
+# Time a collection's coarse operations as the 'store' phase
+def instrument_store(collection, methods=('page', 'save', 'remove', 'detach')):
+    """
+    Point lookups (get, is_unique, find_by, allocate_id) stay unwrapped:
+    requests make several of them, and on the memory backend each is a
+    dict hit cheaper than the timer around it would be. Their time counts
+    towards whichever phase calls them. values() is left out too: it hands
+    back an iterator, so the timer would only see it being created.
+    """
+    for method in methods:
+        setattr(collection, method, phase('store')(getattr(collection, method)))
+    return collection
+
+
+# Per-app registry: request timings plus scrape-time gauges
+class Metrics:
+    def __init__(self):
+        self.stats = RequestStats()
+        self.gauges = []
+
+    def gauge(self, name, help, label_names, read, kind='gauge'):
+        self.gauges.append(Gauge(name, help, label_names, read, kind))
+
+    # Begin timing a request on this thread
+    def start_request(self):
+        now = _clock()
+        _request.state = [[0.0] * len(PHASES), -1, now, now]
+
+    # Record the finished request; phases that never ran are not observed
+    def finish_request(self, route, method, status):
+        state = getattr(_request, 'state', None)
+        if state is None:
+            return
+        elapsed = _clock() - state[3]
+        _request.state = None
+        self.stats.record((route, method, status), elapsed, state[0])
+
+    # Prometheus text exposition format (version 0.0.4)
+    def render(self):
+        lines = self.stats.render()
+        for gauge in self.gauges:
+            lines.extend(gauge.render())
+        return '\n'.join(lines) + '\n'
+
+    # Hook the timers into a Flask app and serve GET /metrics
+    def install(self, app):
+        @app.before_request
+        def start_timer():
+            self.start_request()
+
+        @app.after_request
+        def stop_timer(response):
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.finish_request(route, request.method, response.status_code)
+            return response
+
+        @app.route('/metrics', methods=['GET'])
+        def get_metrics():
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+        return self
@@ -0,0 +1,53 @@
+import json
+from datetime import datetime, timezone
+
+from utils.serializers import SERIALIZERS
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+# Read limit/cursor query parameters; returns (limit, cursor, error)
+def parse_page_args(args):
+    limit = args.get('limit', DEFAULT_PAGE_SIZE if 'cursor' in args else None)
+    cursor = args.get('cursor', 0)
+    try:
+        limit = None if limit is None else int(limit)
+        cursor = int(cursor)
+    except (TypeError, ValueError):
+        return None, None, "limit and cursor must be integers"
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, None, f"limit must be between 1 and {MAX_PAGE_SIZE}"
+    if cursor < 0:
+        return None, None, "cursor cannot be negative"
+    return limit, cursor, None
+
+
+# True when the client opted into a streamed full dump
+def wants_stream(args):
+    return args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+# Stream a whole store as the standard success envelope, one page at a time
+def stream_records(store, message, data_type, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the same JSON body success_response would produce, but walks
+    the store by keyset pages so only one chunk of JSON is ever held in
+    memory. Pages come from one snapshot, so the dump is a consistent
+    view of the store and no lock is held while it is sent.
+    Records go through the registered serializer for `data_type`.
+    """
+    encode = SERIALIZERS[data_type].encode
+    yield '{"data":['
+    cursor, first = 0, True
+    with store.snapshot() as snapshot:
+        while cursor is not None:
+            records, cursor = snapshot.page(cursor, chunk_size)
+            if not records:
+                break
+            chunk = ','.join(map(encode, records))
+            yield chunk if first else ',' + chunk
+            first = False
+    yield '],"message":%s,"status":"success","timestamp":%s}\n' % (
+        json.dumps(message), json.dumps(datetime.now(timezone.utc).isoformat()))
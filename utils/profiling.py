@@ -0,0 +1,142 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, request
+
+from utils.response import not_found_response
+
+# Stacks are cut at this Flask frame, so they start at the request (hooks, view, response encoding)
+ROOT_FRAME = 'full_dispatch_request'
+
+
+# Sampling stack profiler for selected requests, aggregated per route as collapsed stacks
+class Profiler:
+    """
+    A request is profiled when it wins the PROFILE_SAMPLE_RATE draw (0-1,
+    default 0) or sends X-Profile with the PROFILE_ADMIN_TOKEN. While any
+    profiled request is running, a background thread reads the stacks of
+    just those request threads every PROFILE_INTERVAL seconds (default
+    0.001) and counts each distinct stack under "METHOD route".
+
+    GET /admin/profile returns the counts in collapsed-stack format, one
+    "frame;frame;... count" line per stack, ready for flamegraph.pl or
+    speedscope (?route= narrows it to one route); DELETE clears them. Both
+    need X-Admin-Token, so a sample rate without a token is refused.
+
+    Without a token, install() adds no hooks and no route, so requests
+    pay nothing.
+    """
+
+    def __init__(self, sample_rate=None, token=None, interval=None):
+        self.sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0) if sample_rate is None else sample_rate)
+        self.token = os.environ.get('PROFILE_ADMIN_TOKEN') if token is None else token
+        self.interval = float(os.environ.get('PROFILE_INTERVAL', 0.001) if interval is None else interval)
+        if not 0 <= self.sample_rate <= 1:
+            raise ValueError("PROFILE_SAMPLE_RATE must be between 0 and 1")
+        if self.sample_rate and not self.token:
+            raise ValueError("PROFILE_SAMPLE_RATE needs PROFILE_ADMIN_TOKEN to protect /admin/profile")
+        self.stacks = Counter()
+        self.profiled = Counter()
+        self._active = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._sampler = None
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def install(self, app):
+        if not self.enabled:
+            return self
+
+        @app.before_request
+        def start_profile():
+            if request.url_rule is not None and self._wanted():
+                self.start(f'{request.method} {request.url_rule.rule}')
+
+        @app.teardown_request
+        def stop_profile(error=None):
+            self.stop()
+
+        @app.route('/admin/profile', methods=['GET', 'DELETE'])
+        def get_profile():
+            # Compared as bytes: compare_digest raises TypeError on non-ASCII str
+            if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), self.token.encode()):
+                return not_found_response()
+            if request.method == 'DELETE':
+                self.reset()
+                return Response(status=204)
+            return Response(self.collapsed(request.args.get('route')), mimetype='text/plain')
+        return self
+
+    def _wanted(self):
+        header = request.headers.get('X-Profile')
+        if header is not None and hmac.compare_digest(header.encode(), self.token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # Begin sampling the current thread under `route`
+    def start(self, route):
+        with self._lock:
+            self._active[threading.get_ident()] = route
+            self.profiled[route] += 1
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._sampler.start()
+            self._wake.notify()
+
+    def stop(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.profiled.clear()
+
+    # Sampler thread: sleeps until a profiled request starts, then samples until none are left
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+                active = dict(self._active)
+            frames = sys._current_frames()
+            samples = [(ident, route, self._stack(frames[ident])) for ident, route in active.items() if ident in frames]
+            del frames
+            with self._lock:
+                for ident, route, stack in samples:
+                    # Skip threads that finished their request while the stacks were being read
+                    if stack and self._active.get(ident) == route:
+                        self.stacks[(route,) + stack] += 1
+            time.sleep(self.interval)
+
+    # Frame labels from ROOT_FRAME (outermost) to the running function; () if not inside a request yet
+    def _stack(self, frame):
+        labels = self._labels
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = f"{code.co_name} ({frame.f_globals.get('__name__', '?')})"
+            stack.append(label)
+            if code.co_name == ROOT_FRAME:
+                stack.reverse()
+                return tuple(stack)
+            frame = frame.f_back
+        return ()
+
+    # Collapsed-stack text: "METHOD route;outer;...;inner count" per line
+    def collapsed(self, route=None):
+        with self._lock:
+            stacks = list(self.stacks.items())
+        lines = [f"{';'.join(stack)} {count}" for stack, count in sorted(stacks) if route is None or stack[0].endswith(' ' + route)]
+        return '\n'.join(lines) + '\n' if lines else ''
@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from functools import lru_cache
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# Current UTC time as integer microseconds since the epoch
+def now_timestamp():
+    return time.time_ns() // 1000
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat()[:19]
+
+
+# Epoch microseconds -> the ISO-8601 string the API has always returned
+def format_timestamp(value):
+    if value is None:
+        return None
+    seconds, micros = divmod(value, 1_000_000)
+    if micros:
+        return '%s.%06d+00:00' % (_format_seconds(seconds), micros)
+    return _format_seconds(seconds) + '+00:00'
+
+
+# ISO-8601 string -> epoch microseconds (inverse of format_timestamp)
+def parse_timestamp(value):
+    if value is None:
+        return None
+    delta = datetime.fromisoformat(value) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class TaskStatus(Enum):
+    PENDING = 'pending'
+    IN_PROGRESS = 'in-progress'
+    COMPLETED = 'completed'
+
+
+# Shared helpers for the slotted record types below
+class Record:
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def copy(self):
+        return type(self)(**{name: getattr(self, name) for name in self.__slots__})
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class User(Record):
+    __slots__ = ('id', 'firstName', 'lastName', 'email', 'phone')
+
+
+class Task(Record):
+    """
+    Timestamps are epoch microseconds and status is a TaskStatus; both are
+    turned back into today's JSON strings by the serializer in utils/response.py.
+    """
+    __slots__ = ('id', 'user_id', 'title', 'description', 'status', 'duration',
+                 'created_at', 'updated_at', 'completed_at')
+
+
+class Item(Record):
+    __slots__ = ('id', 'name', 'quantity', 'unit_price', 'total_price', 'description')
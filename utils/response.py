@@ -1,15 +1,24 @@
 from datetime import datetime,timezone
+from utils.metrics import phase
+from utils.records import format_timestamp
+from utils.serializers import SERIALIZERS, RawJSON, register_serializer
+
+# Field lists for each resource, declared once and compiled into serializers.
+# Compact record values (epoch timestamps, TaskStatus) become JSON strings here.
+item_serializer = register_serializer('item', ('id', 'name', 'quantity', 'unit_price', 'total_price', 'description'), plural='items')
+user_serializer = register_serializer('user', ('id', 'firstName', 'lastName', 'email', 'phone'), plural='users')
+task_serializer = register_serializer('task', (
+    'id', 'user_id', 'title', 'description',
+    ('status', lambda status: status.value),
+    'duration',
+    ('created_at', format_timestamp),
+    ('updated_at', format_timestamp),
+    ('completed_at', format_timestamp),
+), plural='tasks')
 
 # Helper function for single item formatting
 def format_item(item):
-    return {
-        'id': item['id'],
-        'name': item['name'],
-        'quantity': item['quantity'],
-        'unit_price': item['unit_price'],
-        'total_price': item['total_price'],
-        'description': item['description'],
-    }
+    return item_serializer.to_dict(item)
 
 # Helper function for multiple items formatting
 def format_items(items):
@@ -27,27 +36,11 @@ def make_response(status, message, data=None, code=200):
 
 # Helper functions to format user
 def format_user(user):
-    return {
-        'id': user['id'],
-        'firstName': user['firstName'],
-        'lastName': user['lastName'],
-        'email': user['email'],
-        'phone': user['phone']
-    }
+    return user_serializer.to_dict(user)
 
 # Helper functions to format task
 def format_task(task):
-    return {
-        'id': task['id'],
-        'user_id': task['user_id'],
-        'title': task['title'],
-        'description': task['description'],
-        'status': task['status'],
-        'duration': task['duration'],
-        'created_at': task['created_at'],
-        'updated_at': task['updated_at'],
-        'completed_at': task['completed_at']    
-    }
+    return task_serializer.to_dict(task)
 
 # Helper functions to format list of users
 def format_users(users):
@@ -61,6 +54,12 @@ def format_tasks(tasks):
 def success_response(message, data=None, status_code=200):
     return make_response("success", message, data, status_code)
 
+# Success response for one keyset page; next_cursor is None on the last page
+def paginated_response(message, data, next_cursor, limit):
+    body, code = success_response(message, data)
+    body['pagination'] = {'limit': limit, 'next_cursor': next_cursor}
+    return body, code
+
 
 #not found helper function responses
 def not_found_response(message="Resource not found"):
@@ -70,23 +69,20 @@ def not_found_response(message="Resource not found"):
 def bad_request_response(message="Bad request"):
     return make_response("error", message, None, 400)
 
+# 400 for schema errors: the first message, with every field's error under data.errors
+def validation_error_response(errors):
+    return make_response("error", next(iter(errors.values())), {'errors': errors}, 400)
+
 # internal server error helper function responses
 def internal_error_response(message="Internal server error"):
     return make_response("error", message, None, 500)
 
-# Format data based on type
+# Format data based on type; registered types are encoded straight to JSON text
+@phase('serialize')
 def format_response(data, data_type):
-    if data_type == 'user':
-        return format_user(data)
-    elif data_type == 'task':
-        return format_task(data)
-    elif data_type == 'users':
-        return format_users(data)
-    elif data_type == 'tasks':
-        return format_tasks(data)
-    elif data_type == 'item':
-        return format_item(data)
-    elif data_type == 'items':
-        return format_items(data)
-    else:
-        return data
\ No newline at end of file
+    serializer = SERIALIZERS.get(data_type)
+    if serializer is None:
+        return data
+    if data_type == serializer.name:
+        return RawJSON(serializer.encode(data))
+    return RawJSON(serializer.encode_many(data))
@@ -0,0 +1,182 @@
+import re
+
+from utils.validators import validate_payload
+
+_MISSING = object()
+
+
+# One check on a field; `test` is a Python expression over `v` that is true when v is INVALID
+class Rule:
+    def __init__(self, message=None):
+        self.custom_message = message
+
+    def message(self, field):
+        return self.custom_message or self.default_message(field)
+
+    def default_message(self, field):
+        return f"{field.capitalize()} is invalid"
+
+    # Source for the failing condition; extra names go into `namespace` under `prefix`
+    def test(self, prefix, namespace):
+        raise NotImplementedError
+
+
+# Present and not blank once stringified (same as validate_required_fields)
+class Required(Rule):
+    def default_message(self, field):
+        return f"{field.capitalize()} is required and cannot be empty"
+
+    def test(self, prefix, namespace):
+        return 'not str(v).strip()'
+
+
+# Letters only, at least `min` of them (same as validate_field_length)
+class Alpha(Rule):
+    def __init__(self, min=3, message=None):
+        super().__init__(message)
+        self.min = min
+
+    def default_message(self, field):
+        return f"{field.capitalize()} cannot be less than {self.min} alphabetic characters"
+
+    def test(self, prefix, namespace):
+        return f'not (isinstance(v, str) and v.isalpha() and len(v) >= {self.min})'
+
+
+# String matching a regex compiled once, at schema build time
+class Pattern(Rule):
+    def __init__(self, pattern, message=None):
+        super().__init__(message)
+        self.regex = re.compile(pattern)
+
+    def test(self, prefix, namespace):
+        namespace[f'{prefix}_match'] = self.regex.match
+        return f'not isinstance(v, str) or {prefix}_match(v) is None'
+
+
+# Digit string of at least `min_length` starting with one of `prefixes`
+class DigitsWithPrefix(Rule):
+    """
+    Prefixes are grouped by length into sets, so the check is one slice
+    and one set lookup per distinct prefix length instead of a startswith
+    loop over the whole list.
+    """
+
+    def __init__(self, prefixes, min_length, message=None):
+        super().__init__(message)
+        self.by_length = {}
+        for value in prefixes:
+            self.by_length.setdefault(len(value), set()).add(value)
+        self.min_length = min_length
+
+    def test(self, prefix, namespace):
+        lookups = []
+        for length, values in sorted(self.by_length.items()):
+            namespace[f'{prefix}_{length}'] = frozenset(values)
+            lookups.append(f'v[:{length}] in {prefix}_{length}')
+        return f"not (isinstance(v, str) and v.isdigit() and len(v) >= {self.min_length} and ({' or '.join(lookups)}))"
+
+
+# int (or float, with floats=True) no smaller than `min` (same as positive_integer/positive_value)
+# and, when `max` is set, no larger than it, so values fit the int64/float columns they are stored in
+class Positive(Rule):
+    def __init__(self, min=1, max=None, floats=False, message=None):
+        super().__init__(message)
+        self.min = min
+        self.max = max
+        self.floats = floats
+
+    def default_message(self, field):
+        kind = 'number' if self.floats else 'integer'
+        if self.max is None:
+            return f"{field} must be a positive {kind}"
+        return f"{field} must be a positive {kind} no greater than {self.max}"
+
+    def test(self, prefix, namespace):
+        upper = '' if self.max is None else f' <= {self.max}'
+        check = f'(isinstance(v, int) and {self.min} <= v{upper})'
+        if self.floats:
+            upper = '' if self.max is None else f' <= {float(self.max)!r}'
+            check += f' or (isinstance(v, float) and {float(self.min)!r} <= v{upper})'
+        return f'not ({check})'
+
+
+# A real int (not a bool) no larger than `max` when set, or None when nullable
+class Integer(Rule):
+    def __init__(self, nullable=False, max=None, message=None):
+        super().__init__(message)
+        self.nullable = nullable
+        self.max = max
+
+    def default_message(self, field):
+        if self.max is None:
+            return f"{field} must be an integer"
+        return f"{field} must be an integer no greater than {self.max}"
+
+    def test(self, prefix, namespace):
+        test = 'not isinstance(v, int) or isinstance(v, bool)'
+        if self.max is not None:
+            test += f' or v > {self.max}'
+        return f'v is not None and ({test})' if self.nullable else test
+
+
+# One of a fixed set of values (unhashable values, like JSON lists and objects, never are)
+class OneOf(Rule):
+    def __init__(self, values, message=None):
+        super().__init__(message)
+        self.values = frozenset(values)
+
+    def test(self, prefix, namespace):
+        namespace[f'{prefix}_values'] = self.values
+        return f'v.__hash__ is None or v not in {prefix}_values'
+
+
+# An endpoint's payload rules, compiled into one function at import time
+class Schema:
+    """
+    `fields` maps field name -> list of rules, checked in order; the first
+    failing rule gives that field's error and the rest are skipped. Every
+    field is checked, so one call reports all invalid fields at once as
+    {field: message}, in declaration order (empty dict = valid).
+
+    A missing field is an error only if its rules include Required and
+    the schema is not `partial`; partial schemas (updates) check only
+    the fields that are present.
+    """
+
+    def __init__(self, name, fields, partial=False):
+        self.name = name
+        self.fields = fields
+        self.partial = partial
+        self.validate = self._compile()
+
+    def _compile(self):
+        namespace = {'_missing': _MISSING, '_validate_payload': validate_payload}
+        lines = [
+            'def validate(data):',
+            '    if not isinstance(data, dict) or not data:',
+            "        return {'payload': _validate_payload(data)}",
+            '    errors = {}',
+            '    get = data.get',
+        ]
+        for number, (field, rules) in enumerate(self.fields.items()):
+            lines.append(f'    v = get({field!r}, _missing)')
+            required = next((rule for rule in rules if isinstance(rule, Required)), None)
+            lines.append('    if v is _missing:')
+            if required is not None and not self.partial:
+                lines.append(f'        errors[{field!r}] = {required.message(field)!r}')
+            else:
+                lines.append('        pass')
+            for index, rule in enumerate(rules):
+                test = rule.test(f'_f{number}_r{index}', namespace)
+                lines.append(f'    elif {test}:')
+                lines.append(f'        errors[{field!r}] = {rule.message(field)!r}')
+        lines.append('    return errors')
+        source = '\n'.join(lines) + '\n'
+        exec(compile(source, f'<schema {self.name}>', 'exec'), namespace)
+        return namespace['validate']
+
+
+# One line listing every error, or None if there are none (bulk results carry one string per row)
+def describe_errors(errors):
+    return '; '.join(errors.values()) if errors else None
@@ -0,0 +1,119 @@
+import json
+import math
+from json.encoder import encode_basestring_ascii
+
+from flask.json.provider import DefaultJSONProvider
+
+from utils.metrics import phase
+
+# name -> Serializer, filled by register_serializer
+SERIALIZERS = {}
+
+
+# Pre-encoded JSON fragment that the JSON provider splices in verbatim
+class RawJSON:
+    __slots__ = ('json',)
+
+    def __init__(self, json_text):
+        self.json = json_text
+
+
+def _encode_float(value):
+    return float.__repr__(value) if math.isfinite(value) else json.dumps(value)
+
+
+# Per-type encoders matching json.dumps(ensure_ascii=True) output
+_VALUE_ENCODERS = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: _encode_float,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+}
+
+
+def encode_value(value, _encoders=_VALUE_ENCODERS):
+    encoder = _encoders.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+# A resource's field list compiled into a dict builder and a direct JSON encoder
+class Serializer:
+    """
+    Fields are record attribute names, or (name, converter) pairs for
+    values stored in a compact form (e.g. epoch timestamps, enums).
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = tuple((field, None) if isinstance(field, str) else tuple(field) for field in fields)
+        self.converters = {f'_c_{field}': converter for field, converter in self.fields if converter}
+        self.to_dict = self._compile_to_dict()
+        self.encode = self._compile_encode()
+
+    def _value(self, field, converter):
+        return f'_c_{field}(r.{field})' if converter else f'r.{field}'
+
+    def _compile_to_dict(self):
+        items = ', '.join(f'{field!r}: {self._value(field, converter)}' for field, converter in self.fields)
+        return self._build(f'def to_dict(r):\n    return {{{items}}}\n', 'to_dict')
+
+    # Keys are written in sorted order so output is byte-identical to Flask's provider
+    def _compile_encode(self):
+        fields = sorted(self.fields)
+        template = '{' + ','.join(f'{json.dumps(field)}:%s' for field, _ in fields) + '}'
+        values = ', '.join(f'_v({self._value(field, converter)})' for field, converter in fields)
+        source = f'def encode(r, _v=encode_value):\n    return {template!r} % ({values},)\n'
+        return self._build(source, 'encode')
+
+    def _build(self, source, name):
+        namespace = {'encode_value': encode_value, **self.converters}
+        exec(compile(source, f'<serializer {self.name}.{name}>', 'exec'), namespace)
+        return namespace[name]
+
+    def encode_many(self, records):
+        return '[' + ','.join(map(self.encode, records)) + ']'
+
+
+# Declare a resource's fields once; `plural` also registers the list form
+def register_serializer(name, fields, plural=None):
+    serializer = Serializer(name, fields)
+    SERIALIZERS[name] = serializer
+    if plural:
+        SERIALIZERS[plural] = serializer
+    return serializer
+
+
+# Recursively encode a response envelope, splicing RawJSON fragments in as-is
+def encode_json(obj):
+    if isinstance(obj, RawJSON):
+        return obj.json
+    if isinstance(obj, dict):
+        return '{' + ','.join(
+            encode_basestring_ascii(str(key)) + ':' + encode_json(obj[key]) for key in sorted(obj)
+        ) + '}'
+    if isinstance(obj, (list, tuple)):
+        return '[' + ','.join(map(encode_json, obj)) + ']'
+    return encode_value(obj)
+
+
+# Flask JSON provider that knows about RawJSON fragments
+class FastJSONProvider(DefaultJSONProvider):
+    @phase('serialize')
+    def dumps(self, obj, **kwargs):
+        # Pretty-printed (debug) output goes through the stock encoder
+        if not kwargs.get('indent'):
+            try:
+                return encode_json(obj)
+            except TypeError:
+                pass
+        kwargs.setdefault('default', self._default_raw)
+        return super().dumps(obj, **kwargs)
+
+    @staticmethod
+    def _default_raw(obj):
+        if isinstance(obj, RawJSON):
+            return json.loads(obj.json)
+        return DefaultJSONProvider.default(obj)
@@ -0,0 +1,598 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from utils.backends import Collection, DuplicateRecordError
+from utils.indexes import UniqueIndex
+from utils.locks import next_rank
+from utils.records import now_timestamp
+from utils.task_stats import OVERALL, describe_bucket
+
+PAGE_SIZE = 1000
+
+# Largest value an SQLite INTEGER holds; larger ids cannot be stored, so they are never found
+MAX_INTEGER = 2**63 - 1
+
+
+# An int query parameter pulled into SQLite's INTEGER range; stored values all fit in it, so
+# comparisons against them come out the same as with the unclamped value
+def _clamp(value):
+    return max(-MAX_INTEGER - 1, min(value, MAX_INTEGER))
+
+
+# SQLite (WAL) backend shared by every worker process pointed at the same file
+class SQLiteBackend:
+    """
+    Each thread borrows a connection on first use and keeps it for the
+    life of the thread. When the thread exits, the connection goes back to
+    a pool of idle ones (at most `pool_size`, SQLITE_POOL_SIZE, default 8)
+    or is closed if the pool is full, so thread-per-request servers reuse a
+    few connections instead of leaving one open per finished thread.
+    Statements are fixed SQL strings
+    built once per collection, so sqlite3's per-connection statement cache
+    keeps them prepared. Writes run inside BEGIN IMMEDIATE transactions,
+    which serialize writers across threads and processes.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, specs, pool_size=None):
+        self.path = path
+        self.pool_size = int(os.environ.get('SQLITE_POOL_SIZE', 8) if pool_size is None else pool_size)
+        self._local = threading.local()
+        self._idle = []
+        self._leased = set()
+        self._pool_lock = threading.Lock()
+        self.collections = {name: SQLiteCollection(self, name, spec) for name, spec in specs.items()}
+        with self.transaction(write=True):
+            connection = self.connection()
+            connection.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL, version INTEGER NOT NULL)')
+            for collection in self.collections.values():
+                collection.create_schema(connection)
+
+    # This thread's connection, borrowed from the idle pool (or opened) on first use
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            with self._pool_lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+                connection.execute('PRAGMA journal_mode=WAL')
+                # FULL, not NORMAL: in WAL mode NORMAL skips the fsync on commit, so a power loss could drop acknowledged writes
+                connection.execute('PRAGMA synchronous=FULL')
+                connection.execute('PRAGMA busy_timeout=5000')
+            with self._pool_lock:
+                self._leased.add(connection)
+            self._local.connection = connection
+            self._local.depth = 0
+            # Thread-local values are dropped when their thread exits; the lease's finalizer returns the connection
+            self._local.lease = lease = _Lease()
+            weakref.finalize(lease, self._release, connection)
+        return connection
+
+    def _release(self, connection):
+        with self._pool_lock:
+            if connection not in self._leased:
+                return  # closed by close()
+            self._leased.discard(connection)
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        with self._pool_lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    # Run a block in one transaction; nested calls join the outer one
+    @contextmanager
+    def transaction(self, write=False):
+        connection = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield connection
+            finally:
+                self._local.depth -= 1
+            return
+
+        connection.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        self._local.depth = 1
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+        finally:
+            self._local.depth = 0
+
+    def collection(self, name):
+        return self.collections[name]
+
+    # Item valuation computed by SQL over the indexed numeric columns
+    def item_analytics(self):
+        return SQLiteItemColumns(self)
+
+    # Prefix search ranges over the field's unique `<field>_key` index; substrings use an FTS5 trigram table
+    def text_index(self, name, field):
+        return SQLiteTextIndex(self, name, field)
+
+    # Task search runs as SQL over the indexed status and timestamp columns
+    def task_index(self):
+        return SQLiteTaskIndex(self)
+
+    # Task counters kept by triggers in the same transaction as each write
+    def task_stats(self):
+        return SQLiteTaskStats(self)
+
+    # Change log filled by triggers, shared by every process on the file
+    def change_feed(self, capacity=None):
+        return SQLiteChangeFeed(self, capacity)
+
+    # Commits are already durable when save() returns (synchronous=FULL fsyncs the WAL on every commit)
+    def sync(self):
+        pass
+
+    def close(self):
+        with self._pool_lock:
+            for connection in self._idle + list(self._leased):
+                connection.close()
+            self._idle.clear()
+            self._leased.clear()
+
+
+# Marks a thread's hold on a pooled connection; see SQLiteBackend.connection
+class _Lease:
+    __slots__ = ('__weakref__',)
+
+
+# Lock facade for utils.locks.locked: writes open an immediate transaction,
+# reads run as autocommit statements against WAL snapshots
+class TransactionLock:
+    def __init__(self, backend):
+        self.rank = next_rank()
+        self._backend = backend
+
+    @contextmanager
+    def read(self):
+        yield
+
+    def write(self):
+        return self._backend.transaction(write=True)
+
+
+# One table per collection; implements utils.backends.Collection
+class SQLiteCollection(Collection):
+    """
+    Columns are left untyped so ints, floats and strings round-trip exactly.
+    Each unique field gets a `<field>_key` column holding the case-folded
+    value under a UNIQUE index; owner fields and `indexed` fields get plain
+    indexes.
+    """
+
+    def __init__(self, backend, name, spec):
+        self.backend = backend
+        self.name = name
+        self.spec = spec
+        self.lock = TransactionLock(backend)
+        self.columns = spec.record.__slots__
+        self._listeners = []
+
+        keys = [f'{field}_key' for field in spec.unique]
+        all_columns = list(self.columns) + keys
+        select = ', '.join(self.columns)
+        self._sql = {
+            'get': f'SELECT {select} FROM {name} WHERE id = ?',
+            'page': f'SELECT {select} FROM {name} WHERE id > ? ORDER BY id LIMIT ?',
+            'find_by': {field: f'SELECT {select} FROM {name} WHERE {field} = ? ORDER BY id' for field in spec.owners},
+            'detach': {field: f'UPDATE {name} SET {field} = NULL WHERE {field} = ?' for field in spec.owners},
+            'unique': {field: f'SELECT id FROM {name} WHERE {field}_key = ?' for field in spec.unique},
+            'save': f"INSERT INTO {name} ({', '.join(all_columns)}) VALUES ({', '.join('?' * len(all_columns))}) "
+                    f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in all_columns[1:])}",
+            'remove': f'DELETE FROM {name} WHERE id = ?',
+            'contains': f'SELECT 1 FROM {name} WHERE id = ?',
+            'count': f'SELECT COUNT(*) FROM {name}',
+            'max_id': f'SELECT MAX(id) FROM {name}',
+            'bump': 'UPDATE counters SET version = version + 1 WHERE name = ?',
+            'next_id': 'UPDATE counters SET next_id = next_id + 1 WHERE name = ?',
+            'counters': 'SELECT next_id, version FROM counters WHERE name = ?',
+            'restore_id': 'UPDATE counters SET next_id = MAX(next_id, ?) WHERE name = ?',
+        }
+
+    def create_schema(self, connection):
+        name = self.name
+        columns = ', '.join(['id INTEGER PRIMARY KEY'] + list(self.columns[1:]) + [f'{field}_key NOT NULL' for field in self.spec.unique])
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {name} ({columns})')
+        for field in self.spec.unique:
+            connection.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name}_{field}_key ON {name} ({field}_key)')
+        for field in self.spec.owners + self.spec.indexed:
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {name}_{field} ON {name} ({field})')
+        connection.execute('INSERT OR IGNORE INTO counters (name, next_id, version) VALUES (?, 1, 0)', (name,))
+
+    def _execute(self, sql, params=()):
+        return self.backend.connection().execute(sql, params)
+
+    def _decode(self, row):
+        record = self.spec.record(**dict(zip(self.columns, row)))
+        for field, (_, decode) in self.spec.codecs.items():
+            value = getattr(record, field)
+            if value is not None:
+                setattr(record, field, decode(value))
+        return record
+
+    def _encode(self, record):
+        values = []
+        for column in self.columns:
+            value = getattr(record, column)
+            codec = self.spec.codecs.get(column)
+            values.append(codec[0](value) if codec and value is not None else value)
+        return values + [UniqueIndex.fold(getattr(record, field)) for field in self.spec.unique]
+
+    def _bump(self):
+        self._execute(self._sql['bump'], (self.name,))
+
+    @property
+    def version(self):
+        return self._execute(self._sql['counters'], (self.name,)).fetchone()[1]
+
+    def allocate_id(self):
+        with self.backend.transaction(write=True):
+            self._execute(self._sql['next_id'], (self.name,))
+            return self._execute(self._sql['counters'], (self.name,)).fetchone()[0] - 1
+
+    def get(self, record_id, default=None):
+        if record_id > MAX_INTEGER:
+            return default
+        row = self._execute(self._sql['get'], (record_id,)).fetchone()
+        return self._decode(row) if row else default
+
+    def page(self, cursor=0, limit=100):
+        rows = self._execute(self._sql['page'], (_clamp(cursor), limit + 1)).fetchall()
+        records = [self._decode(row) for row in rows[:limit]]
+        return records, records[-1].id if len(rows) > limit else None
+
+    def values(self):
+        cursor = 0
+        while cursor is not None:
+            records, cursor = self.page(cursor, PAGE_SIZE)
+            yield from records
+
+    # Inside a read transaction WAL mode pins the database as of its first read,
+    # so every query in the block sees one version while writers commit alongside
+    @contextmanager
+    def snapshot(self):
+        with self.backend.transaction():
+            yield self
+
+    def save(self, record):
+        with self.backend.transaction(write=True):
+            try:
+                self._execute(self._sql['save'], self._encode(record))
+            except sqlite3.IntegrityError as error:
+                field = str(error).rsplit('.', 1)[-1].removesuffix('_key')
+                raise DuplicateRecordError(f"{self.name[:-1].capitalize()} with {field} '{getattr(record, field, '')}' already exists") from error
+            self._bump()
+        self._notify('save', record)
+        return record
+
+    def restore(self, record):
+        with self.backend.transaction(write=True):
+            self.save(record)
+            self._execute(self._sql['restore_id'], (record.id + 1, self.name))
+        return record
+
+    def remove(self, record_id):
+        with self.backend.transaction(write=True):
+            record = self.get(record_id)
+            if record is None:
+                return None
+            self._execute(self._sql['remove'], (record_id,))
+            self._bump()
+        self._notify('remove', record)
+        return record
+
+    def is_unique(self, field, value, record_id=None):
+        row = self._execute(self._sql['unique'][field], (UniqueIndex.fold(value),)).fetchone()
+        return row is None or row[0] == record_id
+
+    def find_by(self, field, value):
+        return [self._decode(row) for row in self._execute(self._sql['find_by'][field], (value,))]
+
+    def detach(self, field, value):
+        with self.backend.transaction(write=True):
+            records = self.find_by(field, value)
+            if records:
+                self._execute(self._sql['detach'][field], (value,))
+                self._bump()
+        for record in records:
+            setattr(record, field, None)
+            self._notify('save', record)
+        return [record.id for record in records]
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, event, record):
+        for callback in self._listeners:
+            callback(event, record)
+
+    def seed(self, records):
+        with self.backend.transaction(write=True):
+            if len(self):
+                return
+            for record in records:
+                self.save(record)
+            self._execute('UPDATE counters SET next_id = MAX(next_id, ?) WHERE name = ?',
+                          ((self._execute(self._sql['max_id']).fetchone()[0] or 0) + 1, self.name))
+
+    # Uniqueness and owner lookups are enforced by SQLite's own indexes
+    def check(self):
+        result = self._execute('PRAGMA quick_check').fetchone()[0]
+        return [] if result == 'ok' else [result]
+
+    def __contains__(self, record_id):
+        if record_id > MAX_INTEGER:
+            return False
+        return self._execute(self._sql['contains'], (record_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._execute(self._sql['count']).fetchone()[0]
+
+
+# SQL twin of utils.columns.ItemColumns for the Stock Manager queries
+class SQLiteItemColumns:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def _execute(self, sql, params=()):
+        return self._backend.connection().execute(sql, params)
+
+    # Same types as ItemColumns.summary: SQLite keeps integral prices as integers, so values are cast to float
+    def summary(self):
+        count, quantity, total, low, high, mean = self._execute(
+            'SELECT COUNT(*), SUM(quantity), TOTAL(total_price), MIN(total_price), MAX(total_price), AVG(total_price) FROM items').fetchone()
+        return {
+            'count': count,
+            'total_quantity': quantity or 0,
+            'total_value': total,
+            'min_value': None if low is None else float(low),
+            'max_value': None if high is None else float(high),
+            'mean_value': mean,
+        }
+
+    def below_quantity(self, threshold):
+        return [row[0] for row in self._execute('SELECT id FROM items WHERE quantity < ? ORDER BY id', (_clamp(int(threshold)),))]
+
+    def price_between(self, low, high):
+        return [row[0] for row in self._execute('SELECT id FROM items WHERE unit_price BETWEEN ? AND ? ORDER BY id', (float(low), float(high)))]
+
+
+# SQL twin of utils.task_index.TaskIndex, served by the status/created_at/completed_at indexes
+class SQLiteTaskIndex:
+    def __init__(self, backend):
+        self._backend = backend
+        self.titles = SQLiteTextIndex(backend, 'tasks', 'title')
+
+    def search(self, query, cursor=0, limit=100):
+        where, params = [], []
+        if query.statuses:
+            where.append(f"status IN ({', '.join('?' * len(query.statuses))})")
+            params += sorted(status.value for status in query.statuses)
+        if query.user_id is not None:
+            where.append('user_id = ?')
+            params.append(_clamp(query.user_id))
+        for column, (low, high) in (('created_at', query.created), ('completed_at', query.completed), ('duration', query.duration)):
+            if low is not None:
+                where.append(f'{column} >= ?')
+                params.append(_clamp(low) if isinstance(low, int) else low)
+            if high is not None:
+                where.append(f'{column} <= ?')
+                params.append(_clamp(high) if isinstance(high, int) else high)
+        if query.text:
+            condition, value = _text_condition('tasks', 'title', *query.text)
+            where.append(condition)
+            params += value
+        direction = 'DESC' if query.descending else 'ASC'
+        order = 'id' if query.sort == 'id' else f'{query.sort} IS NULL, {query.sort} {direction}, id'
+        sql = f"SELECT id FROM tasks {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} {direction} LIMIT ? OFFSET ?"
+        ids = [row[0] for row in self._backend.connection().execute(sql, params + [limit + 1, _clamp(cursor)])]
+        return ids[:limit], cursor + limit if len(ids) > limit else None
+
+    # Consistency is SQLite's job (see SQLiteCollection.check)
+    def check(self):
+        return []
+
+
+# SQL twin of utils.task_stats.TaskStats: a task_stats table of per-owner counters kept by triggers
+class SQLiteTaskStats:
+    """
+    Triggers on tasks add and subtract each row's contribution inside the
+    writing transaction, so every process sees the same O(1)-maintained
+    counters. Owner -1 holds the overall totals and 0 the unassigned tasks.
+    The table is filled from the existing rows the first time it is created.
+    """
+    BUCKET = 'SELECT count, pending, in_progress, completed, duration FROM task_stats WHERE owner = ?'
+    RECOMPUTE = ("SELECT {owner}, COUNT(*), SUM(status = 'pending'), SUM(status = 'in-progress'), "
+                 "SUM(status = 'completed'), SUM(COALESCE(duration, 0)) FROM tasks")
+
+    def __init__(self, backend):
+        self._backend = backend
+        with backend.transaction(write=True) as connection:
+            exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_stats'").fetchone()
+            connection.execute('CREATE TABLE IF NOT EXISTS task_stats (owner INTEGER PRIMARY KEY, count INTEGER NOT NULL, '
+                               'pending INTEGER NOT NULL, in_progress INTEGER NOT NULL, completed INTEGER NOT NULL, duration INTEGER NOT NULL)')
+            added, removed = self._delta('NEW', 1), self._delta('OLD', -1)
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS task_stats_insert AFTER INSERT ON tasks BEGIN {added} END')
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS task_stats_delete AFTER DELETE ON tasks BEGIN {removed} END')
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS task_stats_update AFTER UPDATE OF user_id, status, duration ON tasks '
+                               f'BEGIN {removed} {added} END')
+            if not exists:
+                connection.execute('INSERT INTO task_stats ' + self._recompute_sql())
+
+    # Trigger body adding (sign 1) or removing (sign -1) one row's contribution to its two buckets
+    @staticmethod
+    def _delta(row, sign):
+        statements = []
+        for owner in ('-1', f'COALESCE({row}.user_id, 0)'):
+            statements.append(
+                f"INSERT INTO task_stats (owner, count, pending, in_progress, completed, duration) VALUES ({owner}, {sign}, "
+                f"{sign} * ({row}.status = 'pending'), {sign} * ({row}.status = 'in-progress'), {sign} * ({row}.status = 'completed'), "
+                f"{sign} * COALESCE({row}.duration, 0)) ON CONFLICT(owner) DO UPDATE SET count = count + excluded.count, "
+                f"pending = pending + excluded.pending, in_progress = in_progress + excluded.in_progress, "
+                f"completed = completed + excluded.completed, duration = duration + excluded.duration;")
+        statements.append('DELETE FROM task_stats WHERE count = 0;')
+        return ' '.join(statements)
+
+    def _recompute_sql(self):
+        return (self.RECOMPUTE.format(owner='-1') + ' HAVING COUNT(*) > 0 UNION ALL '
+                + self.RECOMPUTE.format(owner='COALESCE(user_id, 0)') + ' GROUP BY COALESCE(user_id, 0)')
+
+    def _execute(self, sql, params=()):
+        return self._backend.connection().execute(sql, params)
+
+    @staticmethod
+    def _owner(key):
+        return -1 if key == OVERALL else key or 0
+
+    def summary(self, key=OVERALL):
+        return describe_bucket(self._execute(self.BUCKET, (self._owner(key),)).fetchone())
+
+    def by_user(self):
+        rows = self._execute('SELECT owner, count, pending, in_progress, completed, duration FROM task_stats WHERE owner > 0 ORDER BY owner')
+        return [(row[0], describe_bucket(row[1:])) for row in rows]
+
+    # Recompute from the tasks table and list any counter row that drifted
+    def check(self):
+        with self._backend.transaction():
+            expected = {row[0]: list(row[1:]) for row in self._execute(self._recompute_sql())}
+            actual = {row[0]: list(row[1:]) for row in self._execute('SELECT * FROM task_stats')}
+        return [f"task stats for owner {owner}: counted {actual.get(owner)}, recomputed {expected.get(owner)}"
+                for owner in expected.keys() | actual.keys() if expected.get(owner) != actual.get(owner)]
+
+
+# SQL twin of utils.changes.ChangeFeed: a `changes` table written by triggers on every collection
+class SQLiteChangeFeed:
+    """
+    AUTOINCREMENT sequence numbers are assigned inside each writing
+    transaction, so they follow commit order across processes and are
+    never reused. Each insert trims entries older than `capacity`. The
+    sequence starts from the clock when the table is created, so a cursor
+    of 0 (or one from another database) is answered with a resync.
+
+    Other processes cannot signal this one, so wait() polls the sequence.
+    """
+    POLL_SECONDS = 0.1
+    LATEST = "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+
+    def __init__(self, backend, capacity=None):
+        self._backend = backend
+        self.capacity = int(os.environ.get('CHANGE_FEED_SIZE', 10_000) if capacity is None else capacity)
+        with backend.transaction(write=True) as connection:
+            exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'changes'").fetchone()
+            connection.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'collection TEXT NOT NULL, op TEXT NOT NULL, record_id INTEGER NOT NULL)')
+            if not exists:
+                connection.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changes', ?)", (now_timestamp(),))
+            # Recreated on every start so a new CHANGE_FEED_SIZE takes effect
+            for name in backend.collections:
+                for event, op, row in (('INSERT', 'save', 'NEW'), ('UPDATE', 'save', 'NEW'), ('DELETE', 'remove', 'OLD')):
+                    trigger = f'{name}_changes_{event.lower()}'
+                    connection.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                    connection.execute(f"CREATE TRIGGER {trigger} AFTER {event} ON {name} BEGIN "
+                                       f"INSERT INTO changes (collection, op, record_id) VALUES ('{name}', '{op}', {row}.id); "
+                                       f"DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - {self.capacity}; END")
+
+    def _execute(self, sql, params=()):
+        return self._backend.connection().execute(sql, params)
+
+    def latest(self):
+        return self._execute(self.LATEST).fetchone()[0]
+
+    def read(self, since, limit):
+        with self._backend.transaction():
+            latest = self.latest()
+            oldest = self._execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+            if not (latest if oldest is None else oldest - 1) <= since <= latest:
+                return None
+            return [tuple(row) for row in self._execute(
+                'SELECT seq, collection, op, record_id FROM changes WHERE seq > ? ORDER BY seq LIMIT ?', (since, limit))]
+
+    def wait(self, since, timeout):
+        deadline = time.monotonic() + timeout
+        while self.latest() <= since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.POLL_SECONDS, remaining))
+        return True
+
+
+# WHERE clause for a folded text query on a unique field's `<field>_key` column
+def _text_condition(name, field, q, prefix):
+    if prefix:
+        # Every key starting with q sorts in [q, q + the highest code point)
+        return f'{field}_key >= ? AND {field}_key < ?', [q, q + '\U0010ffff']
+    if len(q) < 3:
+        # Too short to have a trigram; scans the key column
+        return f'instr({field}_key, ?) > 0', [q]
+    return f'id IN (SELECT rowid FROM {name}_{field}_fts WHERE {name}_{field}_fts MATCH ?)', [_phrase(q)]
+
+
+# FTS5 query for q as one quoted phrase, which on a trigram table matches exactly the keys containing q
+def _phrase(q):
+    return '"%s"' % q.replace('"', '""')
+
+
+# SQL twin of utils.text_index.TextIndex; the field must be unique so it has a folded key column
+class SQLiteTextIndex:
+    """
+    Substring queries of 3+ characters go through `<name>_<field>_fts`, an
+    external-content FTS5 table with the trigram tokenizer over the folded
+    key column, kept in step by triggers in the writing transaction (and
+    filled from the existing rows the first time it is created). Shorter
+    substrings have no trigram to look up and scan the key column instead.
+    """
+
+    def __init__(self, backend, name, field):
+        self._backend = backend
+        self.name = name
+        self.field = field
+        fts, key = f'{name}_{field}_fts', f'{field}_key'
+        with backend.transaction(write=True) as connection:
+            exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)).fetchone()
+            # case_sensitive 1: keys are already folded, so SQLite's own folding is not layered on top
+            connection.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({key}, content='{name}', content_rowid='id', "
+                               f"tokenize='trigram case_sensitive 1')")
+            added = f'INSERT INTO {fts} (rowid, {key}) VALUES (NEW.id, NEW.{key});'
+            removed = f"INSERT INTO {fts} ({fts}, rowid, {key}) VALUES ('delete', OLD.id, OLD.{key});"
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {name} BEGIN {added} END')
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {name} BEGIN {removed} END')
+            connection.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {key} ON {name} BEGIN {removed} {added} END')
+            if not exists:
+                connection.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    def search(self, q, prefix=False, cursor=0, limit=100):
+        if not prefix and len(q) >= 3:
+            # Straight off the trigram table: it yields rowids in order, so LIMIT stops the match early
+            fts = f'{self.name}_{self.field}_fts'
+            sql = f'SELECT rowid FROM {fts} WHERE {fts} MATCH ? AND rowid > ? ORDER BY rowid LIMIT ?'
+            params = [_phrase(q), cursor, limit + 1]
+        else:
+            condition, params = _text_condition(self.name, self.field, q, prefix)
+            sql = f'SELECT id FROM {self.name} WHERE id > ? AND {condition} ORDER BY id LIMIT ?'
+            params = [cursor] + params + [limit + 1]
+        ids = [row[0] for row in self._backend.connection().execute(sql, params)]
+        return ids[:limit], ids[limit - 1] if len(ids) > limit else None
+
+    # FTS5's integrity-check with rank 1 also compares the trigram index against the rows it indexes
+    def check(self):
+        fts = f'{self.name}_{self.field}_fts'
+        try:
+            self._backend.connection().execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError as error:
+            return [f'{fts}: {error}']
+        return []
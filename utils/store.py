@@ -0,0 +1,318 @@
+import threading
+from bisect import bisect_right
+
+from utils.backends import Collection
+from utils.changes import ChangeFeed
+from utils.columns import ItemColumns
+from utils.indexes import OwnerIndex, UniqueIndex, check_owner_index
+from utils.locks import RWLock
+from utils.task_index import TaskIndex
+from utils.task_stats import TaskStats
+from utils.text_index import TextIndex
+from utils.wal import WriteAheadLog
+
+
+# Ordered, id-keyed record store with monotonic ids
+class RecordStore:
+    """
+    Records live in a dict keyed by id, so lookups and deletes are O(1).
+    Ids come from a counter that never goes backwards, so deletes never
+    cause reuse, and iteration follows id order: a record stored out of
+    order (an import restoring a lower id, or two writers saving in the
+    opposite order to their allocate_id() calls) flags the dict, and the
+    next read re-inserts it in id order once.
+
+    A sorted list of ids backs keyset pagination. Deleted ids stay in it
+    as tombstones until they outnumber the live ones, then it is compacted.
+
+    `version` goes up on every write, so caches can key on it. Stored
+    records are not changed in place: writers save a modified copy, so
+    snapshot() can share record objects with the live store.
+
+    Id allocation is atomic. `lock` is a reader/writer lock that callers
+    hold around check-then-write sequences (see utils.locks.locked).
+    """
+
+    def __init__(self, records=None):
+        self._records = {}
+        self._order = []
+        self._unordered = False
+        self._next_id = 1
+        self.version = 0
+        self._snapshot = None
+        self.lock = RWLock()
+        self._id_lock = threading.Lock()
+        for record in sorted(records or (), key=lambda record: record.id):
+            self[record.id] = record
+            self._next_id = max(self._next_id, record.id + 1)
+
+    # Reserve the next id
+    def allocate_id(self):
+        with self._id_lock:
+            record_id = self._next_id
+            self._next_id += 1
+        return record_id
+
+    # The id allocate_id() will hand out next
+    @property
+    def next_id(self):
+        return self._next_id
+
+    def get(self, record_id, default=None):
+        return self._records.get(record_id, default)
+
+    def pop(self, record_id, default=None):
+        if record_id in self._records:
+            self.version += 1
+        record = self._records.pop(record_id, default)
+        if len(self._order) > 2 * len(self._records) + 64:
+            self._order = sorted(self._records)
+        return record
+
+    # Keyset page: up to `limit` records with id > cursor, plus the cursor for the next page
+    def page(self, cursor=0, limit=100):
+        records = []
+        order = self._order
+        position = bisect_right(order, cursor)
+        while position < len(order) and len(records) < limit:
+            record = self._records.get(order[position])
+            if record is not None:
+                records.append(record)
+                cursor = order[position]
+            position += 1
+        more = any(order[i] in self._records for i in range(position, len(order)))
+        return records, cursor if records and more else None
+
+    def values(self):
+        if self._unordered:
+            self._sort()
+        return self._records.values()
+
+    def items(self):
+        if self._unordered:
+            self._sort()
+        return self._records.items()
+
+    # Re-insert the records in id order; runs under the read lock, as writers are excluded
+    def _sort(self):
+        records = self._records
+        self._records = {record_id: records[record_id] for record_id in self._order if record_id in records}
+        self._unordered = False
+
+    # Frozen view of the current version, shared by readers until the next write
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.version:
+            with self.lock.read():
+                if self._unordered:
+                    self._sort()
+                snapshot = self._snapshot = Snapshot(self._records.copy(), self._order.copy(), self.version)
+        return snapshot
+
+    def __getitem__(self, record_id):
+        return self._records[record_id]
+
+    def __setitem__(self, record_id, record):
+        if record_id not in self._records:
+            position = bisect_right(self._order, record_id)
+            if not position or self._order[position - 1] != record_id:
+                self._order.insert(position, record_id)
+            if self._order[-1] != record_id:
+                self._unordered = True
+        self._records[record_id] = record
+        self.version += 1
+
+    def __contains__(self, record_id):
+        return record_id in self._records
+
+    def __iter__(self):
+        if self._unordered:
+            self._sort()
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+
+# A RecordStore's records and id order as of one version (see RecordStore.snapshot)
+class Snapshot:
+    """
+    Taking one copies the id -> record dict and the sorted id list under
+    the read lock (two C-level copies, no per-record work); readers then
+    iterate, page and serialize it with no lock held while writers carry
+    on. Records are never changed after they are saved (writers save a
+    modified copy), so the records a snapshot points at stay as they were.
+    Usable as a context manager, like SQLiteCollection.snapshot().
+    """
+    __slots__ = ('_records', '_order', 'version')
+    _unordered = False
+
+    def __init__(self, records, order, version):
+        self._records = records
+        self._order = order
+        self.version = version
+
+    get = RecordStore.get
+    page = RecordStore.page
+    values = RecordStore.values
+    items = RecordStore.items
+    __getitem__ = RecordStore.__getitem__
+    __contains__ = RecordStore.__contains__
+    __iter__ = RecordStore.__iter__
+    __len__ = RecordStore.__len__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+# In-memory implementation of utils.backends.Collection
+class MemoryCollection(RecordStore, Collection):
+    """
+    A RecordStore that also owns its unique and owner indexes, so save()
+    and remove() keep them in step and handlers never touch them directly.
+    """
+
+    def __init__(self, unique=(), owners=(), records=None):
+        super().__init__(records)
+        self.unique_indexes = {field: UniqueIndex(field, self) for field in unique}
+        self.owner_indexes = {field: OwnerIndex(field, self) for field in owners}
+        self._listeners = []
+
+    def save(self, record):
+        self[record.id] = record
+        for field, index in self.unique_indexes.items():
+            index.update(record.id, getattr(record, field))
+        for field, index in self.owner_indexes.items():
+            index.set_owner(record.id, getattr(record, field))
+        self._notify('save', record)
+        return record
+
+    def remove(self, record_id):
+        record = self.pop(record_id)
+        if record is None:
+            return None
+        for index in self.unique_indexes.values():
+            index.discard(record_id)
+        for index in self.owner_indexes.values():
+            index.discard(record_id)
+        self._notify('remove', record)
+        return record
+
+    # Replace the contents wholesale (snapshot restore) and rebuild the indexes
+    def load(self, records, next_id=1):
+        self._records = {record.id: record for record in records}
+        self._order = sorted(self._records)
+        self._next_id = max(next_id, self._order[-1] + 1 if self._order else 1)
+        self.version += 1
+        for index in list(self.unique_indexes.values()) + list(self.owner_indexes.values()):
+            index.rebuild(self)
+
+    # Save a record under its own id (imports), keeping ids monotonic
+    def restore(self, record):
+        with self._id_lock:
+            self._next_id = max(self._next_id, record.id + 1)
+        return self.save(record)
+
+    # Re-apply a logged save during recovery
+    def replay(self, record):
+        return self.restore(record)
+
+    def is_unique(self, field, value, record_id=None):
+        return self.unique_indexes[field].is_unique(value, record_id)
+
+    def find_by(self, field, value):
+        return [self._records[record_id] for record_id in self.owner_indexes[field].ids_for(value)]
+
+    def detach(self, field, value):
+        record_ids = self.owner_indexes[field].pop_owner(value)
+        for record_id in record_ids:
+            record = self._records[record_id].copy()
+            setattr(record, field, None)
+            self[record_id] = record
+            self._notify('save', record)
+        return record_ids
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, event, record):
+        for callback in self._listeners:
+            callback(event, record)
+
+    def seed(self, records):
+        if len(self):
+            return
+        for record in records:
+            self.save(record)
+            self._next_id = max(self._next_id, record.id + 1)
+
+    def check(self):
+        problems = []
+        for field, index in self.unique_indexes.items():
+            if len(index) != len(self):
+                problems.append(f"unique index on {field} holds {len(index)} values for {len(self)} records")
+        for index in self.owner_indexes.values():
+            problems += check_owner_index(index, self)
+        return problems
+
+
+# Process-local backend: one MemoryCollection per collection spec,
+# optionally made durable by a write-ahead log in log_dir
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, specs, log_dir=None, snapshot_every=100_000):
+        self.collections = {name: MemoryCollection(spec.unique, spec.owners) for name, spec in specs.items()}
+        self.log = None
+        if log_dir:
+            self.log = WriteAheadLog(log_dir, self.collections, specs, snapshot_every).open()
+
+    def collection(self, name):
+        return self.collections[name]
+
+    # Wait until this thread's writes are on disk (no-op without a log)
+    def sync(self):
+        if self.log is not None:
+            self.log.wait_durable()
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+
+    # Item valuation columns, kept in step with the items collection
+    def item_analytics(self):
+        items = self.collections['items']
+        columns = ItemColumns(items.values())
+        items.subscribe(lambda event, item: columns.set(item) if event == 'save' else columns.discard(item.id))
+        return columns
+
+    # Trigram index over a text field (built in the background), kept in step with its collection
+    def text_index(self, name, field):
+        collection = self.collections[name]
+        index = TextIndex(collection, field)
+        collection.subscribe(index.update)
+        return index.start()
+
+    # Status, timestamp and title indexes for task search, kept in step with the tasks collection
+    def task_index(self):
+        tasks = self.collections['tasks']
+        index = TaskIndex(tasks, self.text_index('tasks', 'title'))
+        tasks.subscribe(index.update)
+        return index
+
+    # Ring buffer of every save and remove, across all collections
+    def change_feed(self, capacity=None):
+        feed = ChangeFeed(capacity)
+        for name, collection in self.collections.items():
+            feed.watch(name, collection)
+        return feed
+
+    # Per-status counts and duration sums (overall and per user), kept in step with the tasks collection
+    def task_stats(self):
+        tasks = self.collections['tasks']
+        stats = TaskStats(tasks)
+        tasks.subscribe(stats.update)
+        return stats
@@ -0,0 +1,339 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from heapq import nlargest, nsmallest
+from operator import attrgetter
+
+from utils.gc_pause import paused_gc
+from utils.indexes import UniqueIndex
+from utils.records import TaskStatus, parse_timestamp
+from utils.text_index import parse_text_query
+
+# Filters for /api/v1/task/search; ranges are inclusive (low, high) pairs with None for an open end
+TaskQuery = namedtuple('TaskQuery', 'statuses user_id created completed duration text sort descending')
+
+SORT_FIELDS = ('id', 'created_at', 'completed_at', 'duration')
+_STATUSES = {status.value: status for status in TaskStatus}
+
+# An ordered walk is used while the smallest filter still matches at least 1/WALK_RATIO of the walked range
+WALK_RATIO = 16
+
+
+# ISO-8601 date or datetime -> epoch microseconds; naive values are UTC and
+# a bare date used as an upper bound covers the whole day
+def _parse_time(value, upper=False):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    if upper and len(value) == 10:
+        moment += timedelta(days=1, microseconds=-1)
+    return parse_timestamp(moment.isoformat())
+
+
+def _parse_range(args, low_name, high_name, parse):
+    low, high = args.get(low_name), args.get(high_name)
+    try:
+        low = None if low is None else parse(low)
+        high = None if high is None else parse(high, upper=True) if parse is _parse_time else parse(high)
+    except ValueError:
+        kind = 'ISO-8601 dates or datetimes' if parse is _parse_time else 'integers'
+        return None, f"{low_name} and {high_name} must be {kind}"
+    if low is not None and high is not None and low > high:
+        return None, f"{low_name} cannot be greater than {high_name}"
+    return (low, high), None
+
+
+# Read the search filters from query parameters; returns (query, error)
+def parse_task_query(args):
+    statuses = None
+    if args.get('status'):
+        try:
+            statuses = frozenset(_STATUSES[value.strip()] for value in args['status'].split(','))
+        except KeyError:
+            return None, "Invalid task status. Allowed values are: pending, in-progress, completed"
+
+    user_id = args.get('user_id')
+    if user_id is not None:
+        try:
+            user_id = int(user_id)
+        except ValueError:
+            return None, "user_id must be an integer"
+
+    created, error = _parse_range(args, 'created_from', 'created_to', _parse_time)
+    if error:
+        return None, error
+    completed, error = _parse_range(args, 'completed_from', 'completed_to', _parse_time)
+    if error:
+        return None, error
+    duration, error = _parse_range(args, 'min_duration', 'max_duration', int)
+    if error:
+        return None, error
+    q, prefix, error = parse_text_query(args, required=False)
+    if error:
+        return None, error
+
+    sort = args.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in SORT_FIELDS:
+        return None, f"sort must be one of {', '.join(SORT_FIELDS)} (prefix with - for descending)"
+    return TaskQuery(statuses, user_id, created, completed, duration, q and (q, prefix), sort, descending), None
+
+
+# (timestamp, id) pairs kept sorted in two parallel arrays for bisect range scans
+class Timeline:
+    """
+    Ties on the timestamp are ordered by id, so every pair has exactly
+    one position, found with three bisects. Arrays of machine ints keep a
+    million entries at 16 MB.
+
+    Inserts are cheap when timestamps arrive in order (new tasks, fresh
+    completions land at the end). Removes only mark the pair dead, so
+    deleting old tasks never shifts the arrays; dead pairs are skipped by
+    scans and swept out once they make up a quarter of the timeline.
+    """
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = array('q', (key for key, _ in pairs))
+        self.ids = array('q', (record_id for _, record_id in pairs))
+        self._dead = set()
+
+    def _position(self, key, record_id):
+        low = bisect_left(self.keys, key)
+        high = bisect_right(self.keys, key, low)
+        return bisect_left(self.ids, record_id, low, high)
+
+    def insert(self, key, record_id):
+        if (key, record_id) in self._dead:
+            self._dead.discard((key, record_id))
+            return
+        position = self._position(key, record_id)
+        self.keys.insert(position, key)
+        self.ids.insert(position, record_id)
+
+    def remove(self, key, record_id):
+        self._dead.add((key, record_id))
+        if len(self._dead) * 4 > len(self.ids):
+            self._sweep()
+
+    def _sweep(self):
+        live = list(self.pairs())
+        self.keys = array('q', (key for key, _ in live))
+        self.ids = array('q', (record_id for _, record_id in live))
+        self._dead = set()
+
+    # Positions [start, stop) of the pairs whose timestamp lies in [low, high]; may include dead pairs
+    def span(self, low=None, high=None):
+        start = 0 if low is None else bisect_left(self.keys, low)
+        stop = len(self.keys) if high is None else bisect_right(self.keys, high)
+        return start, max(start, stop)
+
+    # Live ids between two positions, in timestamp order (or reversed)
+    def scan(self, start, stop, reverse=False):
+        keys, ids, dead = self.keys, self.ids, self._dead
+        positions = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        if not dead:
+            return map(ids.__getitem__, positions)
+        return (ids[position] for position in positions if (keys[position], ids[position]) not in dead)
+
+    # Every live (timestamp, id) pair in order
+    def pairs(self):
+        return (pair for pair in zip(self.keys, self.ids) if pair not in self._dead)
+
+    def __len__(self):
+        return len(self.ids) - len(self._dead)
+
+
+# Build one predicate for a query's filters (compiled like utils.schema validators)
+def compile_matcher(query):
+    namespace = {'statuses': query.statuses, 'user_id': query.user_id, 'fold': UniqueIndex.fold, 'text': query.text and query.text[0]}
+    tests = []
+    if query.statuses:
+        tests.append('task.status in statuses')
+    if query.user_id is not None:
+        tests.append('task.user_id == user_id')
+    for field, (low, high) in (('created_at', query.created), ('completed_at', query.completed), ('duration', query.duration)):
+        if low is not None or high is not None:
+            tests.append(f'task.{field} is not None')
+        if low is not None:
+            tests.append(f'task.{field} >= {low!r}')
+        if high is not None:
+            tests.append(f'task.{field} <= {high!r}')
+    if query.text:
+        tests.append('fold(task.title).startswith(text)' if query.text[1] else 'text in fold(task.title)')
+    source = f"def match(task):\n    return {' and '.join(tests) or 'True'}\n"
+    exec(compile(source, '<task query>', 'exec'), namespace)
+    return namespace['match']
+
+
+# Status and timestamp indexes over the tasks collection
+class TaskIndex:
+    """
+    Tasks are indexed by status (one id set per status) and by created_at
+    and completed_at (Timelines); `titles` is the title TextIndex. The
+    index follows the collection through update(), its save/remove
+    listener. Handlers save a modified copy of a task, and by the time a
+    listener runs the collection already holds the new one, so `_state`
+    remembers what each task was indexed under to find the entries to move.
+
+    search() drives the scan from whichever filter matches the fewest
+    tasks, then checks the remaining filters on those tasks only. When
+    the sort order has an index of its own (id, created_at, and
+    completed_at once only completed tasks can match) it first walks
+    that index in order and stops as soon as the page is full; if that
+    takes more steps than the smallest filter has tasks, it falls back to
+    collecting and sorting that filter's tasks.
+    """
+
+    def __init__(self, tasks, titles):
+        self.tasks = tasks
+        self.titles = titles
+        self.rebuild()
+
+    # Re-index every task (after a bulk load that bypassed the listeners)
+    def rebuild(self):
+        with paused_gc():
+            self._build()
+
+    def _build(self):
+        state, by_status = {}, {status: set() for status in TaskStatus}
+        created, completed = [], []
+        for task in self.tasks.values():
+            task_id, status, created_at, completed_at = task.id, task.status, task.created_at, task.completed_at
+            state[task_id] = (status, created_at, completed_at)
+            by_status[status].add(task_id)
+            created.append((created_at, task_id))
+            if completed_at is not None:
+                completed.append((completed_at, task_id))
+        self._state, self._by_status = state, by_status
+        self.created = Timeline(created)
+        self.completed = Timeline(completed)
+
+    # Collection listener: keep the indexes in step with saves and removes
+    def update(self, event, task):
+        if event == 'save':
+            self.set(task)
+        else:
+            self.discard(task.id)
+
+    # Index a saved task, touching only the indexes whose value changed
+    def set(self, task):
+        state = (task.status, task.created_at, task.completed_at)
+        old = self._state.get(task.id)
+        if old == state:
+            return
+        old_status, old_created, old_completed = old or (None, None, None)
+        self._state[task.id] = state
+        if task.status is not old_status:
+            if old_status is not None:
+                self._by_status[old_status].discard(task.id)
+            self._by_status[task.status].add(task.id)
+        if task.created_at != old_created:
+            if old_created is not None:
+                self.created.remove(old_created, task.id)
+            self.created.insert(task.created_at, task.id)
+        if task.completed_at != old_completed:
+            if old_completed is not None:
+                self.completed.remove(old_completed, task.id)
+            if task.completed_at is not None:
+                self.completed.insert(task.completed_at, task.id)
+
+    def discard(self, task_id):
+        old = self._state.pop(task_id, None)
+        if old is None:
+            return
+        status, created_at, completed_at = old
+        self._by_status[status].discard(task_id)
+        self.created.remove(created_at, task_id)
+        if completed_at is not None:
+            self.completed.remove(completed_at, task_id)
+
+    # Candidate sources as (size, name, ids); only filters with an index qualify
+    def _drivers(self, query):
+        drivers = []
+        if query.statuses:
+            drivers.append((sum(len(self._by_status[status]) for status in query.statuses), 'status',
+                            lambda: [task_id for status in query.statuses for task_id in self._by_status[status]]))
+        if query.text:
+            drivers.append((self.titles.estimate(*query.text), 'title', lambda: list(self.titles.matches(*query.text))))
+        if query.user_id is not None:
+            owned = [task.id for task in self.tasks.find_by('user_id', query.user_id)]
+            drivers.append((len(owned), 'user_id', lambda: owned))
+        for name, timeline, bounds in (('created_at', self.created, query.created), ('completed_at', self.completed, query.completed)):
+            if bounds != (None, None):
+                start, stop = timeline.span(*bounds)
+                drivers.append((stop - start, name, lambda timeline=timeline, start=start, stop=stop: list(timeline.scan(start, stop))))
+        return drivers
+
+    # Ids in the sort order, or None if that order has no index to walk
+    def _ordered(self, query):
+        if query.sort == 'id' and query.text and not query.descending:
+            return self.titles.matches(*query.text)
+        if query.sort == 'id':
+            tasks = self.tasks.values()
+            return (task.id for task in (reversed(tasks) if query.descending else tasks))
+        timeline, bounds = {'created_at': (self.created, query.created), 'completed_at': (self.completed, query.completed)}.get(query.sort, (None, None))
+        # completed_at is only walkable when every match must have one
+        if timeline is None or (query.sort == 'completed_at' and bounds == (None, None) and query.statuses != {TaskStatus.COMPLETED}):
+            return None
+        return timeline.scan(*timeline.span(*bounds), reverse=query.descending)
+
+    # One page of matching task ids in the requested order, plus the next cursor (an offset) or None
+    def search(self, query, cursor=0, limit=100):
+        match = compile_matcher(query)
+        get = self.tasks.__getitem__
+        wanted = cursor + limit + 1
+        drivers = self._drivers(query)
+        smallest = min(drivers, key=lambda driver: driver[0]) if drivers else None
+        ordered = self._ordered(query)
+
+        ids = None
+        if ordered is not None:
+            ids = []
+            # Walking the sort field's own range (or the title matches, already in id order) is exact;
+            # otherwise give up after as many steps as the smallest filter has tasks
+            exact = smallest is None or smallest[1] == query.sort or (query.text and query.sort == 'id' and not query.descending)
+            budget = None if exact else smallest[0] + 1
+            steps = 0
+            for task_id in ordered:
+                steps += 1
+                if budget is not None and steps > budget:
+                    ids = None
+                    break
+                if match(get(task_id)):
+                    ids.append(task_id)
+                    if len(ids) == wanted:
+                        break
+
+        if ids is None:
+            candidates = smallest[2]() if smallest is not None else list(self.tasks)
+            matches = [task for task in map(get, candidates) if match(task)]
+            field = query.sort
+            present = [task for task in matches if getattr(task, field) is not None]
+            missing = sorted((task.id for task in matches if getattr(task, field) is None), reverse=query.descending)
+            key = attrgetter(field, 'id')
+            if wanted * 8 < len(present):
+                present = (nlargest if query.descending else nsmallest)(wanted, present, key=key)
+            else:
+                present.sort(key=key, reverse=query.descending)
+            ids = [task.id for task in present[:wanted]] + missing[:max(0, wanted - len(present))]
+
+        page = ids[cursor:cursor + limit]
+        return page, cursor + limit if len(ids) > cursor + limit else None
+
+    # Compare the indexes against the collection and list every mismatch
+    def check(self):
+        problems = []
+        expected = {task.id: (task.status, task.created_at, task.completed_at) for task in self.tasks.values()}
+        if expected != self._state:
+            problems.append(f"task index holds {len(self._state)} tasks for {len(expected)} records or is out of date")
+        for status, ids in self._by_status.items():
+            if ids != {task_id for task_id, state in expected.items() if state[0] is status}:
+                problems.append(f"status index for {status.value} is out of date")
+        for name, timeline, position in (('created_at', self.created, 1), ('completed_at', self.completed, 2)):
+            pairs = sorted((state[position], task_id) for task_id, state in expected.items() if state[position] is not None)
+            if list(timeline.pairs()) != pairs:
+                problems.append(f"{name} timeline is out of date")
+        return problems
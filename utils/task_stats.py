@@ -0,0 +1,95 @@
+from utils.records import TaskStatus
+
+# Bucket key for the totals over every task; user buckets are keyed by user_id (None = unassigned)
+OVERALL = 'overall'
+
+# Bucket layout: [count, pending, in-progress, completed, duration sum]
+_STATUS_SLOTS = {status: slot for slot, status in enumerate(TaskStatus, 1)}
+_DURATION = len(_STATUS_SLOTS) + 1
+
+
+# The JSON shape of one bucket (a missing bucket reads as all zeros)
+def describe_bucket(bucket):
+    count, *by_status, duration = bucket or [0] * (_DURATION + 1)
+    completed = by_status[_STATUS_SLOTS[TaskStatus.COMPLETED] - 1]
+    return {
+        'total': count,
+        'by_status': {status.value: value for status, value in zip(TaskStatus, by_status)},
+        'total_duration': duration,
+        'average_duration': duration / count if count else None,
+        'completion_rate': completed / count if count else None,
+    }
+
+
+# Running per-status counts and duration sums, overall and per user
+class TaskStats:
+    """
+    Each task's (user_id, status, duration) is remembered, so a save
+    subtracts what the task contributed before and adds what it
+    contributes now: creates, edits, status changes, assignments and
+    deletes are all O(1). Deleting a user detaches their tasks one save
+    at a time, which moves each into the unassigned bucket.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.rebuild()
+
+    # Count every task from scratch
+    def rebuild(self):
+        self._rows = {}
+        self._buckets = {}
+        for task in self.tasks.values():
+            self.set(task)
+
+    # Collection listener: keep the counters in step with saves and removes
+    def update(self, event, task):
+        if event == 'save':
+            self.set(task)
+        else:
+            self.discard(task.id)
+
+    def set(self, task):
+        row = (task.user_id, task.status, task.duration or 0)
+        old = self._rows.get(task.id)
+        if old == row:
+            return
+        if old is not None:
+            self._apply(old, -1)
+        self._rows[task.id] = row
+        self._apply(row, 1)
+
+    def discard(self, task_id):
+        old = self._rows.pop(task_id, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def _apply(self, row, sign):
+        user_id, status, duration = row
+        for key in (OVERALL, user_id):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [0] * (_DURATION + 1)
+            bucket[0] += sign
+            bucket[_STATUS_SLOTS[status]] += sign
+            bucket[_DURATION] += sign * duration
+            if not bucket[0]:
+                del self._buckets[key]
+
+    # Stats for every task, or for one user's tasks (user_id=None: unassigned tasks)
+    def summary(self, key=OVERALL):
+        return describe_bucket(self._buckets.get(key))
+
+    # (user_id, stats) for every user holding at least one task, in user_id order
+    def by_user(self):
+        users = sorted(key for key in self._buckets if key != OVERALL and key is not None)
+        return [(user_id, describe_bucket(self._buckets[user_id])) for user_id in users]
+
+    # Recompute everything from the collection and list any counter that drifted
+    def check(self):
+        expected = TaskStats(self.tasks)._buckets
+        problems = []
+        for key in expected.keys() | self._buckets.keys():
+            if expected.get(key) != self._buckets.get(key):
+                problems.append(f"task stats for {key!r}: counted {self._buckets.get(key)}, recomputed {expected.get(key)}")
+        return problems
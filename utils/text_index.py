@@ -0,0 +1,238 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from utils.indexes import UniqueIndex
+
+# Marks the start of a value, so a gram like '\x02ri' means "starts with ri"
+ANCHOR = '\x02'
+MODES = ('substring', 'prefix')
+
+
+# Read q and mode from query parameters; returns (folded q, prefix?, error)
+def parse_text_query(args, required=True):
+    q = args.get('q', '')
+    if not q.strip():
+        return None, False, "q query parameter is required" if required else None
+    mode = args.get('mode', 'substring')
+    if mode not in MODES:
+        return None, False, "mode must be substring or prefix"
+    return UniqueIndex.fold(q.strip()), mode == 'prefix', None
+
+
+# Grams stored for a folded value: every letter, bigram and trigram of the value, plus the anchored
+# first letter and trigrams of the anchored value
+def _grams(folded):
+    anchored = ANCHOR + folded
+    grams = set(folded)
+    grams.update(folded[i:i + 2] for i in range(len(folded) - 1))
+    grams.add(anchored[:2])
+    grams.update(anchored[i:i + 3] for i in range(len(anchored) - 2))
+    return grams
+
+
+# Grams a query needs to hit: the query itself when it is shorter than a trigram
+def _query_grams(q, prefix):
+    text = ANCHOR + q if prefix else q
+    if len(text) < 3:
+        return {text}
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Trigram inverted index over one text field, for substring and prefix search
+class TextIndex:
+    """
+    Values are case-folded the same way as UniqueIndex (and so the
+    unique-field checks), and each gram maps to a posting: an array of
+    record ids in id order. Ids only grow, so new records append.
+
+    Prefix search works on the anchored grams ('\\x02' + value), so the
+    first one or two letters of a prefix select exactly the values that
+    start with them, like a trie level; one- and two-letter substrings
+    have letter and bigram postings of their own; longer prefixes and
+    substrings intersect trigram postings. A lookup walks the
+    shortest posting from the cursor and checks each id against its
+    folded value, so a page costs a few dozen dict lookups however many
+    records there are.
+
+    Removed or renamed values leave their ids in old postings; lookups
+    skip them, and a posting is compacted once half of it is stale.
+
+    start() builds the index from a snapshot of the collection in a
+    background thread, so neither startup nor the first search waits for
+    it and writers are never held up. Saves and removes that arrive
+    meanwhile are queued and applied once the build lands; until then
+    searches scan the collection in id order.
+    """
+
+    def __init__(self, collection, field):
+        self.collection = collection
+        self.field = field
+        self.built = False
+        self._build_lock = threading.Lock()
+        self._generation = 0
+        self._queued = []
+        self._values = {}
+        self._postings = {}
+        self._stale = {}
+
+    # Build in a background thread; returns the index
+    def start(self):
+        threading.Thread(target=self.rebuild, name=f'text-index-{self.field}', daemon=True).start()
+        return self
+
+    # Index every record from scratch (from a snapshot, so writers carry on meanwhile); no paused_gc
+    # here, since this runs beside request threads and pausing the GC would pause it for them too
+    def rebuild(self):
+        with self._build_lock:
+            self._generation += 1
+            generation = self._generation
+            self.built = False
+        records = self.collection.snapshot()
+        values, postings = {}, {}
+        fold, field = UniqueIndex.fold, self.field
+        for record in records.values():
+            value = getattr(record, field)
+            if value is None:
+                continue
+            folded = values[record.id] = fold(value)
+            for gram in _grams(folded):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [record.id]
+                else:
+                    posting.append(record.id)
+        postings = {gram: array('q', sorted(ids)) for gram, ids in postings.items()}
+
+        with self._build_lock:
+            if generation != self._generation:
+                return  # superseded by a later rebuild, which will apply the queue
+            self._values, self._postings, self._stale = values, postings, {}
+            # Changes queued since the build began; replaying ones the snapshot already has is harmless
+            for event, record in self._queued:
+                self._apply(event, record)
+            self._queued = []
+            self.built = True
+
+    # Collection listener: keep the index in step with saves and removes
+    def update(self, event, record):
+        if not self.built:
+            with self._build_lock:
+                if not self.built:
+                    self._queued.append((event, record))
+                    return
+        self._apply(event, record)
+
+    def _apply(self, event, record):
+        if event == 'save':
+            self.set(record)
+        else:
+            self.discard(record.id)
+
+    def set(self, record):
+        value = getattr(record, self.field)
+        folded = None if value is None else UniqueIndex.fold(value)
+        old = self._values.get(record.id)
+        if folded == old:
+            return
+        old_grams = _grams(old) if old is not None else set()
+        new_grams = _grams(folded) if folded is not None else set()
+        if folded is None:
+            del self._values[record.id]
+        else:
+            self._values[record.id] = folded
+        for gram in old_grams - new_grams:
+            self._mark_stale(gram)
+        for gram in new_grams - old_grams:
+            self._add(gram, record.id)
+
+    def discard(self, record_id):
+        old = self._values.pop(record_id, None)
+        if old is not None:
+            for gram in _grams(old):
+                self._mark_stale(gram)
+
+    def _add(self, gram, record_id):
+        posting = self._postings.get(gram)
+        if posting is None:
+            self._postings[gram] = array('q', (record_id,))
+        elif not posting or posting[-1] < record_id:
+            posting.append(record_id)
+        else:
+            position = bisect_left(posting, record_id)
+            if position < len(posting) and posting[position] == record_id:
+                # Still listed from before a rename or delete: live again
+                self._stale[gram] -= 1
+            else:
+                posting.insert(position, record_id)
+
+    def _mark_stale(self, gram):
+        stale = self._stale[gram] = self._stale.get(gram, 0) + 1
+        posting = self._postings[gram]
+        if stale * 2 > len(posting):
+            values = self._values
+            live = array('q', (record_id for record_id in posting
+                               if record_id in values and gram in ANCHOR + values[record_id]))
+            if live:
+                self._postings[gram] = live
+            else:
+                del self._postings[gram]
+            self._stale.pop(gram)
+
+    # Ids whose value contains (or starts with) q, in id order after `cursor`
+    def matches(self, q, prefix=False, cursor=0):
+        if not self.built:
+            return self._scan(q, prefix, cursor)
+        values = self._values
+        grams = _query_grams(q, prefix)
+        postings = [self._postings.get(gram) for gram in grams]
+        if not all(postings):
+            return iter(())
+        posting = min(postings, key=len)
+        start = bisect_right(posting, cursor)
+        if prefix:
+            return (record_id for record_id in posting[start:] if values.get(record_id, '').startswith(q))
+        return (record_id for record_id in posting[start:] if q in values.get(record_id, ''))
+
+    # While the index is building: test every record after the cursor (the caller holds the read lock)
+    def _scan(self, q, prefix, cursor):
+        fold, field = UniqueIndex.fold, self.field
+        for record in self.collection.values():
+            value = getattr(record, field)
+            if record.id > cursor and value is not None:
+                folded = fold(value)
+                if folded.startswith(q) if prefix else q in folded:
+                    yield record.id
+
+    # Upper bound on the number of matches (length of the shortest posting)
+    def estimate(self, q, prefix=False):
+        if not self.built:
+            return len(self.collection)
+        grams = _query_grams(q, prefix)
+        return min((len(self._postings.get(gram, ())) for gram in grams), default=0)
+
+    # One keyset page of matching ids, plus the next cursor (last id) or None
+    def search(self, q, prefix=False, cursor=0, limit=100):
+        ids = []
+        for record_id in self.matches(q, prefix, cursor):
+            ids.append(record_id)
+            if len(ids) > limit:
+                break
+        return ids[:limit], ids[limit - 1] if len(ids) > limit else None
+
+    # Compare the index against the collection and list every mismatch
+    def check(self):
+        if not self.built:
+            return []
+        problems = []
+        expected = {record.id: UniqueIndex.fold(getattr(record, self.field))
+                    for record in self.collection.values() if getattr(record, self.field) is not None}
+        if expected != self._values:
+            problems.append(f"text index on {self.field} holds {len(self._values)} values for {len(expected)} records or is out of date")
+        for record_id, folded in expected.items():
+            for gram in _grams(folded):
+                posting = self._postings.get(gram, ())
+                position = bisect_left(posting, record_id)
+                if position == len(posting) or posting[position] != record_id:
+                    problems.append(f"record {record_id}: missing from the '{gram}' posting")
+        return problems
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+
+from utils.pagination import STREAM_CHUNK_SIZE
+from utils.response import make_response, success_response
+from utils.serializers import SERIALIZERS
+
+# format name -> response mimetype
+TRANSFER_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+IMPORT_CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+# Read ?format=, falling back to the upload's Content-Type; returns (format, error)
+def parse_transfer_format(args, content_type=None):
+    fmt = args.get('format')
+    if fmt is None:
+        fmt = 'csv' if (content_type or '').startswith('text/csv') else 'ndjson'
+    if fmt not in TRANSFER_FORMATS:
+        return None, "format must be ndjson or csv"
+    return fmt, None
+
+
+# CSV cell type for fields that are numbers but may hold either ints or floats
+def number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+# Stream a whole store as NDJSON lines or CSV rows, one keyset page at a time
+def export_records(store, data_type, fmt, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Like stream_records, pages come from one snapshot, so an export of
+    millions of records is consistent, never blocks writers and holds
+    only one page of output in memory. Values are the serializer's, so an
+    export matches what the API returns (CSV writes nulls as empty cells).
+    """
+    serializer = SERIALIZERS[data_type]
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow([field for field, _ in serializer.fields])
+
+    cursor = 0
+    with store.snapshot() as snapshot:
+        while cursor is not None:
+            records, cursor = snapshot.page(cursor, chunk_size)
+            if not records:
+                break
+            if fmt == 'ndjson':
+                yield ''.join([serializer.encode(record) + '\n' for record in records])
+            else:
+                writer.writerows([serializer.to_dict(record).values() for record in records])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if fmt == 'csv' and buffer.tell():
+        yield buffer.getvalue()
+
+
+# Parse an uploaded byte stream incrementally; yields (line number, row, error)
+def read_rows(stream, fmt, columns=None):
+    """
+    NDJSON rows are decoded one line at a time (blank lines are skipped).
+    CSV rows are dicts keyed by the header; cells listed in `columns`
+    ({field: type}) are converted, with empty cells read as null and
+    unconvertible cells passed through for the validators to report.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError:
+                yield line_number, None, "Line is not valid JSON"
+        return
+
+    columns = columns or {}
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, {field: _convert(value, columns.get(field)) for field, value in row.items() if field is not None}, None
+
+
+def _convert(value, kind):
+    if kind is None or value is None:
+        return value
+    if value == '':
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        return value
+
+
+# Optional "id" on an imported row; returns (id or None, error)
+def parse_import_id(row):
+    record_id = row.get('id') if isinstance(row, dict) else None
+    if record_id is None:
+        return None, None
+    if not isinstance(record_id, int) or isinstance(record_id, bool) or record_id < 1:
+        return None, "id must be a positive integer"
+    return record_id, None
+
+
+# Feed parsed rows to apply_chunk in fixed-size chunks and summarize the outcome
+def import_rows(rows, apply_chunk, chunk_size=IMPORT_CHUNK_ROWS):
+    """
+    apply_chunk(rows) validates and saves one chunk (holding whatever locks
+    it needs only for that chunk) and returns run_bulk results. Rows are
+    applied independently: a bad row is reported with its line number and
+    the rest of the upload still goes in. At most MAX_REPORTED_ERRORS
+    errors are listed; `failed` counts all of them.
+    """
+    summary = {'imported': 0, 'failed': 0, 'errors': []}
+
+    def fail(line, error):
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': line, 'error': error})
+
+    def flush(chunk):
+        results = apply_chunk([row for _, row in chunk])
+        for (line, _), result in zip(chunk, results):
+            if result['status'] == 'applied':
+                summary['imported'] += 1
+            else:
+                fail(line, result['error'])
+
+    chunk, line = [], 0
+    try:
+        for line, row, error in rows:
+            if error:
+                fail(line, error)
+                continue
+            chunk.append((line, row))
+            if len(chunk) == chunk_size:
+                flush(chunk)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as error:
+        # The rest of the upload cannot be read; keep what was parsed so far
+        fail(line + 1, f"Upload could not be read past this point: {error}")
+    if chunk:
+        flush(chunk)
+    return summary
+
+
+# Standard envelope for an import summary
+def import_response(summary):
+    total = summary['imported'] + summary['failed']
+    message = f"{summary['imported']} of {total} rows imported"
+    if summary['failed'] and not summary['imported']:
+        return make_response("error", message, summary, 400)
+    return success_response(message, summary)
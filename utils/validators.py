@@ -1,5 +1,11 @@
 import re
 
+EMAIL_PATTERN = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+_email_match = re.compile(EMAIL_PATTERN).match
+
+PHONE_PREFIXES = frozenset(['070', '080', '090', '081', '091'])
+PHONE_MIN_LENGTH = 11
+
 
 # Validate that payload exists
 def validate_payload(payload):
@@ -31,37 +37,21 @@ def validate_field_length(data,field,min=3):
 
 # Validate email format (basic validation)
 def validate_email(email):
-    pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-    return bool(re.match(pattern, email))
+    return bool(_email_match(email))
 
 # Validate phone number (basic validation)
-def valid_phone_isDigit_and_length(phone, min = 11):
+def valid_phone_isDigit_and_length(phone, min = PHONE_MIN_LENGTH):
      return (phone.isdigit() and len(phone) >= min)
      
 
 # Phone number should start with a valid prefix
 def valid_phone_format(phone):
-    valid_prefixes = ['070', '080', '090', '081', '091']
-    return any(phone.startswith(prefix) for prefix in valid_prefixes)
+    return phone[:3] in PHONE_PREFIXES
 
 # validate phone
 def validate_phone(phone):
      return valid_phone_isDigit_and_length(phone) and valid_phone_format(phone)
 
-# Check for duplicate record to prevent redundancy   
-def validate_unique_field(tables, field, value):
-    """
-    Check if a field value is unique across all records.
-    Returns True if unique, False if duplicate exists.
-    """
-
-    # handles both list and dictionary
-    records = tables.values() if isinstance(tables, dict) else tables
-    return not any(
-        record.get(field, '').lower() == value.lower() 
-        for record in records
-    )
-
 # Validate integer
 def positive_integer(value, min =1 ):
      return isinstance(value,int) and value >= min
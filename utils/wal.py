@@ -0,0 +1,317 @@
+import atexit
+import json
+import mmap
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from utils.backends import DurabilityError
+from utils.gc_pause import paused_gc
+
+SEGMENT_PREFIX = 'log-'
+SNAPSHOT_FILE = 'snapshot.dat'
+FOOTER_WIDTH = 21  # 20 digit offset + newline
+RETRY_SECONDS = 1
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _segment_name(start_seq):
+    return f'{SEGMENT_PREFIX}{start_seq:020d}.jsonl'
+
+
+# Record <-> JSON row (values in __slots__ order) compiled for one collection spec
+class RowCodec:
+    def __init__(self, spec):
+        self.record = spec.record
+        self.columns = spec.record.__slots__
+        self.namespace = {'_new': object.__new__, '_record': spec.record}
+        for field, (encode, decode) in spec.codecs.items():
+            self.namespace[f'_e_{field}'] = encode
+            self.namespace[f'_d_{field}'] = decode
+        self.encode = self._compile_encode(spec.codecs)
+        self.decode = self._compile_decode(spec.codecs)
+
+    def _compile_encode(self, codecs):
+        values = ', '.join(f'None if r.{column} is None else _e_{column}(r.{column})' if column in codecs else f'r.{column}'
+                           for column in self.columns)
+        return self._build(f'def encode(r):\n    return [{values}]\n', 'encode')
+
+    def _compile_decode(self, codecs):
+        lines = ['def decode(row):', '    r = _new(_record)', f"    {', '.join(f'r.{column}' for column in self.columns)}, = row"]
+        lines += [f'    if r.{field} is not None: r.{field} = _d_{field}(r.{field})' for field in codecs]
+        lines.append('    return r')
+        return self._build('\n'.join(lines) + '\n', 'decode')
+
+    def _build(self, source, name):
+        namespace = dict(self.namespace)
+        exec(compile(source, f'<row codec {self.record.__name__}.{name}>', 'exec'), namespace)
+        return namespace[name]
+
+
+# Durable change log for the in-memory backend
+class WriteAheadLog:
+    """
+    Every save/remove on a collection is appended to an in-memory queue as
+    one JSON line [seq, collection, event, row-or-id]. A background thread
+    writes whatever has queued up and fsyncs once per batch (group commit),
+    so a burst of writes shares one fsync. wait_durable() blocks until the
+    calling thread's last change is on disk; the apps call it after the
+    view returns, outside the store locks.
+
+    If a write or fsync fails, the batch is put back at the head of the
+    queue and retried every RETRY_SECONDS; meanwhile wait_durable() raises
+    DurabilityError, as it does when the wait passes `wait_timeout`.
+
+    Every `snapshot_every` changes the flusher writes a snapshot of all
+    collections and starts a new log segment; older segments are deleted.
+    Recovery loads the snapshot through mmap and replays only the log
+    lines after its sequence number.
+    """
+
+    def __init__(self, directory, collections, specs, snapshot_every=100_000, wait_timeout=30):
+        self.directory = directory
+        self.collections = collections
+        self.codecs = {name: RowCodec(specs[name]) for name in collections}
+        self.snapshot_every = snapshot_every
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._io_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = []
+        self._seq = 0
+        self._durable = 0
+        self._since_snapshot = 0
+        self._closed = False
+        self._error = None
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    # Load the snapshot and replay the log tail, then start logging new changes
+    def open(self):
+        snapshot_seq = self._load_snapshot()
+        self._seq = self._durable = self._replay(snapshot_seq)
+        self._open_segment(self._seq + 1)
+        for name, collection in self.collections.items():
+            collection.subscribe(self._listener(name))
+        self._thread = threading.Thread(target=self._run, name='wal-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def _listener(self, name):
+        encode = self.codecs[name].encode
+
+        def append(event, record):
+            payload = encode(record) if event == 'save' else record.id
+            self.append(name, event, payload)
+        return append
+
+    # Queue one change; called by collections while their write lock is held
+    def append(self, name, event, payload):
+        with self._cond:
+            self._seq += 1
+            self._pending.append(_dumps([self._seq, name, event, payload]) + '\n')
+            self._since_snapshot += 1
+            self._local.seq = self._seq
+            self._cond.notify_all()
+
+    # Block until every change this thread appended has been fsynced; DurabilityError if it cannot be
+    def wait_durable(self):
+        seq = getattr(self._local, 'seq', 0)
+        if seq <= self._durable:
+            return
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            while self._durable < seq and not self._closed:
+                if self._error is not None:
+                    raise DurabilityError(f"Write-ahead log is failing: {self._error}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DurabilityError(f"Write-ahead log did not flush within {self.wait_timeout} seconds")
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                self._flush()
+                if self._since_snapshot >= self.snapshot_every:
+                    self.snapshot()
+            except Exception:
+                # The flusher must outlive I/O errors: the batch is queued again, so just retry later
+                time.sleep(RETRY_SECONDS)
+
+    # Write and fsync everything queued so far as one batch
+    def _flush(self):
+        with self._io_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                seq = self._seq
+            if batch:
+                data = ''.join(batch).encode()
+                try:
+                    self._file.write(data)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except Exception as error:
+                    with self._cond:
+                        self._pending[:0] = batch
+                        self._error = error
+                        self._cond.notify_all()
+                    self._reopen_segment()
+                    raise
+                self._size += len(data)
+            with self._cond:
+                self._durable = max(self._durable, seq)
+                self._error = None
+                self._cond.notify_all()
+        return seq
+
+    def _open_segment(self, start_seq):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, _segment_name(start_seq))
+        self._file = open(path, 'ab')
+        self._path, self._size = path, self._file.tell()
+        self._fsync_directory()
+
+    # After a failed flush: cut the segment back to its last good size so the retried batch
+    # does not follow a torn line. Best effort; if the disk is still failing the next flush tries again.
+    def _reopen_segment(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        try:
+            self._file = open(self._path, 'ab')
+            self._file.truncate(self._size)
+        except OSError:
+            pass
+
+    def _fsync_directory(self):
+        descriptor = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith(SEGMENT_PREFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    # Write a point-in-time copy of every collection and drop the log it covers
+    def snapshot(self):
+        """
+        Collections are read-locked (in rank order) only while their rows
+        are encoded and the log is rotated; the file itself is written
+        afterwards. Snapshot body: one JSON array of rows per collection,
+        then a JSON footer with their offsets, then the footer's offset.
+        """
+        with self._snapshot_lock:
+            with ExitStack() as stack:
+                for collection in sorted(self.collections.values(), key=lambda collection: collection.lock.rank):
+                    stack.enter_context(collection.lock.read())
+                seq = self._flush()
+                state = {name: (collection.next_id, [self.codecs[name].encode(record) for record in collection.values()])
+                         for name, collection in self.collections.items()}
+                with self._io_lock:
+                    self._open_segment(seq + 1)
+                    with self._cond:
+                        self._since_snapshot = self._seq - seq
+
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            with open(path + '.tmp', 'wb') as snapshot:
+                footer = {'seq': seq, 'collections': {}}
+                for name, (next_id, rows) in state.items():
+                    body = _dumps(rows).encode()
+                    footer['collections'][name] = {'columns': list(self.codecs[name].columns), 'next_id': next_id,
+                                                   'offset': snapshot.tell(), 'length': len(body)}
+                    snapshot.write(body)
+                footer_offset = snapshot.tell()
+                snapshot.write(_dumps(footer).encode() + b'\n')
+                snapshot.write(b'%020d\n' % footer_offset)
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(path + '.tmp', path)
+            self._fsync_directory()
+
+            current = _segment_name(seq + 1)
+            for segment in self._segments():
+                if os.path.basename(segment) < current:
+                    os.remove(segment)
+            return seq
+
+    def _load_snapshot(self):
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return 0
+        with paused_gc():
+            return self._read_snapshot(path)
+
+    def _read_snapshot(self, path):
+        with open(path, 'rb') as snapshot, mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            footer_offset = int(view[-FOOTER_WIDTH:])
+            footer = json.loads(view[footer_offset:-FOOTER_WIDTH])
+            for name, entry in footer['collections'].items():
+                codec = self.codecs[name]
+                if entry['columns'] != list(codec.columns):
+                    raise ValueError(f"Snapshot columns for {name} do not match {codec.record.__name__}")
+                rows = json.loads(view[entry['offset']:entry['offset'] + entry['length']])
+                self.collections[name].load(map(codec.decode, rows), entry['next_id'])
+        return footer['seq']
+
+    # Re-apply logged changes newer than the snapshot; returns the last sequence number
+    def _replay(self, after_seq):
+        seq = after_seq
+        segments = self._segments()
+        for number, segment in enumerate(segments):
+            with open(segment, 'rb') as log:
+                lines = log.read().split(b'\n')
+            good = 0
+            for line in lines:
+                if not line:
+                    good += 1
+                    continue
+                try:
+                    entry_seq, name, event, payload = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; anything else is corruption
+                    if number != len(segments) - 1 or line is not lines[-1]:
+                        raise
+                    with open(segment, 'r+b') as log:
+                        log.truncate(sum(len(kept) + 1 for kept in lines[:good]))
+                    break
+                good += 1
+                if entry_seq <= after_seq:
+                    continue
+                collection = self.collections[name]
+                if event == 'save':
+                    collection.replay(self.codecs[name].decode(payload))
+                else:
+                    collection.remove(payload)
+                seq = entry_seq
+        return seq
+
+    # Flush what is queued and stop the flusher (registered with atexit)
+    def close(self):
+        if self._closed or self._file is None:
+            return
+        self._flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._file.close()